@@ -0,0 +1,163 @@
+# Description: Benchmark for contacts_app.py. Synthetic contacts.csv files are generated at several sizes and all contacts
+# are loaded as a plain list of rows and as a ContactTable, the wall time and memory of loading, iterating, sorting,
+# rendering and exporting them are reported as JSON.
+# Usage: python benchmark_contacts_app.py --sizes 10000 100000 1000000 --output report.json
+# Importing required modules
+# argparse module for reading the benchmark options
+import argparse
+
+# csv module for generating synthetic contacts.csv files
+import csv
+
+# json module for writing the report
+import json
+
+# os module for building file paths
+import os
+
+# platform module for recording where the benchmark ran
+import platform
+
+# random module for generating synthetic contacts
+import random
+
+# shutil module for removing the temporary benchmark folders
+import shutil
+
+# sys module for importing contacts_app from this folder
+import sys
+
+# tempfile module for creating temporary benchmark folders
+import tempfile
+
+# time module for measuring wall time
+import time
+
+# tracemalloc module for measuring memory
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import contacts_app
+
+syllables = ["am", "in", "sa", "ra", "re", "za", "ka", "ri", "mi", "ha", "sa", "ni", "to", "ba", "di", "ya"]
+
+
+# Generating a synthetic contacts.csv with the given number of contacts: first names come from a small set and last
+# names from a bigger one like in real address books, a third of the contacts have an email address
+def generate_contacts_csv(path, size, seed=0):
+    random_generator = random.Random(seed)
+    first_names = [
+        "".join(random_generator.choice(syllables) for _ in range(2)).title() for _ in range(300)
+    ]
+    last_names = [
+        "".join(random_generator.choice(syllables) for _ in range(4)).title() for _ in range(20000)
+    ]
+    with open(path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(contacts_app.contact_titles)
+        for contact_id in range(1, size + 1):
+            phone2 = f"0912{contact_id:07d}" if contact_id % 4 == 0 else ""
+            email = f"contact{contact_id}@example.com" if contact_id % 3 == 0 else ""
+            csv_writer.writerow(
+                [
+                    random_generator.choice(first_names),
+                    random_generator.choice(last_names),
+                    f"0935{contact_id:07d}",
+                    phone2,
+                    email,
+                    contact_id,
+                ]
+            )
+
+
+# Loading all contacts with contacts_app.load_contacts, measuring wall time and the memory the loaded contacts keep
+def measure_load(compact_memory):
+    contacts_app.compact_memory = compact_memory
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    contacts = contacts_app.load_contacts()
+    seconds = time.perf_counter() - start_time
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return contacts, seconds, memory
+
+
+# Iterating over all loaded contacts like view_all_contacts does
+def measure_iterate(contacts):
+    start_time = time.perf_counter()
+    for contact in contacts:
+        pass
+    return time.perf_counter() - start_time
+
+
+# Sorting all loaded contacts by last name like view_all_contacts does the first time
+def measure_sort(contacts):
+    start_time = time.perf_counter()
+    contacts_app.sorted_contact_positions(contacts, {}, "last_name")
+    return time.perf_counter() - start_time
+
+
+# Building the colored lines of all loaded contacts like view_all_contacts does
+def measure_render(contacts):
+    start_time = time.perf_counter()
+    for contact in contacts:
+        contacts_app.format_contact_line(contact)
+    return time.perf_counter() - start_time
+
+
+# Exporting all loaded contacts as one vCard file
+def measure_export(contacts, folder):
+    start_time = time.perf_counter()
+    contacts_app.export_vcards(contacts, folder + os.sep + "contacts.vcf")
+    return time.perf_counter() - start_time
+
+
+# Benchmarking both in-memory models at one size in a fresh folder
+def benchmark(size):
+    folder = tempfile.mkdtemp(prefix="contacts_app_benchmark_")
+    results = {}
+    try:
+        contacts_app.csv_file_path = folder + os.sep + "contacts.csv"
+        generate_contacts_csv(contacts_app.csv_file_path, size)
+        for name, compact_memory in [("list", False), ("table", True)]:
+            contacts, load_seconds, memory = measure_load(compact_memory)
+            results[name] = {
+                "load_seconds": round(load_seconds, 6),
+                "memory_bytes": memory,
+                "iterate_seconds": round(measure_iterate(contacts), 6),
+                "sort_seconds": round(measure_sort(contacts), 6),
+                "render_seconds": round(measure_render(contacts), 6),
+                "export_seconds": round(measure_export(contacts, folder), 6),
+            }
+            del contacts
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "size": size,
+        "models": results,
+        "memory_saving": round(1 - results["table"]["memory_bytes"] / results["list"]["memory_bytes"], 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark contacts_app.py in-memory contact models at several sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="numbers of contacts")
+    parser.add_argument("--output", default="-", help="file for the JSON report, - for stdout (default)")
+    arguments = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for size in arguments.sizes:
+        print(f"Benchmarking {size} contacts...", file=sys.stderr)
+        report["results"].append(benchmark(size))
+
+    if arguments.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(arguments.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Report saved to {arguments.output}", file=sys.stderr)
@@ -2,7 +2,7 @@
 # Github Link: https://github.com/mavericane/
 # Website Link: https://mavericane.ir
 # Description: This is a simple contacts app for creating, editing, viewing, deleting, and exporting to other apps for contact management.
-# Version 5.2: Create a new contact, edit a contact, view a specific contact, view all saved contacts, delete a specific contact, and delete all saved contacts.
+# Version 5.10: Create a new contact, edit a contact, view a specific contact, view all saved contacts (sorted, filtered and page by page), delete a specific contact, delete all saved contacts, export contacts as vCard 4.0 files, import contacts from vCard and CSV files, look up contacts by phone number or email address, search contacts by name, find and merge duplicate contacts, check phone numbers with per-country rules, export the changes since an earlier export, and run commands from the command line without the menu. Quit keeps menu number 8, options added after it get the next numbers.
 # Importing required modules
 # platform module for detecting os
 import platform
@@ -25,6 +25,144 @@ from pathlib import Path
 # sys module for detecting running file location if script is compiled
 import sys
 
+# time module for measuring the export throughput
+import time
+
+# argparse module for the non-interactive command line
+import argparse
+
+# itertools module for streaming imported rows
+import itertools
+
+# sqlite3 module for the phone number, email address and name lookup index (contacts.idx)
+import sqlite3
+
+# bisect module for prefix search over the sorted name words
+import bisect
+
+# collections module for counting the trigrams similar names share
+import collections
+
+# heapq module for picking the best matches without sorting all of them
+import heapq
+
+# array module for keeping loaded contacts in compact columns
+import array
+
+# json module for the change feed (contacts.changes) and JSON Lines export
+import json
+
+# uuid module for the stable UID of exported vCards
+import uuid
+
+
+# Class to keep the phone number rules of a country, its pattern is compiled once when it is registered
+# A number is valid if its national significant number (without the calling code like +98 and without the trunk
+# prefix like the first 0 of 09123456789) matches the pattern
+class PhoneRule:
+    def __init__(self, country, calling_code, trunk_prefix, national_pattern, trunk_prefix_optional=False):
+        self.country = country
+        self.calling_code = calling_code
+        self.trunk_prefix = trunk_prefix
+        self.national_pattern = re.compile(national_pattern)
+        # Whether numbers written without the calling code may leave out the trunk prefix (like in the US)
+        self.trunk_prefix_optional = trunk_prefix_optional or trunk_prefix == ""
+
+    # Returning the E.164 form (+, calling code and national significant number) of the number after the calling
+    # code, or of a number written without the calling code, or None if it isn't valid in the country
+    def canonicalize(self, number, with_calling_code):
+        if self.trunk_prefix != "" and number.startswith(self.trunk_prefix):
+            without_trunk_prefix = number[len(self.trunk_prefix) :]
+            if self.national_pattern.fullmatch(without_trunk_prefix):
+                return "+" + self.calling_code + without_trunk_prefix
+        if with_calling_code or self.trunk_prefix_optional:
+            if self.national_pattern.fullmatch(number):
+                return "+" + self.calling_code + number
+        return None
+
+
+# Phone number rules by country (ISO 3166 code) and by calling code (several countries can share one)
+phone_rules = {}
+calling_code_rules = {}
+
+
+# Adding the phone number rules of a country, replacing its old rules
+def register_phone_rule(country, calling_code, trunk_prefix, national_pattern, trunk_prefix_optional=False):
+    rule = PhoneRule(country, calling_code, trunk_prefix, national_pattern, trunk_prefix_optional)
+    phone_rules[country] = rule
+    calling_code_rules[calling_code] = [
+        old_rule for old_rule in calling_code_rules.get(calling_code, []) if old_rule.country != country
+    ] + [rule]
+    return rule
+
+
+register_phone_rule("IR", "98", "0", r"[1-9]\d{9}")
+register_phone_rule("US", "1", "1", r"[2-9]\d{2}[2-9]\d{6}", trunk_prefix_optional=True)
+register_phone_rule("CA", "1", "1", r"[2-9]\d{2}[2-9]\d{6}", trunk_prefix_optional=True)
+register_phone_rule("GB", "44", "0", r"[1-9]\d{8,9}")
+register_phone_rule("DE", "49", "0", r"[1-9]\d{5,13}")
+register_phone_rule("FR", "33", "0", r"[1-9]\d{8}")
+register_phone_rule("TR", "90", "0", r"[2-5]\d{9}")
+register_phone_rule("AE", "971", "0", r"[2-9]\d{7,8}")
+register_phone_rule("IN", "91", "0", r"[1-9]\d{9}")
+register_phone_rule("AF", "93", "0", r"[2-7]\d{8}")
+
+# Country of phone numbers written without + and a calling code (like 09123456789)
+default_phone_country = "IR"
+
+# Numbers of countries without registered rules only have to look like E.164 numbers
+generic_phone_pattern = re.compile(r"[1-9]\d{6,14}")
+
+# Spaces, dashes, dots and parentheses people use to group phone digits are removed,
+# Persian and Arabic digits are replaced with ASCII digits
+phone_separators = str.maketrans(
+    "\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9"
+    "\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669",
+    "01234567890123456789",
+    " \t-./()",
+)
+
+# Pattern for checking email addresses, compiled once
+email_pattern = re.compile(
+    r"([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\"([]!#-[^-~ \t]|(\\[\t -~]))+\")@([0-9A-Za-z]([0-9A-Za-z-]{0,61}[0-9A-Za-z])?(\.[0-9A-Za-z]([0-9A-Za-z-]{0,61}[0-9A-Za-z])?)*|\[((25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])(\.(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])){3}|IPv6:((((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){6}|::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){5}|[0-9A-Fa-f]{0,4}::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){4}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):)?(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){3}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,2}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){2}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,3}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,4}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::)((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3})|(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])(\.(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])){3})|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,5}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3})|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,6}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::)|(?!IPv6:)[0-9A-Za-z-]*[0-9A-Za-z]:[!-Z^-~]+)])"
+)
+
+# Soundex codes of letters for str.translate, names that sound alike get the same codes (see sound_alike_code)
+# Vowels become 0 to separate equal codes, h, w, digits and punctuation are dropped
+sound_codes = str.maketrans(
+    "bfpvcgjkqsxzdtlmnraeiouy", "111122222222334556000000", "hw0123456789-'.,_"
+)
+sound_code_repeat_pattern = re.compile(r"(.)\1+")
+
+# Lookup index of contacts.csv, opened on first use by get_contact_index
+contact_index = None
+
+# Prefix and fuzzy name search, built once per session by get_contact_search
+contact_search = None
+
+# Size of contacts.journal (in bytes) that triggers compacting it into a fresh contacts.csv
+journal_compaction_size = 1024 * 1024
+
+# Titles of contacts.csv, every contact keeps the same id in the last column for as long as it is saved
+contact_titles = ["first_name", "last_name", "phone", "phone2", "email", "id"]
+
+# Loading contacts into a ContactTable instead of a list of rows, which needs several times less memory
+# for big address books (False loads a plain list)
+compact_memory = True
+
+# Contacts loaded for view_all_contacts and their sorted orders, kept until the contacts change:
+# (signature of contacts.csv and contacts.journal, contacts, {sort column: sorted positions})
+contact_listing = None
+
+# Colored labels of the contact list, built once instead of for every listed contact
+contact_list_separator = termcolor.colored(",", "green") + " "
+contact_list_labels = [
+    "Contact: " + termcolor.colored("First name:", "green") + " ",
+    contact_list_separator + termcolor.colored("Last name:", "green") + " ",
+    contact_list_separator + termcolor.colored("Phone number:", "blue") + " ",
+    contact_list_separator + termcolor.colored("Second phone number:", "light_blue") + " ",
+    contact_list_separator + termcolor.colored("Email:", "light_green") + " ",
+]
 
 # Detect file location (supports both .py and compiled executable)
 if getattr(sys, "frozen", False):
@@ -43,10 +181,992 @@ def contacts_csv_exists():
 
 # Creating a new contacts.csv file for saving contacts
 def contacts_csv_create():
-    data = ["first_name", "last_name", "phone", "phone2", "email"]
     with open(csv_file_path, "w", newline="") as csv_file:
         csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(data)
+        csv_writer.writerow(contact_titles)
+    # Edits and deletions of the old contacts don't belong to the new file
+    if os.path.exists(contacts_journal_path()):
+        os.remove(contacts_journal_path())
+
+
+# Path of contacts.journal, where edited and deleted contacts are appended until it is compacted into contacts.csv
+def contacts_journal_path():
+    return csv_file_path[: -len(".csv")] + ".journal"
+
+
+# Reading contacts.journal into {contact id: edited contact, or None if the contact has been deleted}
+# Records are ["edit", id, first_name, last_name, phone, phone2, email] and ["delete", id],
+# a record cut short by a crash is skipped
+def read_contacts_journal():
+    changes = {}
+    try:
+        with open(contacts_journal_path(), "r", newline="") as journal_file:
+            for record in csv.reader(journal_file):
+                if len(record) == 7 and record[0] == "edit":
+                    changes[record[1]] = record[2:] + [record[1]]
+                elif len(record) == 2 and record[0] == "delete":
+                    changes[record[1]] = None
+    except FileNotFoundError:
+        pass
+    return changes
+
+
+# Streaming saved contacts row by row, without the titles and with the changes of contacts.journal applied
+# Every row is [first_name, last_name, phone, phone2, email, id]
+def iter_contacts():
+    changes = read_contacts_journal()
+    with open(csv_file_path, "r", newline="") as csv_file:
+        csv_reader = csv.reader(csv_file)
+        titles = next(csv_reader, [])
+        # Contacts saved before contacts had ids are numbered by their row until contacts.csv is compacted
+        has_ids = "id" in titles
+        for row_num, row in enumerate(csv_reader, 1):
+            if len(row) == 0:
+                continue
+            if len(row) != 6:
+                row = (row + [""] * 6)[:6]
+            if not has_ids:
+                row[5] = str(row_num)
+            if row[5] in changes:
+                row = changes[row[5]]
+                if row is None:
+                    continue
+            yield row
+
+
+# Checking that contacts.csv has the id column and every contact in it has an id
+def contacts_csv_has_ids():
+    with open(csv_file_path, "r", newline="") as csv_file:
+        csv_reader = csv.reader(csv_file)
+        if "id" not in next(csv_reader, []):
+            return False
+        for row in csv_reader:
+            if len(row) != 0 and (len(row) < 6 or not row[5].isdigit()):
+                return False
+    return True
+
+
+# Writing all contacts with the journal applied to a fresh contacts.csv and removing contacts.journal
+# Contacts without an id (added to contacts.csv outside the app) are moved to the end and numbered from first_new_id
+def compact_contacts(first_new_id=1):
+    temp_path = f"{csv_file_path}.{os.getpid()}.tmp"
+    contacts_without_id = []
+    max_id = first_new_id - 1
+    with open(temp_path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(contact_titles)
+        for row in iter_contacts():
+            if not row[5].isdigit():
+                contacts_without_id.append(row)
+                continue
+            max_id = max(max_id, int(row[5]))
+            csv_writer.writerow(row)
+        for contact_id, row in enumerate(contacts_without_id, max_id + 1):
+            row[5] = str(contact_id)
+            csv_writer.writerow(row)
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+    # Replacing contacts.csv in one step, so a crash never leaves it half-written
+    # (a journal left behind by a crash is applied again, which changes nothing)
+    os.replace(temp_path, csv_file_path)
+    if os.path.exists(contacts_journal_path()):
+        os.remove(contacts_journal_path())
+
+
+# Appending records to contacts.journal and compacting it into contacts.csv if it is too big
+def append_contacts_journal(records):
+    with open(contacts_journal_path(), "a", newline="") as journal_file:
+        csv_writer = csv.writer(journal_file)
+        csv_writer.writerows(records)
+        journal_size = journal_file.tell()
+    if journal_size >= journal_compaction_size:
+        compact_contacts()
+
+
+# Path of contacts.changes, the change feed for incremental sync: one JSON line for every created, edited and deleted
+# contact (and for deleting all contacts) with an increasing sequence number
+# {"seq": 7, "time": "2026-01-01T12:00:00", "action": "edit", "id": "3", "contact": {"first_name": ..., ...}}
+def contacts_changes_path():
+    return csv_file_path[: -len(".csv")] + ".changes"
+
+
+# Reading the sequence number of the last change from the end of contacts.changes (0 if nothing has changed yet)
+def read_last_change_seq():
+    try:
+        with open(contacts_changes_path(), "rb") as changes_file:
+            file_size = changes_file.seek(0, os.SEEK_END)
+            block_size = 4096
+            while True:
+                start = max(0, file_size - block_size)
+                changes_file.seek(start)
+                lines = changes_file.read().splitlines()
+                # The first line of the block can be cut, it only counts if the block starts at the beginning
+                complete_lines = lines if start == 0 else lines[1:]
+                for line in reversed(complete_lines):
+                    try:
+                        return json.loads(line)["seq"]
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                if start == 0:
+                    return 0
+                block_size *= 2
+    except FileNotFoundError:
+        return 0
+
+
+# Appending (action, contact or None) changes to contacts.changes with the next sequence numbers
+# The last sequence number is also kept in contacts.idx, so numbering goes on (and exports with --since notice
+# the missing changes) if contacts.changes has been deleted
+def append_contact_changes(changes):
+    global contact_index
+    if contact_index is None:
+        contact_index = ContactIndex(csv_file_path[: -len(".csv")] + ".idx")
+    change_seq = max(read_last_change_seq(), contact_index.last_change_seq())
+    change_time = time.strftime("%Y-%m-%dT%H:%M:%S")
+    lines = []
+    for action, contact in changes:
+        change_seq += 1
+        change = {"seq": change_seq, "time": change_time, "action": action}
+        if contact is not None:
+            change["id"] = contact[5]
+            change["contact"] = dict(zip(contact_titles[:5], contact[:5]))
+        lines.append(json.dumps(change, ensure_ascii=False) + "\n")
+    with open(contacts_changes_path(), "a", encoding="utf-8") as changes_file:
+        changes_file.writelines(lines)
+    contact_index.set_last_change_seq(change_seq)
+
+
+# Moving to the first change after the sequence number since in contacts.changes (opened in binary mode)
+# Sequence numbers grow line by line, so the file is searched by halving byte ranges instead of read from the start
+def seek_changes(changes_file, since):
+    low = 0
+    high = changes_file.seek(0, os.SEEK_END)
+    while low < high:
+        middle = (low + high) // 2
+        changes_file.seek(middle)
+        # Skipping the rest of the line the middle falls into
+        if middle > 0:
+            changes_file.readline()
+        line = changes_file.readline()
+        try:
+            after_since = line == b"" or json.loads(line)["seq"] > since
+        except ValueError:
+            after_since = True
+        if after_since:
+            high = middle
+        else:
+            low = middle + 1
+    changes_file.seek(low)
+    if low > 0:
+        changes_file.readline()
+
+
+# Reading the changes after the sequence number since, keeping only the last change of every contact
+# (a "delete_all" change drops the ones before it), returning them in order and the last sequence number
+# Raising ValueError if changes after since are no longer in contacts.changes (or since is past the last change)
+def read_changes_since(since, last_change_seq):
+    if since > last_change_seq:
+        raise ValueError(
+            f"--since {since} is past the last change {last_change_seq}, export all contacts without --since"
+        )
+    last_changes = {}
+    delete_all_change = None
+    last_seq = since
+    try:
+        with open(contacts_changes_path(), "rb") as changes_file:
+            seek_changes(changes_file, since)
+            for line in changes_file:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash
+                    break
+                if last_seq == since and change["seq"] != since + 1:
+                    break
+                last_seq = change["seq"]
+                if change["action"] == "delete_all":
+                    last_changes = {}
+                    delete_all_change = change
+                else:
+                    # Moving the contact to the end, changes stay in the order of their last sequence number
+                    last_changes.pop(change["id"], None)
+                    last_changes[change["id"]] = change
+    except FileNotFoundError:
+        pass
+    if last_seq == since and since != last_change_seq:
+        raise ValueError(
+            f"the changes after {since} are no longer in contacts.changes, export all contacts without --since"
+        )
+    changes = list(last_changes.values())
+    if delete_all_change is not None:
+        changes.insert(0, delete_all_change)
+    return changes, last_seq
+
+
+# Class to keep many contacts in memory column by column instead of one list of six strings per contact
+# First and last names repeat a lot in an address book, every different name is kept once and the contacts
+# refer to it by number, phone numbers and email address of a contact are joined into one string
+# and ids are kept as numbers
+# Iterating and indexing give the same [first_name, last_name, phone, phone2, email, id] rows as iter_contacts
+class ContactTable:
+    def __init__(self, contacts=()):
+        # name number -> name
+        self.names = []
+        # name -> name number, only kept while contacts are appended
+        self.name_numbers = {}
+        self.first_names = array.array("I")
+        self.last_names = array.array("I")
+        # "phone\nphone2\nemail" of every contact
+        self.details = []
+        self.ids = array.array("q")
+        for contact in contacts:
+            self.append(contact)
+        self.name_numbers = None
+
+    # Returning the number of a name, adding it if it is new
+    def name_number(self, name):
+        if self.name_numbers is None:
+            self.name_numbers = dict((name, number) for number, name in enumerate(self.names))
+        number = self.name_numbers.get(name)
+        if number is None:
+            number = self.name_numbers[name] = len(self.names)
+            self.names.append(name)
+        return number
+
+    # Adding a [first_name, last_name, phone, phone2, email, id] contact at the end
+    def append(self, contact):
+        self.first_names.append(self.name_number(contact[0]))
+        self.last_names.append(self.name_number(contact[1]))
+        self.details.append(contact[2] + "\n" + contact[3] + "\n" + contact[4])
+        # Contacts added to contacts.csv outside the app have no id until the index gives them one
+        self.ids.append(int(contact[5]) if contact[5].isdigit() else -1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Converting a kept id back to the id column of contacts.csv
+    def contact_id(self, number):
+        return str(number) if number >= 0 else ""
+
+    # Building the row of the contact at a position
+    def __getitem__(self, position):
+        return [
+            self.names[self.first_names[position]],
+            self.names[self.last_names[position]],
+        ] + self.details[position].split("\n") + [self.contact_id(self.ids[position])]
+
+    # Building the sort key of every contact for "first_name", "last_name" or "email" (case-insensitive)
+    # Every different name is casefolded and sorted only once, a name is then compared by its rank
+    def sort_keys(self, sort_by):
+        if sort_by == "email":
+            emails = [details[details.rindex("\n") + 1 :].casefold() for details in self.details]
+            # Contacts without an email address come last
+            return [(email == "", email) for email in emails]
+        name_ranks = [0] * len(self.names)
+        sorted_numbers = sorted(range(len(self.names)), key=lambda number: self.names[number].casefold())
+        for rank, number in enumerate(sorted_numbers):
+            name_ranks[number] = rank
+        names_num = len(self.names)
+        if sort_by == "first_name":
+            columns = zip(self.first_names, self.last_names)
+        else:
+            columns = zip(self.last_names, self.first_names)
+        return [name_ranks[name] * names_num + name_ranks[other_name] for name, other_name in columns]
+
+    def __iter__(self):
+        names = self.names
+        for first_name, last_name, details, contact_id in zip(
+            self.first_names, self.last_names, self.details, self.ids
+        ):
+            yield [names[first_name], names[last_name]] + details.split("\n") + [self.contact_id(contact_id)]
+
+
+# Loading all saved contacts for displaying them, as a ContactTable or as a list of rows (see compact_memory)
+def load_contacts():
+    if compact_memory:
+        return ContactTable(iter_contacts())
+    return list(iter_contacts())
+
+
+# Returning the loaded contacts for listing and their sorted orders, loading them again only if they have changed
+def get_contact_listing():
+    global contact_listing
+    signature = contacts_signature()
+    if contact_listing is None or contact_listing[0] != signature:
+        contact_listing = (signature, load_contacts(), {})
+    return contact_listing[1], contact_listing[2]
+
+
+# Building the sort key of every loaded contact for "first_name", "last_name" or "email" (case-insensitive)
+def contact_sort_keys(contacts, sort_by):
+    if isinstance(contacts, ContactTable):
+        return contacts.sort_keys(sort_by)
+    if sort_by == "email":
+        return [(contact[4] == "", contact[4].casefold()) for contact in contacts]
+    if sort_by == "first_name":
+        return [(contact[0].casefold(), contact[1].casefold()) for contact in contacts]
+    return [(contact[1].casefold(), contact[0].casefold()) for contact in contacts]
+
+
+# Returning the positions of the loaded contacts in the order of a column (None for the saved order)
+# The order of every column is sorted once and kept with the loaded contacts
+def sorted_contact_positions(contacts, sort_orders, sort_by):
+    if sort_by is None:
+        return range(len(contacts))
+    if sort_by not in sort_orders:
+        sort_keys = contact_sort_keys(contacts, sort_by)
+        sort_orders[sort_by] = array.array(
+            "I", sorted(range(len(contacts)), key=sort_keys.__getitem__)
+        )
+    return sort_orders[sort_by]
+
+
+# Building the colored line of a contact in the contact list
+def format_contact_line(contact):
+    output = (
+        contact_list_labels[0]
+        + contact[0]
+        + contact_list_labels[1]
+        + contact[1]
+        + contact_list_labels[2]
+        + contact[2]
+    )
+    if contact[3] != "":
+        output += contact_list_labels[3] + contact[3]
+    if contact[4] != "":
+        output += contact_list_labels[4] + contact[4]
+    return output
+
+
+# Parsing a phone number written in a common format (with or without separators, +, 00 or the trunk prefix)
+# into its E.164 form like +989123456789, or None if it isn't valid
+# Numbers without + or 00 are numbers of country (default_phone_country if it isn't given)
+def parse_phone(phone, country=None):
+    number = phone.translate(phone_separators)
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    if number.startswith("+"):
+        digits = number[1:]
+        if not (digits.isdigit() and digits.isascii()):
+            return None
+        # Calling codes are prefix-free, so the first registered one that matches is the one of the number
+        for length in [1, 2, 3]:
+            rules = calling_code_rules.get(digits[:length])
+            if rules is not None:
+                for rule in rules:
+                    canonical_phone = rule.canonicalize(digits[length:], True)
+                    if canonical_phone is not None:
+                        return canonical_phone
+                return None
+        if generic_phone_pattern.fullmatch(digits):
+            return "+" + digits
+        return None
+    if not (number.isdigit() and number.isascii()):
+        return None
+    return phone_rules[country or default_phone_country].canonicalize(number, False)
+
+
+# Normalizing a phone number for lookups and duplicate detection: valid numbers in any format become E.164,
+# other numbers keep only their digits and a leading +
+def normalize_phone(phone):
+    if phone == "":
+        return phone
+    canonical_phone = parse_phone(phone)
+    if canonical_phone is not None:
+        return canonical_phone
+    return re.sub(r"(?!^\+)\D", "", phone.strip())
+
+
+# Building the key of a contact from its first and last name (case-insensitive)
+def contact_name_key(first_name, last_name):
+    return first_name.casefold() + "\n" + last_name.casefold()
+
+
+# Class to keep the contacts of contacts.csv (and contacts.journal) in contacts.idx by id, indexed by
+# casefolded name, normalized phone numbers (phone and phone2) and lowercased email address
+# The index can always be rebuilt from contacts.csv, only the next contact id is kept in it
+class ContactIndex:
+    # Version of the tables, older contacts.idx files are dropped and rebuilt
+    # (version 3 keeps phone numbers in E.164 form)
+    version = 3
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != self.version:
+            self.connection.executescript(
+                """
+                DROP TABLE IF EXISTS contacts;
+                DROP TABLE IF EXISTS contact_phones;
+                DROP TABLE IF EXISTS contact_emails;
+                DROP TABLE IF EXISTS settings;
+                """
+            )
+            self.connection.execute(f"PRAGMA user_version = {self.version}")
+        self.connection.executescript(
+            """
+            PRAGMA synchronous = OFF;
+            CREATE TABLE IF NOT EXISTS contacts (
+                id INTEGER PRIMARY KEY,
+                name_key TEXT NOT NULL,
+                first_name TEXT NOT NULL,
+                last_name TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                phone2 TEXT NOT NULL,
+                email TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS contacts_name_key ON contacts (name_key);
+            CREATE TABLE IF NOT EXISTS contact_phones (
+                phone TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (phone, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS contact_emails (
+                email TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                PRIMARY KEY (email, id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS contact_phones_id ON contact_phones (id);
+            CREATE INDEX IF NOT EXISTS contact_emails_id ON contact_emails (id);
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+
+    # Checking whether the index was last updated for contacts.csv with the given signature
+    def matches(self, signature):
+        cursor = self.connection.execute(
+            "SELECT value FROM settings WHERE key = 'signature'"
+        )
+        row = cursor.fetchone()
+        return signature is not None and row is not None and row[0] == repr(signature)
+
+    # Remembering the signature of contacts.csv the index belongs to
+    def set_signature(self, signature):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('signature', ?)",
+                (repr(signature),),
+            )
+
+    # Adding contacts (or replacing the ones with the same id) without committing
+    # Rows are written in chunks with executemany, replace=False skips deleting old rows (the tables are empty)
+    def insert_contacts(self, contacts, replace=True):
+        contacts = iter(contacts)
+        while True:
+            chunk = list(itertools.islice(contacts, 10000))
+            if len(chunk) == 0:
+                return None
+            contact_rows = []
+            phone_rows = []
+            email_rows = []
+            for contact in chunk:
+                contact_id = int(contact[5])
+                name_key = contact_name_key(contact[0], contact[1])
+                contact_rows.append((contact_id, name_key) + tuple(contact[:5]))
+                for phone in set([normalize_phone(contact[2]), normalize_phone(contact[3])]):
+                    if phone != "":
+                        phone_rows.append((phone, contact_id))
+                if contact[4] != "":
+                    email_rows.append((contact[4].lower(), contact_id))
+            if replace:
+                for table in ["contact_phones", "contact_emails"]:
+                    self.connection.executemany(
+                        f"DELETE FROM {table} WHERE id = ?",
+                        ((contact_row[0],) for contact_row in contact_rows),
+                    )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO contacts (id, name_key, first_name, last_name, phone, phone2, email) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                contact_rows,
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO contact_phones (phone, id) VALUES (?, ?)", phone_rows
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO contact_emails (email, id) VALUES (?, ?)", email_rows
+            )
+
+    # Deleting a contact and its phone numbers and email address without committing
+    def delete_contact(self, contact_id):
+        for table in ["contacts", "contact_phones", "contact_emails"]:
+            self.connection.execute(f"DELETE FROM {table} WHERE id = ?", (int(contact_id),))
+
+    # Adding new contacts
+    def add_contacts(self, contacts):
+        with self.connection:
+            self.insert_contacts(contacts)
+
+    # Replacing an edited contact (it keeps its id)
+    def update_contact(self, contact):
+        with self.connection:
+            self.insert_contacts([contact])
+
+    # Removing a deleted contact
+    def remove_contact(self, contact):
+        with self.connection:
+            self.delete_contact(contact[5])
+
+    # Replacing changed contacts and removing deleted ones in one transaction
+    def apply_changes(self, changed_contacts, removed_contacts):
+        with self.connection:
+            for contact in removed_contacts:
+                self.delete_contact(contact[5])
+            self.insert_contacts(changed_contacts)
+
+    # Counting saved contacts
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    # Reading the sequence number of the last change written to contacts.changes (0 if nothing has changed yet)
+    def last_change_seq(self):
+        row = self.connection.execute(
+            "SELECT value FROM settings WHERE key = 'last_change_seq'"
+        ).fetchone()
+        return 0 if row is None else int(row[0])
+
+    # Remembering the sequence number of the last change written to contacts.changes
+    def set_last_change_seq(self, seq):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('last_change_seq', ?)", (str(seq),)
+            )
+
+    # Reading the id the next new contact gets
+    def next_id(self):
+        row = self.connection.execute(
+            "SELECT value FROM settings WHERE key = 'next_id'"
+        ).fetchone()
+        return 1 if row is None else int(row[0])
+
+    # Reserving ids for count new contacts, returning the first one
+    # Ids are never given out again, not even after deleting all contacts
+    def reserve_ids(self, count):
+        first_id = self.next_id()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('next_id', ?)",
+                (str(first_id + count),),
+            )
+        return first_id
+
+    # Returning the [first_name, last_name, phone, phone2, email, id] rows for a query on the contacts table
+    def select_contacts(self, condition, parameters):
+        cursor = self.connection.execute(
+            "SELECT first_name, last_name, phone, phone2, email, id FROM contacts WHERE " + condition,
+            parameters,
+        )
+        return [list(row[:5]) + [str(row[5])] for row in cursor]
+
+    # Finding the contact with the given first and last name (case-insensitive) or None
+    def find_by_name(self, first_name, last_name):
+        contacts = self.select_contacts(
+            "name_key = ? ORDER BY id", (contact_name_key(first_name, last_name),)
+        )
+        if len(contacts) == 0:
+            return None
+        return contacts[0]
+
+    # Finding the contacts with the given keys, in the same order
+    def find_by_keys(self, contact_keys):
+        contact_keys = list(contact_keys)
+        cursor = self.connection.execute(
+            "SELECT name_key, first_name, last_name, phone, phone2, email, id FROM contacts WHERE name_key IN ("
+            + ", ".join("?" * len(contact_keys))
+            + ") ORDER BY id DESC",
+            contact_keys,
+        )
+        # The oldest contact is kept if several contacts have the same name
+        contacts = dict((row[0], list(row[1:6]) + [str(row[6])]) for row in cursor)
+        return [contacts[contact_key] for contact_key in contact_keys if contact_key in contacts]
+
+    # Finding the contacts with the given phone number (as phone or phone2)
+    def find_by_phone(self, phone):
+        return self.select_contacts(
+            "id IN (SELECT id FROM contact_phones WHERE phone = ?)",
+            (normalize_phone(phone),),
+        )
+
+    # Finding the contacts with the given email address (case-insensitive)
+    def find_by_email(self, email):
+        return self.select_contacts(
+            "id IN (SELECT id FROM contact_emails WHERE email = ?)",
+            (email.strip().lower(),),
+        )
+
+    # Rebuilding the whole index from all saved contacts
+    # The next id stays above every saved id, also if contacts.idx has been deleted
+    def rebuild(self, contacts, signature):
+        next_id = self.next_id()
+        with self.connection:
+            for table in ["contacts", "contact_phones", "contact_emails"]:
+                self.connection.execute(f"DELETE FROM {table}")
+            self.insert_contacts(contacts, replace=False)
+            max_id = self.connection.execute("SELECT MAX(id) FROM contacts").fetchone()[0]
+            if max_id is not None:
+                next_id = max(next_id, max_id + 1)
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [("signature", repr(signature)), ("next_id", str(next_id))],
+            )
+
+    # Closing contacts.idx
+    def close(self):
+        self.connection.close()
+
+
+# Reading size and modification time of contacts.csv and contacts.journal to detect changes made outside the app
+def contacts_signature():
+    signature = []
+    for path in [csv_file_path, contacts_journal_path()]:
+        try:
+            file_stat = os.stat(path)
+        except FileNotFoundError:
+            if path == csv_file_path:
+                return None
+            signature.append(None)
+            continue
+        signature.append((file_stat.st_mtime_ns, file_stat.st_size))
+    return tuple(signature)
+
+
+# Opening contacts.idx on first use and rebuilding it if contacts.csv has been changed outside the app
+def get_contact_index():
+    global contact_index, contact_search
+    if contact_index is None:
+        contact_index = ContactIndex(csv_file_path[: -len(".csv")] + ".idx")
+    signature = contacts_signature()
+    if not contact_index.matches(signature):
+        # Giving ids to contacts saved before contacts had ids or added to contacts.csv outside the app
+        if signature is not None and not contacts_csv_has_ids():
+            compact_contacts(contact_index.next_id())
+            signature = contacts_signature()
+        contact_index.rebuild(iter_contacts(), signature)
+        # The name search is built again on the next search
+        contact_search = None
+    return contact_index
+
+
+# Casefolding a name and removing its spaces, so "Khatoon Abadi" and "khatoonabadi" are the same word
+def compact_name(name):
+    return "".join(name.casefold().split())
+
+
+# Calculating the edit distance of two words, giving up (returning None) once it is over max_distance
+# The distances of a whole column are kept as bits of two integers (Myers' bit-parallel algorithm), so every letter of
+# other_word takes a few integer operations instead of a loop over the letters of word
+def edit_distance(word, other_word, max_distance):
+    if abs(len(word) - len(other_word)) > max_distance:
+        return None
+    # A common beginning and end don't change the distance, only the rest is compared
+    start = 0
+    shorter_length = min(len(word), len(other_word))
+    while start < shorter_length and word[start] == other_word[start]:
+        start += 1
+    end = 0
+    while end < shorter_length - start and word[-1 - end] == other_word[-1 - end]:
+        end += 1
+    word = word[start : len(word) - end]
+    other_word = other_word[start : len(other_word) - end]
+    if len(word) == 0 or len(other_word) == 0:
+        return max(len(word), len(other_word))
+    # letter -> bits of the positions of the letter in word
+    letter_bits = {}
+    for position, character in enumerate(word):
+        letter_bits[character] = letter_bits.get(character, 0) | (1 << position)
+    all_bits = (1 << len(word)) - 1
+    last_bit = 1 << (len(word) - 1)
+    # Bits of the positions where the distance goes up (positive) or down (negative) from the row above
+    positive = all_bits
+    negative = 0
+    distance = len(word)
+    remaining_letters = len(other_word)
+    for character in other_word:
+        equal = letter_bits.get(character, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | (~(horizontal | positive) & all_bits)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last_bit:
+            distance += 1
+        elif horizontal_negative & last_bit:
+            distance -= 1
+        # Every remaining letter can lower the distance by one at most
+        remaining_letters -= 1
+        if distance - remaining_letters > max_distance:
+            return None
+        horizontal_positive = ((horizontal_positive << 1) | 1) & all_bits
+        horizontal_negative = (horizontal_negative << 1) & all_bits
+        positive = horizontal_negative | (~(vertical | horizontal_positive) & all_bits)
+        negative = horizontal_positive & vertical
+    if distance > max_distance:
+        return None
+    return distance
+
+
+# Class to search contacts by the beginning of their names (completion) and by similar names (typos and
+# different spellings like Khatoon Abadi / Khatoonabadi), kept in memory and updated on every change
+# Only contact keys are kept, the contacts themselves are read from contacts.idx
+class ContactSearch:
+    def __init__(self, contacts=()):
+        # word -> {key of a contact with the word in its name: number of contacts with that key}
+        # Contacts with the same name (ignoring case) share one key, it is kept until the last of them is removed
+        self.word_contacts = {}
+        # All words in sorted order for prefix queries
+        self.sorted_words = []
+        # trigram -> {word length -> words with the trigram}, for fuzzy queries
+        self.trigram_words = {}
+        # word -> number of contacts with the word as a name word (not only as a run-together full name)
+        # Trigrams of a word are added with its first name word use and removed with its last one
+        self.fuzzy_word_counts = {}
+        for contact in contacts:
+            self.insert_contact(contact)
+        self.sorted_words.sort()
+
+    # Casefolding a name and removing its spaces, so "Khatoon Abadi" and "khatoonabadi" are the same word
+    def compact(self, name):
+        return compact_name(name)
+
+    # Splitting a word into trigrams, with ^ and $ marking its beginning and end
+    def trigrams(self, word):
+        word = "^" + word + "$"
+        return set(word[position : position + 3] for position in range(len(word) - 2))
+
+    # Returning the words of a contact: first name, last name and their parts (used for completion and
+    # fuzzy queries) and the full name (only used for completion)
+    def contact_words(self, contact):
+        words = set([self.compact(contact[0]), self.compact(contact[1])])
+        words.update((contact[0] + " " + contact[1]).casefold().split())
+        words.discard("")
+        return words, self.compact(contact[0] + contact[1])
+
+    # Adding a contact, sorted_words is only kept sorted with keep_sorted (it is sorted once at the end while building)
+    def insert_contact(self, contact, keep_sorted=False):
+        contact_key = contact_name_key(contact[0], contact[1])
+        words, full_name = self.contact_words(contact)
+        for word in list(words) + [full_name]:
+            word_contacts = self.word_contacts.get(word)
+            if word_contacts is not None:
+                word_contacts[contact_key] = word_contacts.get(contact_key, 0) + 1
+                continue
+            self.word_contacts[word] = {contact_key: 1}
+            if keep_sorted:
+                bisect.insort(self.sorted_words, word)
+            else:
+                self.sorted_words.append(word)
+        for word in words:
+            fuzzy_word_count = self.fuzzy_word_counts.get(word, 0)
+            self.fuzzy_word_counts[word] = fuzzy_word_count + 1
+            if fuzzy_word_count == 0:
+                for trigram in self.trigrams(word):
+                    self.trigram_words.setdefault(trigram, {}).setdefault(len(word), set()).add(word)
+
+    # Adding a contact
+    def add_contact(self, contact):
+        self.insert_contact(contact, keep_sorted=True)
+
+    # Removing a contact
+    def remove_contact(self, contact):
+        contact_key = contact_name_key(contact[0], contact[1])
+        words, full_name = self.contact_words(contact)
+        for word in list(words) + [full_name]:
+            word_contacts = self.word_contacts.get(word)
+            if word_contacts is None or contact_key not in word_contacts:
+                continue
+            if word_contacts[contact_key] > 1:
+                word_contacts[contact_key] -= 1
+                continue
+            del word_contacts[contact_key]
+            if len(word_contacts) != 0:
+                continue
+            del self.word_contacts[word]
+            position = bisect.bisect_left(self.sorted_words, word)
+            if position < len(self.sorted_words) and self.sorted_words[position] == word:
+                del self.sorted_words[position]
+        for word in words:
+            fuzzy_word_count = self.fuzzy_word_counts.get(word)
+            if fuzzy_word_count is None:
+                continue
+            if fuzzy_word_count > 1:
+                self.fuzzy_word_counts[word] = fuzzy_word_count - 1
+                continue
+            del self.fuzzy_word_counts[word]
+            for trigram in self.trigrams(word):
+                length_words = self.trigram_words[trigram]
+                length_words[len(word)].discard(word)
+                if len(length_words[len(word)]) == 0:
+                    del length_words[len(word)]
+                if len(length_words) == 0:
+                    del self.trigram_words[trigram]
+
+    # Returning up to limit keys of contacts with a name word starting with the prefix
+    def complete(self, prefix, limit=10):
+        prefix = self.compact(prefix)
+        contact_keys = set()
+        if prefix == "":
+            return []
+        position = bisect.bisect_left(self.sorted_words, prefix)
+        while (
+            position < len(self.sorted_words)
+            and self.sorted_words[position].startswith(prefix)
+            and len(contact_keys) < limit
+        ):
+            for contact_key in self.word_contacts[self.sorted_words[position]]:
+                contact_keys.add(contact_key)
+                if len(contact_keys) == limit:
+                    break
+            position += 1
+        return sorted(contact_keys)
+
+    # Returning up to limit (all with None) (contact key, edit distance) pairs for contacts with a name word
+    # similar to the query
+    def fuzzy(self, query, limit=10):
+        query = self.compact(query)
+        if query == "":
+            return []
+        # Names of 10 letters or more may have 2 typos
+        max_distance = 1 if len(query) < 10 else 2
+        lengths = range(len(query) - max_distance, len(query) + max_distance + 1)
+        query_trigrams = self.trigrams(query)
+        # Counting the trigrams each word of a close length shares with the query
+        shared_counts = collections.Counter()
+        for trigram in query_trigrams:
+            length_words = self.trigram_words.get(trigram)
+            if length_words is None:
+                continue
+            for length in lengths:
+                shared_counts.update(length_words.get(length, ()))
+        # Each typo changes at most 3 trigrams, so words sharing fewer trigrams can't be similar enough
+        # and only the remaining few words are compared letter by letter
+        candidate_words = [
+            word
+            for word, shared_count in shared_counts.items()
+            if shared_count >= max(len(query), len(word)) - 3 * max_distance
+        ]
+        similar_words = []
+        for word in candidate_words:
+            distance = edit_distance(query, word, max_distance)
+            if distance is not None:
+                similar_words.append((distance, word))
+        similar_words.sort()
+        # Taking contacts from the most similar words first
+        # A common name can belong to thousands of contacts, only the first ones are sorted
+        results = []
+        found_keys = set()
+        for distance, word in similar_words:
+            word_contacts = self.word_contacts[word]
+            if limit is None:
+                contact_keys = word_contacts
+            else:
+                contact_keys = heapq.nsmallest(limit, word_contacts)
+            for contact_key in contact_keys:
+                if len(results) == limit:
+                    return results
+                if contact_key not in found_keys:
+                    found_keys.add(contact_key)
+                    results.append((contact_key, distance))
+        return results
+
+    # Returning up to limit (contact key, edit distance) pairs for contacts with a similar last name and first name
+    def fuzzy_name(self, first_name, last_name, limit=10):
+        first_name = self.compact(first_name)
+        max_distance = 1 if len(first_name) < 10 else 2
+        results = []
+        for contact_key, distance in self.fuzzy(last_name, None):
+            first_distance = edit_distance(
+                first_name, self.compact(contact_key.split("\n")[0]), max_distance
+            )
+            if first_distance is not None:
+                results.append((distance + first_distance, contact_key))
+        return [(contact_key, distance) for distance, contact_key in heapq.nsmallest(limit, results)]
+
+    # Returning up to limit contact keys for a query, the ones starting with it first and then the similar ones
+    def search(self, query, limit=10):
+        contact_keys = self.complete(query, limit)
+        for contact_key, distance in self.fuzzy(query, limit):
+            if len(contact_keys) == limit:
+                break
+            if contact_key not in contact_keys:
+                contact_keys.append(contact_key)
+        return contact_keys
+
+
+# Building the contact search once per session (and again if contacts.csv has been changed outside the app)
+def get_contact_search():
+    global contact_search
+    get_contact_index()
+    if contact_search is None:
+        contact_search = ContactSearch(iter_contacts())
+    return contact_search
+
+
+# Finding contacts by the beginning of their names or by similar names
+def find_contacts_by_name(query, limit=10):
+    return get_contact_index().find_by_keys(get_contact_search().search(query, limit))
+
+
+# Finding contacts with a first and last name similar to the given ones
+def find_similar_contacts(first_name, last_name, limit=10):
+    contact_keys = [
+        contact_key
+        for contact_key, distance in get_contact_search().fuzzy_name(first_name, last_name, limit)
+    ]
+    return get_contact_index().find_by_keys(contact_keys)
+
+
+# Keeping the contact search (if it has been built) up to date with a change made by the app
+def update_contact_search(removed_contacts, added_contacts):
+    if contact_search is None:
+        return None
+    for contact in removed_contacts:
+        contact_search.remove_contact(contact)
+    for contact in added_contacts:
+        contact_search.add_contact(contact)
+
+
+# Remembering the current contacts.csv as the one contacts.idx belongs to (after the app itself has changed it)
+def remember_contacts_signature():
+    contact_index.set_signature(contacts_signature())
+
+
+# Saving new contacts: they get the next ids and are appended to contacts.csv, saved contacts aren't touched
+def save_new_contacts(contacts):
+    index = get_contact_index()
+    first_id = index.reserve_ids(len(contacts))
+    for contact_id, contact in enumerate(contacts, first_id):
+        contact[5:] = [str(contact_id)]
+    with open(csv_file_path, "a", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerows(contacts)
+    append_contact_changes([("create", contact) for contact in contacts])
+    index.add_contacts(contacts)
+    update_contact_search([], contacts)
+    remember_contacts_signature()
+
+
+# Saving an edited contact with one "edit" record in contacts.journal, it keeps the id of the old contact
+def save_edited_contact(old_contact, new_contact):
+    index = get_contact_index()
+    new_contact = new_contact[:5] + [old_contact[5]]
+    append_contacts_journal([["edit", new_contact[5]] + new_contact[:5]])
+    append_contact_changes([("edit", new_contact)])
+    index.update_contact(new_contact)
+    update_contact_search([old_contact], [new_contact])
+    remember_contacts_signature()
+    return new_contact
+
+
+# Saving a deleted contact with one "delete" record in contacts.journal
+def save_deleted_contact(contact):
+    index = get_contact_index()
+    append_contacts_journal([["delete", contact[5]]])
+    append_contact_changes([("delete", contact)])
+    index.remove_contact(contact)
+    update_contact_search([contact], [])
+    remember_contacts_signature()
 
 
 # Displaying main menu
@@ -59,6 +1179,10 @@ def display_menu():
     print("5. Delete a specific contact")
     print("6. Delete all saved contacts")
     print("7. Export contacts(VCARD) *.vcf file extension")
+    # Quit keeps its number, so input piped into the menu still works after options are added
+    print("9. Import contacts from a *.vcf or *.csv file")
+    print("10. Search contacts")
+    print("11. Find and merge duplicate contacts")
     print("8. Quit")
 
 
@@ -103,17 +1227,18 @@ def create_contact(edit):
         break
     # Checking whether contact is already saved or not
     if not edit:
-        data = []
-        with open(csv_file_path, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if (
-                    row[0].casefold() == first_name.casefold()
-                    and row[1].casefold() == last_name.casefold()
-                ):
-                    data = row
-                    break
-        if len(data) != 0:
+        data = get_contact_index().find_by_name(first_name, last_name)
+        if data is None:
+            # Warning about contacts with a similar name, they may be the same person spelled differently
+            for contact in find_similar_contacts(first_name, last_name, 3):
+                print(
+                    termcolor.colored(
+                        f"A contact with a similar name is already saved: {contact[0]} {contact[1]} ({contact[2]})",
+                        "yellow",
+                        "on_black",
+                    )
+                )
+        if data is not None:
             print(
                 termcolor.colored(
                     f"Contact: {data[0]} {data[1]} is already saved!", "red", "on_black"
@@ -140,7 +1265,7 @@ def create_contact(edit):
             phone = input("Please enter the new phone number: ")
         else:
             phone = input(
-                "Please enter the contact's phone number(for example: 09123456789): "
+                "Please enter the contact's phone number(for example: 09123456789 or +447911123456): "
             )
         if phone == "" and not edit:
             print(
@@ -151,9 +1276,7 @@ def create_contact(edit):
             continue
         if phone == "" and edit:
             break
-        pattern = r"^09\d{9}$"
-        match = re.match(pattern, phone)
-        if match:
+        if parse_phone(phone) is not None:
             break
         else:
             print(
@@ -175,10 +1298,10 @@ def create_contact(edit):
             phone2 = input("Please enter the new second phone number: ")
         else:
             phone2 = input(
-                "Please enter the contact's second phone number(for example: 09123456789): "
+                "Please enter the contact's second phone number(for example: 09123456789 or +447911123456): "
             )
         restart_flag = False
-        if phone2 == phone and not edit:
+        if phone2 != "" and normalize_phone(phone2) == normalize_phone(phone) and not edit:
             print(
                 termcolor.colored(
                     "You entered the contact's number again in the second number",
@@ -206,9 +1329,7 @@ def create_contact(edit):
             continue
         if phone2 == "":
             break
-        pattern = r"^09\d{9}$"
-        match = re.match(pattern, phone2)
-        if match:
+        if parse_phone(phone2) is not None:
             break
         else:
             print(
@@ -234,8 +1355,7 @@ def create_contact(edit):
             )
         if email == "":
             break
-        pattern = f"([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\"([]!#-[^-~ \t]|(\\[\t -~]))+\")@([0-9A-Za-z]([0-9A-Za-z-]{0,61}[0-9A-Za-z])?(\.[0-9A-Za-z]([0-9A-Za-z-]{0,61}[0-9A-Za-z])?)*|\[((25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])(\.(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])){3}|IPv6:((((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){6}|::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){5}|[0-9A-Fa-f]{0,4}::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){4}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):)?(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){3}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,2}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){2}|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,3}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,4}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::)((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3})|(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])(\.(25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])){3})|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,5}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3})|(((0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}):){0,6}(0|[1-9A-Fa-f][0-9A-Fa-f]{0,3}))?::)|(?!IPv6:)[0-9A-Za-z-]*[0-9A-Za-z]:[!-Z^-~]+)])"
-        match = re.match(pattern, email)
+        match = email_pattern.match(email)
         if match:
             break
         else:
@@ -252,9 +1372,7 @@ def create_contact(edit):
     if edit:
         return data
 
-    with open(csv_file_path, "a", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(data)
+    save_new_contacts([data])
 
     print(
         termcolor.colored(
@@ -279,18 +1397,6 @@ def edit_contact(data=[]):
     if data == None:
         return None
 
-    with open(csv_file_path, "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        csv_data = []
-        for row in csv_reader:
-            if (
-                row[0].casefold() != data[0].casefold()
-                and row[1].casefold() != data[1].casefold()
-            ):
-                csv_data.append(row)
-            else:
-                csv_data.append([])
-
     print(
         termcolor.colored(
             "You can press Enter to skip editing a specific data", "yellow", "on_black"
@@ -303,7 +1409,7 @@ def edit_contact(data=[]):
         if new_data[i] == "":
             new_data[i] = data[i]
 
-    if new_data == data:
+    if new_data == data[:5]:
         print(
             termcolor.colored(
                 "You have not edited any information. Editing has been cancelled",
@@ -313,14 +1419,8 @@ def edit_contact(data=[]):
         )
         return None
 
-    for i in range(len(csv_data)):
-        if csv_data[i] == []:
-            csv_data[i] = new_data
-
-    with open(csv_file_path, "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        for item in csv_data:
-            csv_writer.writerow(item)
+    # Only the edited contact is saved again, found by its id
+    new_data = save_edited_contact(data, new_data)
 
     print(
         termcolor.colored(
@@ -336,6 +1436,22 @@ def edit_contact(data=[]):
 # Function to view a specific contact
 def view_specific_contact(data=[]):
     if len(data) == 0:
+        while True:
+            user_input = input(
+                "How do you want to find the contact? (N name, P phone number, E email address, default N): "
+            )
+            if user_input.casefold() in ["p", "e"]:
+                data = find_contact_by_phone_or_email(user_input.casefold() == "p")
+                if data is None:
+                    return None
+                return view_specific_contact(data)
+            if user_input == "" or user_input.casefold() == "n":
+                break
+            print(
+                termcolor.colored(
+                    "Invalid choice. Please enter a valid option.", "red", "on_black"
+                )
+            )
         while True:
             first_name = input(
                 "Please enter the contact's first name(for example: Amin): "
@@ -360,17 +1476,8 @@ def view_specific_contact(data=[]):
                 )
                 continue
             break
-        data = []
-        with open(csv_file_path, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if (
-                    row[0].casefold() == first_name.casefold()
-                    and row[1].casefold() == last_name.casefold()
-                ):
-                    data = row
-                    break
-        if len(data) == 0:
+        data = get_contact_index().find_by_name(first_name, last_name)
+        if data is None:
             print(
                 termcolor.colored(
                     "There is no contact with such first and last name!",
@@ -378,7 +1485,13 @@ def view_specific_contact(data=[]):
                     "on_black",
                 )
             )
-            return None
+            # Offering contacts with a similar name (typos and different spellings)
+            similar_contacts = find_similar_contacts(first_name, last_name, 5)
+            if len(similar_contacts) == 0:
+                return None
+            data = choose_contact(similar_contacts, "Did you mean one of these contacts?")
+            if data is None:
+                return None
 
     # Contact information output
     print(termcolor.colored("Contact Information: ", "green", "on_black"))
@@ -394,72 +1507,193 @@ def view_specific_contact(data=[]):
     return data
 
 
-# Function to view all saved contacts
-def view_all_contacts():
-    # Loading all contacts.csv data to a list
-    data = []
-    with open(csv_file_path, "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        for row in csv_reader:
-            data.append(row)
-
-    # Removing the title's
-    data.pop(0)
-
-    # Output to show all saved contacts
-    if len(data) == 0:
+# Function to find a contact by phone number or email address, choosing one if several contacts share it
+def find_contact_by_phone_or_email(by_phone):
+    while True:
+        if by_phone:
+            value = input("Please enter the phone number(for example: 09123456789 or +447911123456): ")
+        else:
+            value = input(
+                "Please enter the email address(for example: aminkhatoonabadi@gmail.com): "
+            )
+        if value.strip() == "":
+            print(termcolor.colored("This cannot be empty!", "yellow", "on_black"))
+            continue
+        break
+    if by_phone:
+        contacts = get_contact_index().find_by_phone(value)
+    else:
+        contacts = get_contact_index().find_by_email(value)
+    if len(contacts) == 0:
         print(
-            termcolor.colored("No contacts have been saved yet!", "yellow", "on_black")
+            termcolor.colored(
+                f"There is no contact with such {'phone number' if by_phone else 'email address'}!",
+                "red",
+                "on_black",
+            )
         )
         return None
-    contacts_num = len(data)
-    print(
-        termcolor.colored(
-            f"There is {contacts_num} contacts have been saved with below details:",
-            "green",
-            "on_black",
-        )
-    )
-    print(termcolor.colored("`" * 3, "cyan", "on_black"))
-    for item in data:
-        output = "Contact: "
-        first_name = termcolor.colored("First name:", "green") + " " + item[0]
-        last_name = termcolor.colored("Last name:", "green") + " " + item[1]
-        phone = termcolor.colored("Phone number:", "blue") + " " + item[2]
-        output += f"{first_name}{termcolor.colored(',', 'green')} {last_name}{termcolor.colored(',', 'green')} {phone}"
-        if item[3] != "":
-            phone2 = (
-                termcolor.colored("Second phone number:", "light_blue") + " " + item[3]
-            )
-            output += f"{termcolor.colored(',', 'green')} {phone2}"
-        if item[4] != "":
-            email = termcolor.colored("Email:", "light_green") + " " + item[4]
-            output += f"{termcolor.colored(',', 'green')} {email}"
-        print(output)
-    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    if len(contacts) == 1:
+        return contacts[0]
+    return choose_contact(contacts, f"{len(contacts)} contacts have been found:")
 
 
-# Function to delete a specific contact(with id or first_name, last_name)
-def delete_specific_contact():
-    data = view_specific_contact()
+# Function to choose one of several contacts by its number, returning None if the user skips choosing
+def choose_contact(contacts, title):
+    print(termcolor.colored(title, "green", "on_black"))
+    for number, contact in enumerate(contacts, 1):
+        print(f"{number}. {contact[0]} {contact[1]} ({contact[2]})")
+    while True:
+        user_input = input("Please enter the number of the contact(or press Enter to skip): ")
+        if user_input == "":
+            return None
+        if user_input.isdigit() and 1 <= int(user_input) <= len(contacts):
+            return contacts[int(user_input) - 1]
+        print(
+            termcolor.colored(
+                "Invalid choice. Please enter a valid option.", "red", "on_black"
+            )
+        )
 
-    if data == None:
+
+# Function to search contacts by the beginning of their names or by similar names
+def search_contacts():
+    while True:
+        query = input("Please enter a name or the beginning of a name: ")
+        if query.strip() == "":
+            print(termcolor.colored("Search query cannot be empty!", "yellow", "on_black"))
+            continue
+        break
+    contacts = find_contacts_by_name(query)
+    if len(contacts) == 0:
+        print(termcolor.colored("No contacts matched your search!", "yellow", "on_black"))
         return None
+    data = choose_contact(contacts, f"{len(contacts)} contacts matched your search:")
+    if data is not None:
+        view_specific_contact(data)
 
-    with open(csv_file_path, "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        csv_data = []
-        for row in csv_reader:
-            if (
-                row[0].casefold() != data[0].casefold()
-                and row[1].casefold() != data[1].casefold()
-            ):
-                csv_data.append(row)
 
-    with open(csv_file_path, "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        for item in csv_data:
-            csv_writer.writerow(item)
+# Function to view all saved contacts, sorted, filtered and one page at a time
+def view_all_contacts():
+    # Loading all saved contacts (kept until they change)
+    data, sort_orders = get_contact_listing()
+
+    # Output to show all saved contacts
+    if len(data) == 0:
+        print(
+            termcolor.colored("No contacts have been saved yet!", "yellow", "on_black")
+        )
+        return None
+    contacts_num = len(data)
+    print(
+        termcolor.colored(
+            f"There is {contacts_num} contacts have been saved",
+            "green",
+            "on_black",
+        )
+    )
+
+    # Getting the sort order, the filters and the page size
+    while True:
+        user_input = input(
+            "How do you want to sort contacts? (S saved order, L last name, F first name, E email address, default S): "
+        ).casefold()
+        if user_input in ["", "s", "l", "f", "e"]:
+            sort_by = {"": None, "s": None, "l": "last_name", "f": "first_name", "e": "email"}[user_input]
+            break
+        print(
+            termcolor.colored(
+                "Invalid choice. Please enter a valid option.", "red", "on_black"
+            )
+        )
+    while True:
+        user_input = input(
+            "Which contacts do you want to see? (A all, P with a second phone number, E with an email address, default A): "
+        ).casefold()
+        if user_input in ["", "a", "p", "e"]:
+            required_column = {"": None, "a": None, "p": 3, "e": 4}[user_input]
+            break
+        print(
+            termcolor.colored(
+                "Invalid choice. Please enter a valid option.", "red", "on_black"
+            )
+        )
+    query = input(
+        "Please enter a text the contacts must contain(or press Enter to skip): "
+    ).casefold()
+    while True:
+        user_input = input("How many contacts do you want to see per page? (default 20): ")
+        if user_input == "":
+            page_size = 20
+        elif user_input.isdigit() and int(user_input) > 0:
+            page_size = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Page size must be a positive number!", "red", "on_black"
+                )
+            )
+            continue
+        break
+
+    positions = sorted_contact_positions(data, sort_orders, sort_by)
+    if required_column is not None or query != "":
+        shown_positions = []
+        for position in positions:
+            contact = data[position]
+            if required_column is not None and contact[required_column] == "":
+                continue
+            if query != "" and query not in "\n".join(contact[:5]).casefold():
+                continue
+            shown_positions.append(position)
+        positions = shown_positions
+        print(
+            termcolor.colored(
+                f"{len(positions)} contacts match your filters", "green", "on_black"
+            )
+        )
+    if len(positions) == 0:
+        return None
+
+    # Showing one page at a time
+    pages_num = (len(positions) + page_size - 1) // page_size
+    page = 1
+    while True:
+        print(termcolor.colored(f"Page {page} of {pages_num}", "cyan"))
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        page_positions = positions[(page - 1) * page_size : page * page_size]
+        print("\n".join(format_contact_line(data[position]) for position in page_positions))
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        if pages_num == 1:
+            return None
+        user_input = input(
+            "Press Enter for the next page, enter a page number to jump to it, or Q to quit: "
+        )
+        if user_input.casefold() == "q":
+            return None
+        elif user_input == "":
+            if page == pages_num:
+                return None
+            page += 1
+        elif user_input.isdigit() and 1 <= int(user_input) <= pages_num:
+            page = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Invalid choice. Please enter a valid option.", "red", "on_black"
+                )
+            )
+
+
+# Function to delete a specific contact(with id or first_name, last_name)
+def delete_specific_contact():
+    data = view_specific_contact()
+
+    if data == None:
+        return None
+
+    # Only the deleted contact is removed, found by its id
+    save_deleted_contact(data)
 
     print(
         termcolor.colored(
@@ -474,18 +1708,10 @@ def delete_specific_contact():
 def delete_all_contacts():
     user_input = input("Do you want to delete all your saved contacts? (Y yes, N no): ")
     if user_input.casefold() == "y" or user_input.casefold() == "yes":
-        # Loading all contacts.csv data to a list
-        data = []
-        with open(csv_file_path, "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                data.append(row)
-
-        # Removing the title's
-        data.pop(0)
+        contacts_num = get_contact_index().count()
 
         # Output to show all saved contacts
-        if len(data) == 0:
+        if contacts_num == 0:
             print(
                 termcolor.colored(
                     "No contacts have been saved yet!", "yellow", "on_black"
@@ -493,11 +1719,13 @@ def delete_all_contacts():
             )
             return None
 
-        # Removing all contacts(recreating contacts.csv)
+        # Removing all contacts(recreating contacts.csv without a journal) and rebuilding the empty index
         contacts_csv_create()
+        append_contact_changes([("delete_all", None)])
+        get_contact_index()
         print(
             termcolor.colored(
-                f"{len(data)} saved contacts have been deleted", "green", "on_black"
+                f"{contacts_num} saved contacts have been deleted", "green", "on_black"
             )
         )
 
@@ -511,18 +1739,900 @@ def delete_all_contacts():
         )
 
 
+# Escaping a value for a vCard property (backslash, comma, semicolon and new lines)
+def vcard_escape(value):
+    return (
+        value.replace("\\", "\\\\")
+        .replace(",", "\\,")
+        .replace(";", "\\;")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+# Converting a contact row to a vCard 4.0 card (lines end with CRLF as vCard requires)
+def contact_to_vcard(row):
+    first_name, last_name, phone, phone2, email = (row + [""] * 5)[:5]
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:4.0",
+        f"N:{vcard_escape(last_name)};{vcard_escape(first_name)};;;",
+        f"FN:{vcard_escape((first_name + ' ' + last_name).strip())}",
+    ]
+    # The same contact always gets the same UID, so synced copies are updated instead of added again
+    if len(row) > 5 and row[5] != "":
+        lines.append(f"UID:{contact_uid(row[5])}")
+    for number in [phone, phone2]:
+        if number != "":
+            # tel: URIs are written with the global (E.164) number if it is valid
+            lines.append(f"TEL;VALUE=uri;TYPE=cell:tel:{vcard_escape(parse_phone(number) or number)}")
+    if email != "":
+        lines.append(f"EMAIL:{vcard_escape(email)}")
+    lines.append("END:VCARD")
+    return "\r\n".join(lines) + "\r\n"
+
+
+# Building the UID of a contact from its id (a name-based UUID URN)
+def contact_uid(contact_id):
+    return uuid.uuid5(uuid.NAMESPACE_URL, "contacts-app:contact:" + contact_id).urn
+
+
+# Reading the changes after the sequence number since (or all saved contacts if since is None) to export,
+# returning them and the last sequence number
+# vCard has no way to tell that a contact has been deleted, so ValueError is raised instead of leaving out
+# deletions from a vCard export (and if the changes after since are no longer in contacts.changes)
+def read_export_changes(since=None, export_format="vcf"):
+    last_seq = max(read_last_change_seq(), get_contact_index().last_change_seq())
+    if since is None:
+        changes = (
+            {"seq": last_seq, "action": "create", "id": row[5], "contact": dict(zip(contact_titles[:5], row[:5]))}
+            for row in iter_contacts()
+        )
+        return changes, last_seq
+    changes, last_seq = read_changes_since(since, last_seq)
+    deletions_num = sum(1 for change in changes if change["action"] not in ["create", "edit"])
+    if export_format == "vcf" and deletions_num != 0:
+        raise ValueError(
+            f"{deletions_num} deletions after {since} can't be written as vCard, export them with --format jsonl"
+        )
+    return changes, last_seq
+
+
+# Writing changes from read_export_changes to an open file as vCard cards or as JSON Lines,
+# returning the number of written changes
+def export_changes(output_file, changes, export_format="vcf"):
+    changes_num = 0
+    for change in changes:
+        if export_format == "jsonl":
+            output_file.write(json.dumps(change, ensure_ascii=False) + "\n")
+        else:
+            output_file.write(
+                contact_to_vcard([change["contact"][title] for title in contact_titles[:5]] + [change["id"]])
+            )
+        changes_num += 1
+    return changes_num
+
+
+# Writing contacts to a .vcf file (or to numbered shard files of contacts_per_file contacts) one card at a time
+# Returning the number of exported contacts and the paths of the written files
+def export_vcards(contacts, vcf_path, contacts_per_file=0):
+    vcf_file = None
+    vcf_paths = []
+    contacts_num = 0
+    base_path, extension = os.path.splitext(vcf_path)
+    try:
+        for row in contacts:
+            if vcf_file is None or (
+                contacts_per_file > 0 and contacts_num % contacts_per_file == 0
+            ):
+                if vcf_file is not None:
+                    vcf_file.close()
+                if contacts_per_file > 0:
+                    vcf_paths.append(f"{base_path}_{len(vcf_paths) + 1}{extension}")
+                else:
+                    vcf_paths.append(vcf_path)
+                # A large buffer, so cards are written to disk in big chunks
+                vcf_file = open(
+                    vcf_paths[-1], "w", newline="", encoding="utf-8", buffering=1024 * 1024
+                )
+            vcf_file.write(contact_to_vcard(row))
+            contacts_num += 1
+    finally:
+        if vcf_file is not None:
+            vcf_file.close()
+    return contacts_num, vcf_paths
+
+
 # Function to export contacts to be saved in other applications with compatibility
 def export_contacts():
-    # TODO
-    pass
+    print(
+        termcolor.colored(
+            "Contacts are exported as vCard 4.0 files in the app folder",
+            "yellow",
+            "on_black",
+        )
+    )
+    file_name = input("Please enter the export file name(default: contacts.vcf): ")
+    if file_name == "":
+        file_name = "contacts.vcf"
+    if not file_name.casefold().endswith(".vcf"):
+        file_name += ".vcf"
+    while True:
+        print(
+            termcolor.colored(
+                "If you want all contacts in one file just skip by pressing Enter",
+                "yellow",
+                "on_black",
+            )
+        )
+        user_input = input("How many contacts do you want in each file? ")
+        if user_input == "":
+            contacts_per_file = 0
+        elif user_input.isdigit() and int(user_input) > 0:
+            contacts_per_file = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Number of contacts must be a positive number!", "yellow", "on_black"
+                )
+            )
+            continue
+        break
+
+    start_time = time.perf_counter()
+    contacts_num, vcf_paths = export_vcards(
+        iter_contacts(), str(file_location) + os.sep + file_name, contacts_per_file
+    )
+    elapsed_time = time.perf_counter() - start_time
+
+    if contacts_num == 0:
+        print(
+            termcolor.colored("No contacts have been saved yet!", "yellow", "on_black")
+        )
+        return None
+    print(
+        termcolor.colored(
+            f"{contacts_num} contacts have been exported to {len(vcf_paths)} file(s):",
+            "green",
+            "on_black",
+        )
+    )
+    for vcf_path in vcf_paths:
+        print(vcf_path)
+    print(
+        termcolor.colored(
+            f"Export took {elapsed_time:.2f} seconds ({contacts_num / max(elapsed_time, 1e-9):.0f} contacts per second)",
+            "green",
+        )
+    )
+
+
+# Columns of foreign CSV files (lowercase, without spaces and punctuation) mapped to the contacts.csv columns
+import_csv_columns = {
+    "firstname": 0,
+    "givenname": 0,
+    "first": 0,
+    "lastname": 1,
+    "familyname": 1,
+    "surname": 1,
+    "last": 1,
+    "phone": 2,
+    "phonenumber": 2,
+    "mobile": 2,
+    "mobilephone": 2,
+    "cellphone": 2,
+    "phone1": 2,
+    "phone1value": 2,
+    "primaryphone": 2,
+    "phone2": 3,
+    "phone2value": 3,
+    "secondphone": 3,
+    "secondphonenumber": 3,
+    "homephone": 3,
+    "otherphone": 3,
+    "email": 4,
+    "emailaddress": 4,
+    "email1": 4,
+    "email1value": 4,
+}
+
+
+# Reading [first_name, last_name, phone, phone2, email] rows from a CSV file with a header row
+# Files without a known header are read as contacts.csv columns in order
+def read_csv_contacts(import_file):
+    csv_reader = csv.reader(import_file)
+    titles = next(csv_reader, None)
+    if titles is None:
+        return None
+    columns = {}
+    for position, title in enumerate(titles):
+        column = import_csv_columns.get(re.sub(r"[^0-9a-z]", "", title.casefold()))
+        if column is not None and column not in columns.values():
+            columns[position] = column
+    if len(columns) == 0:
+        columns = {position: position for position in range(5)}
+        # The first row is a contact, not titles
+        csv_reader = itertools.chain([titles], csv_reader)
+    for row in csv_reader:
+        if len(row) == 0:
+            continue
+        contact = [""] * 5
+        for position, column in columns.items():
+            if position < len(row):
+                contact[column] = row[position].strip()
+        yield contact
+
+
+# Reverting vCard escaping in a property value
+def vcard_unescape(value):
+    return re.sub(
+        r"\\(.)",
+        lambda match: "\n" if match.group(1) in "nN" else match.group(1),
+        value,
+    )
+
+
+# Splitting a vCard value at the separators that aren't escaped
+def vcard_split(value, separator):
+    return [
+        vcard_unescape(part) for part in re.split(r"(?<!\\)" + re.escape(separator), value)
+    ]
+
+
+# Reading vCard properties line by line, joining folded lines (continuation lines start with a space or a tab)
+def iter_vcard_lines(import_file):
+    line = None
+    for next_line in import_file:
+        next_line = next_line.rstrip("\r\n")
+        if next_line[:1] in [" ", "\t"] and line is not None:
+            line += next_line[1:]
+            continue
+        if line is not None:
+            yield line
+        line = next_line
+    if line is not None:
+        yield line
+
+
+# Reading [first_name, last_name, phone, phone2, email] rows from a vCard (.vcf) file, one card at a time
+def read_vcard_contacts(import_file):
+    contact = None
+    for line in iter_vcard_lines(import_file):
+        name, separator, value = line.partition(":")
+        if separator == "":
+            continue
+        # Dropping the parameters (TYPE=...) and the group (item1.) of the property name
+        name = name.split(";")[0].split(".")[-1].upper()
+        if name == "BEGIN" and value.upper() == "VCARD":
+            contact = {"N": None, "FN": "", "TEL": [], "EMAIL": ""}
+        elif contact is None:
+            continue
+        elif name == "END" and value.upper() == "VCARD":
+            if contact["N"] is not None and any(contact["N"][:2]):
+                last_name, first_name = (contact["N"] + ["", ""])[:2]
+            else:
+                first_name, _, last_name = contact["FN"].partition(" ")
+            phones = contact["TEL"] + ["", ""]
+            yield [first_name.strip(), last_name.strip(), phones[0], phones[1], contact["EMAIL"]]
+            contact = None
+        elif name == "N":
+            contact["N"] = vcard_split(value, ";")
+        elif name == "FN":
+            contact["FN"] = vcard_unescape(value)
+        elif name == "TEL":
+            phone = vcard_unescape(value)
+            if phone.casefold().startswith("tel:"):
+                phone = phone[len("tel:") :]
+            contact["TEL"].append(phone.strip())
+        elif name == "EMAIL" and contact["EMAIL"] == "":
+            contact["EMAIL"] = vcard_unescape(value).strip()
+
+
+# Checking an imported contact with the same rules as create_contact, returning the problem or None
+# Phone numbers without a calling code are checked as numbers of country (default_phone_country if it isn't given)
+def check_imported_contact(contact, country=None):
+    if contact[0] == "" or contact[1] == "":
+        return "first name or last name is empty"
+    if parse_phone(contact[2], country) is None:
+        return "phone number format is not correct"
+    if contact[3] != "" and parse_phone(contact[3], country) is None:
+        return "second phone number format is not correct"
+    if contact[4] != "" and not email_pattern.match(contact[4]):
+        return "email address format is not correct"
+    return None
+
+
+# Importing contacts from a .vcf or .csv file, skipping invalid contacts and the ones already saved
+# All accepted contacts get ids and are appended to contacts.csv at once at the end
+def import_contacts(import_path, import_format="auto"):
+    if import_format == "auto":
+        import_format = "vcf" if import_path.casefold().endswith(".vcf") else "csv"
+
+    # Saved contact names (case-insensitive) are read once, new contacts are added to the same set
+    saved_names = set(
+        (row[0].casefold(), row[1].casefold()) for row in iter_contacts()
+    )
+    accepted_contacts = []
+    duplicates_num = 0
+    invalid_contacts = []
+    with open(import_path, "r", newline="", encoding="utf-8-sig") as import_file:
+        if import_format == "vcf":
+            contacts = read_vcard_contacts(import_file)
+        else:
+            contacts = read_csv_contacts(import_file)
+        for contact in contacts:
+            # Removing spaces and dashes people use to group phone digits
+            for column in [2, 3]:
+                contact[column] = contact[column].translate(phone_separators)
+            if contact[3] != "" and normalize_phone(contact[3]) == normalize_phone(contact[2]):
+                contact[3] = ""
+            problem = check_imported_contact(contact)
+            if problem is not None:
+                invalid_contacts.append((contact, problem))
+                continue
+            name_key = (contact[0].casefold(), contact[1].casefold())
+            if name_key in saved_names:
+                duplicates_num += 1
+                continue
+            saved_names.add(name_key)
+            accepted_contacts.append(contact)
+
+    save_new_contacts(accepted_contacts)
+    return len(accepted_contacts), duplicates_num, invalid_contacts
+
+
+# Printing the result of an import
+def print_import_result(imported_num, duplicates_num, invalid_contacts):
+    print(
+        termcolor.colored(
+            f"{imported_num} contacts have been imported", "green", "on_black"
+        )
+    )
+    if duplicates_num != 0:
+        print(
+            termcolor.colored(
+                f"{duplicates_num} contacts were already saved and have been skipped",
+                "yellow",
+                "on_black",
+            )
+        )
+    if len(invalid_contacts) != 0:
+        print(
+            termcolor.colored(
+                f"{len(invalid_contacts)} contacts are not valid and have been skipped:",
+                "red",
+                "on_black",
+            )
+        )
+        # Showing only the first invalid contacts, a big file can have thousands of them
+        for contact, problem in invalid_contacts[:10]:
+            print(f"{contact[0]} {contact[1]} {contact[2]}: {problem}")
+        if len(invalid_contacts) > 10:
+            print(f"... and {len(invalid_contacts) - 10} more")
+
+
+# Function to import contacts from a .vcf or .csv file saved by other applications
+def import_contacts_menu():
+    while True:
+        import_path = input("Please enter the path of the .vcf or .csv file: ")
+        if not os.path.isfile(import_path):
+            print(
+                termcolor.colored(
+                    "There is no file with such a path!", "yellow", "on_black"
+                )
+            )
+            continue
+        break
+    print_import_result(*import_contacts(import_path))
+
+
+# Building the sound-alike code of a name like Soundex (without cutting it to 4 characters): its first letter and
+# the codes of the consonants after it, letters of other alphabets are kept as they are
+def sound_alike_code(name):
+    name = compact_name(name)
+    if name == "":
+        return ""
+    # The code of the first letter is only needed to drop the same code right after it
+    codes = (name[0].translate(sound_codes) or "0") + name[1:].translate(sound_codes)
+    codes = sound_code_repeat_pattern.sub(r"\1", codes)
+    return name[0] + codes[1:].replace("0", "")
+
+
+# Class to group possible duplicate contacts by blocking keys: contacts sharing a normalized phone number, an email
+# address or a name (case-insensitive) are grouped, and names are only compared with the names that have the same
+# sound-alike key, so the work stays near-linear instead of comparing all pairs of contacts
+# Contacts are numbered in the order they are added, the groups are kept with union-find
+class ContactClusters:
+    # Blocks with more contacts than this (a company phone number, a very common name) are skipped,
+    # they would make one huge group and comparing all their names would be slow
+    max_block_size = 50
+
+    def __init__(self):
+        # contact number -> number of the contact it has been grouped with
+        self.parents = []
+        # blocking key -> contact number, or the list of contact numbers once several contacts have the key
+        self.blocks = {}
+        # sound-alike codes of first and last name -> name, or the list of different names once several names
+        # have the codes, so "Khatoon Abadi" and "Khatonabady" are compared with each other
+        self.sound_blocks = {}
+        # first or last name -> sound-alike code, names repeat a lot in an address book
+        self.name_codes = {}
+
+    # Adding a value to a block, a block that has become too big stops growing
+    def add_to_block(self, blocks, key, value):
+        members = blocks.get(key)
+        if members is None:
+            blocks[key] = value
+        elif type(members) is list:
+            if len(members) <= self.max_block_size:
+                members.append(value)
+        else:
+            blocks[key] = [members, value]
+
+    # Adding the next contact to its blocks
+    def add_contact(self, contact):
+        contact_number = len(self.parents)
+        self.parents.append(contact_number)
+        keys = set()
+        for phone in [normalize_phone(contact[2]), normalize_phone(contact[3])]:
+            if phone != "":
+                keys.add("p" + phone)
+        email = contact[4].strip().lower()
+        if email != "":
+            keys.add("e" + email)
+        name = compact_name(contact[0]) + "\n" + compact_name(contact[1])
+        if "n" + name not in self.blocks:
+            self.add_to_block(
+                self.sound_blocks, self.name_code(contact[0]) + "\n" + self.name_code(contact[1]), name
+            )
+        keys.add("n" + name)
+        for key in keys:
+            self.add_to_block(self.blocks, key, contact_number)
+
+    # Returning the sound-alike code of a name, calculated once for every different name
+    def name_code(self, name):
+        code = self.name_codes.get(name)
+        if code is None:
+            code = self.name_codes[name] = sound_alike_code(name)
+        return code
+
+    # Returning the trigrams of a name like ContactSearch.trigrams, a trigram that repeats gets a + for every
+    # earlier time, so one typo still changes at most 3 of them
+    def trigrams(self, name):
+        name = "^" + name + "$"
+        trigram_list = [name[position : position + 3] for position in range(len(name) - 2)]
+        trigrams = set(trigram_list)
+        if len(trigrams) == len(trigram_list):
+            return trigrams
+        trigrams = set()
+        for trigram in trigram_list:
+            while trigram in trigrams:
+                trigram += "+"
+            trigrams.add(trigram)
+        return trigrams
+
+    # Finding the first contact of the group of a contact
+    def find(self, contact_number):
+        parents = self.parents
+        while parents[contact_number] != contact_number:
+            parents[contact_number] = parents[parents[contact_number]]
+            contact_number = parents[contact_number]
+        return contact_number
+
+    # Grouping two contacts (and their groups) together, the earlier contact stays first
+    def join(self, contact_number, other_contact_number):
+        root = self.find(contact_number)
+        other_root = self.find(other_contact_number)
+        if root > other_root:
+            root, other_root = other_root, root
+        if root != other_root:
+            self.parents[other_root] = root
+
+    # Returning the number of the first contact with a name
+    def first_contact_number(self, name):
+        members = self.blocks["n" + name]
+        return members[0] if type(members) is list else members
+
+    # Grouping the contacts of every block and the contacts with similar names in every sound-alike block,
+    # returning the groups of more than one contact as sorted lists of contact numbers
+    # Names in a sound-alike block are compared pair by pair, so pairs that are already in one group are skipped
+    # and pairs sharing too few trigrams (each typo changes at most 3) are not compared letter by letter
+    def groups(self):
+        for members in self.blocks.values():
+            if type(members) is list and len(members) <= self.max_block_size:
+                for contact_number in members[1:]:
+                    self.join(members[0], contact_number)
+        for names in self.sound_blocks.values():
+            if type(names) is not list or len(names) > self.max_block_size:
+                continue
+            contact_numbers = [self.first_contact_number(name) for name in names]
+            name_trigrams = [self.trigrams(name) for name in names]
+            # First contacts of the groups of the names, kept up to date while names of this block are joined
+            roots = [self.find(contact_number) for contact_number in contact_numbers]
+            lengths = [len(name) for name in names]
+            for position, name in enumerate(names):
+                length = lengths[position]
+                max_distance = 1 if length < 10 else 2
+                trigrams = name_trigrams[position]
+                for other_position in range(position + 1, len(names)):
+                    if roots[other_position] == roots[position]:
+                        continue
+                    other_length = lengths[other_position]
+                    if other_length > length + max_distance or other_length < length - max_distance:
+                        continue
+                    shared_num = len(trigrams & name_trigrams[other_position])
+                    if shared_num < max(length, other_length) - 3 * max_distance:
+                        continue
+                    if edit_distance(name, names[other_position], max_distance) is not None:
+                        self.join(roots[position], roots[other_position])
+                        root = self.find(roots[position])
+                        joined_roots = (roots[position], roots[other_position])
+                        roots = [root if other_root in joined_roots else other_root for other_root in roots]
+        groups = {}
+        for contact_number in range(len(self.parents)):
+            root = self.find(contact_number)
+            if root != contact_number:
+                groups.setdefault(root, [root]).append(contact_number)
+        return [groups[root] for root in sorted(groups)]
+
+
+# Finding groups of possible duplicate contacts, returning lists of contacts (in the order they were saved)
+# Saved contacts are read twice, once for grouping them and once for collecting the contacts of the groups
+def find_duplicate_contacts():
+    clusters = ContactClusters()
+    for contact in iter_contacts():
+        clusters.add_contact(contact)
+    groups = clusters.groups()
+    group_numbers = {}
+    for group_number, group in enumerate(groups):
+        for contact_number in group:
+            group_numbers[contact_number] = group_number
+    duplicate_groups = [[] for group in groups]
+    for contact_number, contact in enumerate(iter_contacts()):
+        group_number = group_numbers.get(contact_number)
+        if group_number is not None:
+            duplicate_groups[group_number].append(contact)
+    return duplicate_groups
+
+
+# Merging a group of duplicate contacts into the first one: its name and id are kept, different phone numbers and
+# email addresses of the others fill its empty fields, returning the merged contact and the values that didn't fit
+def merge_duplicate_contacts(contacts):
+    phones = []
+    normalized_phones = set()
+    emails = []
+    for contact in contacts:
+        for phone in contact[2:4]:
+            if phone != "" and normalize_phone(phone) not in normalized_phones:
+                normalized_phones.add(normalize_phone(phone))
+                phones.append(phone)
+        if contact[4] != "" and contact[4].lower() not in [email.lower() for email in emails]:
+            emails.append(contact[4])
+    merged_contact = contacts[0][:2] + (phones + ["", ""])[:2] + (emails + [""])[:1] + contacts[0][5:]
+    return merged_contact, phones[2:] + emails[1:]
+
+
+# Checking whether all contacts of a group have the same name (ignoring case and spaces), groups joined only through a
+# shared phone number or email address may hold different people
+def duplicate_names_match(contacts):
+    return len(set(compact_name(contact[0] + contact[1]) for contact in contacts)) == 1
+
+
+# Saving merged groups in one pass: the records of all groups are appended to contacts.journal,
+# which is then compacted into contacts.csv once
+def save_merged_contacts(merged_groups):
+    if len(merged_groups) == 0:
+        return None
+    index = get_contact_index()
+    records = []
+    changes = []
+    removed_contacts = []
+    merged_contacts = []
+    for contacts, merged_contact in merged_groups:
+        records.append(["edit", merged_contact[5]] + merged_contact[:5])
+        changes.append(("edit", merged_contact))
+        for contact in contacts[1:]:
+            records.append(["delete", contact[5]])
+            changes.append(("delete", contact))
+        removed_contacts.extend(contacts[1:])
+        merged_contacts.append(merged_contact)
+    append_contacts_journal(records)
+    if os.path.exists(contacts_journal_path()):
+        compact_contacts()
+    append_contact_changes(changes)
+    index.apply_changes(merged_contacts, removed_contacts)
+    update_contact_search(
+        [contact for contacts, merged_contact in merged_groups for contact in contacts], merged_contacts
+    )
+    remember_contacts_signature()
+
+
+# Printing a group of possible duplicate contacts and the contact they would be merged into
+def print_duplicate_group(group_number, contacts, merged_contact, dropped_values):
+    print(termcolor.colored(f"Group {group_number}:", "cyan", "on_black"))
+    for contact in contacts:
+        print("  " + ", ".join(value for value in contact[:5] if value != ""))
+    print(
+        termcolor.colored("  Merged contact:", "green")
+        + " "
+        + ", ".join(value for value in merged_contact[:5] if value != "")
+    )
+    if len(dropped_values) != 0:
+        print(
+            termcolor.colored("  Not kept (no empty field left):", "yellow")
+            + " "
+            + ", ".join(dropped_values)
+        )
+
+
+# Function to find possible duplicate contacts and merge the groups the user chooses
+def dedupe_contacts_menu():
+    groups = find_duplicate_contacts()
+    if len(groups) == 0:
+        print(
+            termcolor.colored("No duplicate contacts have been found!", "yellow", "on_black")
+        )
+        return None
+    print(
+        termcolor.colored(
+            f"{len(groups)} groups of possible duplicate contacts have been found",
+            "green",
+            "on_black",
+        )
+    )
+    merged_groups = []
+    merge_all = False
+    for group_number, contacts in enumerate(groups, 1):
+        merged_contact, dropped_values = merge_duplicate_contacts(contacts)
+        if not merge_all:
+            print_duplicate_group(group_number, contacts, merged_contact, dropped_values)
+            while True:
+                user_input = input(
+                    "Do you want to merge these contacts? (Y yes, N no, A yes to all, Q stop): "
+                ).casefold()
+                if user_input in ["y", "yes", "n", "no", "a", "all", "q", "quit"]:
+                    break
+                print(
+                    termcolor.colored(
+                        "Invalid choice. Please enter a valid option.", "red", "on_black"
+                    )
+                )
+            if user_input in ["q", "quit"]:
+                break
+            if user_input in ["n", "no"]:
+                continue
+            merge_all = user_input in ["a", "all"]
+        merged_groups.append((contacts, merged_contact))
+    if len(merged_groups) == 0:
+        print(termcolor.colored("No contacts have been merged", "yellow", "on_black"))
+        return None
+    save_merged_contacts(merged_groups)
+    print(
+        termcolor.colored(
+            f"{len(merged_groups)} groups of duplicate contacts have been merged",
+            "green",
+            "on_black",
+        )
+    )
+
+
+# Checking contacts with the same rules as create_contact, the saved contacts or the contacts of a .csv file
+# (with the same columns import accepts), returning the number of checked contacts and the invalid ones
+# as (id of the saved contact or row number in the file, contact, problem)
+def validate_contacts(csv_path=None, country=None):
+    invalid_contacts = []
+    contacts_num = 0
+    if csv_path is None:
+        for contact in iter_contacts():
+            contacts_num += 1
+            problem = check_imported_contact(contact, country)
+            if problem is not None:
+                invalid_contacts.append((contact[5], contact[:5], problem))
+        return contacts_num, invalid_contacts
+    with open(csv_path, "r", newline="", encoding="utf-8-sig") as csv_file:
+        # Row numbers count the titles as row 1
+        for row_num, contact in enumerate(read_csv_contacts(csv_file), 2):
+            contacts_num += 1
+            problem = check_imported_contact(contact, country)
+            if problem is not None:
+                invalid_contacts.append((row_num, contact, problem))
+    return contacts_num, invalid_contacts
+
+
+# Building the parser for the non-interactive command line
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Manage contacts without the interactive menu. Without a command the menu is shown."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    import_parser = subparsers.add_parser(
+        "import", help="import contacts from a vCard (.vcf) or CSV file"
+    )
+    import_parser.add_argument("file", help="file to import")
+    import_parser.add_argument(
+        "--format",
+        choices=["auto", "vcf", "csv"],
+        default="auto",
+        help="format of the imported file (default: by file extension)",
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="export all contacts, or only the changes after a sequence number, as vCard or JSON Lines"
+    )
+    export_parser.add_argument("file", nargs="?", default="-", help="file to write, - for stdout (default)")
+    export_parser.add_argument(
+        "--since", type=int, metavar="SEQ", help="only export the changes after this sequence number"
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=["vcf", "jsonl"],
+        default="vcf",
+        help="format of the export (default: vcf), deletions are only exported as jsonl",
+    )
+
+    lookup_parser = subparsers.add_parser(
+        "lookup", help="print the contacts with a phone number, email address or name as CSV"
+    )
+    lookup_group = lookup_parser.add_mutually_exclusive_group(required=True)
+    lookup_group.add_argument("--phone", help="phone number (phone or phone2)")
+    lookup_group.add_argument("--email", help="email address")
+    lookup_group.add_argument("--name", nargs=2, metavar=("FIRST", "LAST"), help="first and last name")
+
+    search_parser = subparsers.add_parser(
+        "search", help="print the contacts whose names start with or are similar to the query as CSV"
+    )
+    search_parser.add_argument("query", nargs="+", help="name or the beginning of a name")
+    search_parser.add_argument("-n", "--limit", type=int, default=10, help="number of contacts (default 10)")
+
+    dedupe_parser = subparsers.add_parser(
+        "dedupe", help="print groups of possible duplicate contacts as CSV, or merge them"
+    )
+    dedupe_parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="merge every group whose contacts have the same name into its first contact, reporting them on stderr",
+    )
+    dedupe_parser.add_argument(
+        "--force", action="store_true", help="with --merge, also merge groups whose contacts have different names"
+    )
+
+    validate_parser = subparsers.add_parser(
+        "validate", help="print the invalid contacts of contacts.csv (or another .csv file) as CSV"
+    )
+    validate_parser.add_argument("file", nargs="?", help=".csv file to check instead of the saved contacts")
+    validate_parser.add_argument(
+        "--country",
+        choices=sorted(phone_rules),
+        default=default_phone_country,
+        help=f"country of phone numbers without a calling code (default {default_phone_country})",
+    )
+    return parser
+
+
+# Running one command line command, returning the exit code
+def run_command(arguments):
+    if arguments.command == "import":
+        try:
+            imported_num, duplicates_num, invalid_contacts = import_contacts(
+                arguments.file, arguments.format
+            )
+        except OSError as error:
+            print(f"Error: can't read {arguments.file}: {error.strerror}", file=sys.stderr)
+            return 1
+        print_import_result(imported_num, duplicates_num, invalid_contacts)
+        return 1 if len(invalid_contacts) != 0 else 0
+    if arguments.command == "export":
+        try:
+            changes, last_seq = read_export_changes(arguments.since, arguments.format)
+        except ValueError as error:
+            print(f"Error: {error}", file=sys.stderr)
+            return 1
+        if arguments.file == "-":
+            changes_num = export_changes(sys.stdout, changes, arguments.format)
+        else:
+            with open(arguments.file, "w", newline="", encoding="utf-8") as output_file:
+                changes_num = export_changes(output_file, changes, arguments.format)
+        # The summary goes to stderr, so stdout stays a clean export
+        print(
+            f"{changes_num} {'contacts' if arguments.since is None else 'changes'} exported, "
+            f"export the next changes with --since {last_seq}",
+            file=sys.stderr,
+        )
+        return 0
+    if arguments.command == "lookup":
+        if arguments.phone is not None:
+            contacts = get_contact_index().find_by_phone(arguments.phone)
+        elif arguments.email is not None:
+            contacts = get_contact_index().find_by_email(arguments.email)
+        else:
+            contacts = [get_contact_index().find_by_name(*arguments.name)]
+            contacts = [contact for contact in contacts if contact is not None]
+        csv_writer = csv.writer(sys.stdout)
+        csv_writer.writerow(contact_titles)
+        csv_writer.writerows(contacts)
+        return 1 if len(contacts) == 0 else 0
+    if arguments.command == "search":
+        contacts = find_contacts_by_name(" ".join(arguments.query), arguments.limit)
+        csv_writer = csv.writer(sys.stdout)
+        csv_writer.writerow(contact_titles)
+        csv_writer.writerows(contacts)
+        return 1 if len(contacts) == 0 else 0
+    if arguments.command == "dedupe":
+        groups = find_duplicate_contacts()
+        if arguments.merge:
+            merged_groups = []
+            skipped_num = 0
+            # What happens to every group goes to stderr, nothing is merged or dropped silently
+            for group_number, contacts in enumerate(groups, 1):
+                names = [" ".join(value for value in contact[:2] if value != "") for contact in contacts]
+                if not arguments.force and not duplicate_names_match(contacts):
+                    skipped_num += 1
+                    print(
+                        f"Group {group_number} skipped, the names differ: {' / '.join(names)}",
+                        file=sys.stderr,
+                    )
+                    continue
+                merged_contact, dropped_values = merge_duplicate_contacts(contacts)
+                merged_groups.append((contacts, merged_contact))
+                print(
+                    f"Group {group_number} merged into contact {merged_contact[5]}: {' / '.join(names)}",
+                    file=sys.stderr,
+                )
+                if len(dropped_values) != 0:
+                    print(
+                        f"  Not kept (no empty field left): {', '.join(dropped_values)}", file=sys.stderr
+                    )
+            save_merged_contacts(merged_groups)
+            skipped_message = ""
+            if skipped_num != 0:
+                skipped_message = f", {skipped_num} groups with different names skipped (merge them with --force)"
+            print(
+                f"{len(merged_groups)} groups of duplicate contacts have been merged{skipped_message}",
+                file=sys.stderr,
+            )
+        else:
+            csv_writer = csv.writer(sys.stdout)
+            csv_writer.writerow(["group"] + contact_titles)
+            for group_number, contacts in enumerate(groups, 1):
+                for contact in contacts:
+                    csv_writer.writerow([group_number] + contact)
+        return 0
+    if arguments.command == "validate":
+        start_time = time.perf_counter()
+        try:
+            contacts_num, invalid_contacts = validate_contacts(arguments.file, arguments.country)
+        except OSError as error:
+            print(f"Error: can't read {arguments.file}: {error.strerror}", file=sys.stderr)
+            return 1
+        seconds = time.perf_counter() - start_time
+        csv_writer = csv.writer(sys.stdout)
+        csv_writer.writerow(
+            ["row" if arguments.file is not None else "id"] + contact_titles[:5] + ["problem"]
+        )
+        for position, contact, problem in invalid_contacts:
+            csv_writer.writerow([position] + contact + [problem])
+        # The summary goes to stderr, so stdout stays a clean CSV file
+        print(
+            f"{contacts_num} contacts checked in {seconds:.2f} seconds "
+            f"({contacts_num / max(seconds, 0.000001):.0f} contacts per second), "
+            f"{len(invalid_contacts)} invalid",
+            file=sys.stderr,
+        )
+        return 1 if len(invalid_contacts) != 0 else 0
 
 
 if __name__ == "__main__":
     csv_file_path = str(file_location) + "contacts.csv"
+    arguments = build_argument_parser().parse_args()
 
     if not contacts_csv_exists():
         contacts_csv_create()
 
+    # Running a single command without the interactive menu
+    if arguments.command is not None:
+        sys.exit(run_command(arguments))
+
     while True:
         display_menu()
         choice = input("Enter your choice: ")
@@ -542,6 +2652,12 @@ if __name__ == "__main__":
             delete_all_contacts()
         elif choice == "7":
             export_contacts()
+        elif choice == "9":
+            import_contacts_menu()
+        elif choice == "10":
+            search_contacts()
+        elif choice == "11":
+            dedupe_contacts_menu()
         elif choice == "8":
             print("Goodbye!")
             break
@@ -0,0 +1,65 @@
+# Description: Tests for contacts_app.py, every test works on a fresh contacts.csv in a temporary folder.
+# Usage: python -m unittest test_contacts_app
+# Importing required modules
+# os module for building file paths
+import os
+
+# shutil module for removing the temporary test folders
+import shutil
+
+# sys module for importing contacts_app from this folder
+import sys
+
+# tempfile module for creating temporary test folders
+import tempfile
+
+# unittest module for running the tests
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import contacts_app
+
+
+# Tests for the name search (ContactSearch) kept up to date by the saving functions
+class ContactSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="contacts_app_test_")
+        contacts_app.csv_file_path = self.folder + os.sep + "contacts.csv"
+        contacts_app.contact_index = None
+        contacts_app.contact_search = None
+        contacts_app.contacts_csv_create()
+
+    def tearDown(self):
+        if contacts_app.contact_index is not None:
+            contacts_app.contact_index.close()
+        contacts_app.contact_index = None
+        contacts_app.contact_search = None
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    # Two contacts with the same name (ignoring case) share one key, deleting one of them must keep the other
+    def test_deleting_contact_keeps_contact_with_same_name(self):
+        contacts_app.save_new_contacts(
+            [["Ali", "Reza", "09121111111", "", "", ""], ["ali", "reza", "09122222222", "", "", ""]]
+        )
+        # Building the search before the change, so it is updated instead of built again
+        self.assertEqual(len(contacts_app.find_contacts_by_name("ali")), 1)
+        contacts_app.save_deleted_contact(contacts_app.get_contact_index().select_contacts("id = ?", (1,))[0])
+        for query in ["ali", "reza", "aly"]:
+            contacts = contacts_app.find_contacts_by_name(query)
+            self.assertEqual([contact[5] for contact in contacts], ["2"], query)
+
+    # Renaming one of two contacts with the same name must keep the other one under the old name
+    def test_renaming_contact_keeps_contact_with_same_name(self):
+        contacts_app.save_new_contacts(
+            [["Ali", "Reza", "09121111111", "", "", ""], ["ali", "reza", "09122222222", "", "", ""]]
+        )
+        self.assertEqual(len(contacts_app.find_contacts_by_name("ali")), 1)
+        old_contact = contacts_app.get_contact_index().select_contacts("id = ?", (1,))[0]
+        contacts_app.save_edited_contact(old_contact, ["Sara", "Karimi", "09121111111", "", ""])
+        self.assertEqual([contact[5] for contact in contacts_app.find_contacts_by_name("reza")], ["2"])
+        self.assertEqual([contact[5] for contact in contacts_app.find_contacts_by_name("sara")], ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@
 # Github Link: https://github.com/mavericane/
 # Website Link: https://mavericane.ir
 # Description: This file is a simple note-taking app. View, Create, Edit, and Delete text notes in txt file format(*.txt).
-# Version 5: Create a new note, edit a note, view a specific note, view all saved notes, delete a specific note, and delete all saved notes.
+# Version 5.4: Create a new note, edit a note (write it again, append lines, or replace lines), view a specific note (big notes page by page), view all saved notes, delete a specific note, delete all saved notes, search notes, and view the history of a note and restore its earlier versions. Quit keeps menu number 7, options added after it get the next numbers.
 # Importing required modules
 # platform module for detecting os
 import platform
@@ -13,9 +13,839 @@ import os
 # termcolor module for colorizing outputs
 import termcolor
 
-# re(regex) module for listing only *.txt files
+# re(regex) module for splitting notes into search words
 import re
 
+# sys module for the exit status of the non-interactive command line
+import sys
+
+# argparse module for the non-interactive command line
+import argparse
+
+# sqlite3 module for the search index (notes/.notes.idx)
+import sqlite3
+
+# collections module for counting the words of a note
+import collections
+
+# heapq module for picking the best search results without sorting all of them
+import heapq
+
+# math module for the BM25 ranking of search results
+import math
+
+# json module for saving the note catalog (notes/.notes.catalog)
+import json
+
+# time module for showing when notes were modified and for checking how recent the notes folder mtime is
+import time
+
+# mmap module for reading big notes page by page without loading them
+import mmap
+
+# array module for the line offsets of big notes
+import array
+
+# shutil module for fitting pages of big notes to the terminal height
+import shutil
+
+# bisect module for finding the block of a line of a big note
+import bisect
+
+# locale module for encoding replaced lines like text files written by the app
+import locale
+
+# hashlib module for the content hashes of note versions
+import hashlib
+
+# zlib module for compressing note versions
+import zlib
+
+# struct module for encoding the deltas between note versions
+import struct
+
+# difflib module for comparing note versions line by line
+import difflib
+
+# tempfile module for decompressing note versions without loading them
+import tempfile
+
+
+# Iterating over the *.txt files of the notes folder (nothing if the folder doesn't exist)
+# is_file() is answered from the directory listing itself on most systems, so no file is stat-ed here
+def scan_notes(folder):
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(".txt") and entry.is_file():
+                    yield entry
+    except FileNotFoundError:
+        return None
+
+
+# Class to keep the titles, sizes and mtimes of all notes in notes/.notes.catalog, so listing notes doesn't list and
+# stat the whole notes folder every time
+# The folder is listed again only when its mtime changed (a note was created, deleted or renamed) and then only the new
+# notes are stat-ed, the app updates the catalog itself whenever it saves or deletes a note
+# Notes changed in place by other programs keep their old size and mtime until refresh(rescan=True)
+class NoteCatalog:
+    # Version of the catalog file, older files are ignored and the folder is listed again
+    version = 1
+    # A folder mtime this close to the listing time isn't trusted, a change in the same clock tick would be missed
+    racy_seconds = 2
+
+    def __init__(self, folder, path):
+        self.folder = folder
+        self.path = path
+        # title -> (size, mtime_ns)
+        self.notes = {}
+        self.folder_mtime_ns = None
+        # sort order -> sorted titles, built on first use and dropped when the catalog changes
+        self.sorted_titles_cache = {}
+        self.load()
+
+    # Loading the saved catalog, a missing or damaged catalog file is the same as an empty catalog
+    def load(self):
+        try:
+            with open(self.path, "r") as catalog_file:
+                catalog = json.load(catalog_file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(catalog, dict) or catalog.get("version") != self.version:
+            return None
+        self.notes = {title: tuple(metadata) for title, metadata in catalog["notes"].items()}
+        self.folder_mtime_ns = catalog["folder_mtime_ns"]
+
+    # Saving the catalog in place, so the notes folder mtime doesn't change because of the catalog itself
+    def save(self):
+        if not os.path.exists(self.folder):
+            return None
+        with open(self.path, "w") as catalog_file:
+            json.dump(
+                {"version": self.version, "folder_mtime_ns": self.folder_mtime_ns, "notes": self.notes},
+                catalog_file,
+                separators=(",", ":"),
+            )
+
+    # Returning the mtime of the notes folder, or None if it doesn't exist
+    def get_folder_mtime_ns(self):
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # Bringing the catalog up to date with the notes folder, rescan=True also stat-s the notes already in the catalog
+    # Returning the number of notes added to and removed from the catalog
+    def refresh(self, rescan=False):
+        folder_mtime_ns = self.get_folder_mtime_ns()
+        if not rescan and folder_mtime_ns is not None and folder_mtime_ns == self.folder_mtime_ns:
+            return 0, 0
+        listing_time_ns = time.time_ns()
+        old_notes = self.notes
+        notes = {}
+        added_num = 0
+        for entry in scan_notes(self.folder):
+            title = entry.name[: -len(".txt")]
+            metadata = old_notes.get(title)
+            if metadata is None or rescan:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                metadata = (stat.st_size, stat.st_mtime_ns)
+                if title not in old_notes:
+                    added_num += 1
+            notes[title] = metadata
+        removed_num = len(old_notes) - (len(notes) - added_num)
+        if folder_mtime_ns is not None and listing_time_ns - folder_mtime_ns < self.racy_seconds * 10**9:
+            folder_mtime_ns = None
+        changed = notes != old_notes or folder_mtime_ns != self.folder_mtime_ns
+        self.notes = notes
+        self.folder_mtime_ns = folder_mtime_ns
+        if changed:
+            self.sorted_titles_cache = {}
+            self.save()
+        return added_num, removed_num
+
+    # Updating the size and mtime of a note after the app saved it
+    def note_saved(self, title):
+        try:
+            stat = os.stat(self.folder + title + ".txt")
+        except FileNotFoundError:
+            return self.note_removed(title)
+        if title not in self.notes:
+            # The folder listing changed, it is checked again on the next refresh
+            self.folder_mtime_ns = None
+        self.notes[title] = (stat.st_size, stat.st_mtime_ns)
+        self.sorted_titles_cache = {}
+        self.save()
+
+    # Removing a note from the catalog after the app deleted it
+    def note_removed(self, title):
+        self.notes_removed([title])
+
+    # Removing many notes from the catalog after the app deleted them, saving the catalog once
+    def notes_removed(self, titles):
+        removed_num = 0
+        for title in titles:
+            if self.notes.pop(title, None) is not None:
+                removed_num += 1
+        if removed_num != 0:
+            self.folder_mtime_ns = None
+            self.sorted_titles_cache = {}
+            self.save()
+
+    # Returning the titles of all notes sorted by "title", "size" (biggest first) or "modified" (newest first)
+    def sorted_titles(self, sort_by="title"):
+        if sort_by not in self.sorted_titles_cache:
+            if sort_by == "title":
+                titles = sorted(self.notes)
+            elif sort_by == "size":
+                titles = sorted(self.notes, key=lambda title: (-self.notes[title][0], title))
+            else:
+                titles = sorted(self.notes, key=lambda title: (-self.notes[title][1], title))
+            self.sorted_titles_cache[sort_by] = titles
+        return self.sorted_titles_cache[sort_by]
+
+
+# Class to find the lines of a big note without reading the whole note
+# The note is memory-mapped and read in blocks of block_bytes bytes, for every block the number and byte offset of the
+# first line after it are kept, so jumping to a line only reads the lines from the start of its block
+# Blocks are read only as far as needed, so memory use depends on the page shown and not on the size of the note
+# The offsets are saved in notes/.lines/<title>.lines and used again as long as the size and mtime of the note match
+class NoteLineIndex:
+    # Version of the .lines files, files of other versions are ignored
+    version = 1
+    block_bytes = 64 * 1024
+
+    def __init__(self, note_path, cache_path):
+        self.cache_path = cache_path
+        self.note_file = open(note_path, "rb")
+        stat = os.fstat(self.note_file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        # Empty files can't be memory-mapped
+        if self.size != 0:
+            self.data = mmap.mmap(self.note_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b""
+        # Line numbers (from 0) of the known line starts and their byte offsets
+        self.lines = array.array("Q", [0])
+        self.offsets = array.array("Q", [0])
+        # Number of lines, known once the end of the note has been reached
+        self.lines_num = None
+        self.changed = False
+        self.load()
+
+    # Loading the saved offsets if they belong to this version of the note
+    def load(self):
+        header = array.array("Q")
+        lines = array.array("Q")
+        offsets = array.array("Q")
+        try:
+            with open(self.cache_path, "rb") as cache_file:
+                header.fromfile(cache_file, 5)
+                if list(header[:3]) != [self.version, self.size, self.mtime_ns]:
+                    return None
+                lines.fromfile(cache_file, header[4])
+                offsets.fromfile(cache_file, header[4])
+        except (FileNotFoundError, EOFError):
+            return None
+        self.lines = lines
+        self.offsets = offsets
+        self.lines_num = header[3] - 1 if header[3] != 0 else None
+
+    # Saving the offsets found so far, atomically, only for notes bigger than one block
+    def save(self):
+        if not self.changed or len(self.offsets) == 1:
+            return None
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        header = array.array(
+            "Q",
+            [
+                self.version,
+                self.size,
+                self.mtime_ns,
+                self.lines_num + 1 if self.lines_num is not None else 0,
+                len(self.offsets),
+            ],
+        )
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "wb") as cache_file:
+            header.tofile(cache_file)
+            self.lines.tofile(cache_file)
+            self.offsets.tofile(cache_file)
+        os.replace(temp_path, self.cache_path)
+        self.changed = False
+
+    # Reading the next block after the last known line start, up to the end of a line
+    def scan_next_block(self):
+        start = self.offsets[-1]
+        offset = start
+        newlines_num = 0
+        last_newline = -1
+        # A line longer than a block makes the block longer
+        while offset < self.size and last_newline == -1:
+            end = min(offset + self.block_bytes, self.size)
+            block = self.data[offset:end]
+            newlines_num += block.count(b"\n")
+            position = block.rfind(b"\n")
+            if position != -1:
+                last_newline = offset + position
+            offset = end
+        if last_newline != -1 and last_newline + 1 < self.size:
+            self.lines.append(self.lines[-1] + newlines_num)
+            self.offsets.append(last_newline + 1)
+        else:
+            # The end of the note, a last line without a newline counts too
+            unterminated_line = 1 if last_newline == -1 and start < self.size else 0
+            self.lines_num = self.lines[-1] + newlines_num + unterminated_line
+        self.changed = True
+
+    # Returning the byte offset of a line (numbered from 0), or None if the note has fewer lines
+    def line_offset(self, line):
+        # The block of the line must have been read to its end
+        while self.lines_num is None and self.lines[-1] <= line:
+            self.scan_next_block()
+        if self.lines_num is not None and line >= self.lines_num:
+            return None
+        block = bisect.bisect_right(self.lines, line) - 1
+        offset = self.offsets[block]
+        for _ in range(line - self.lines[block]):
+            offset = self.data.find(b"\n", offset) + 1
+        return offset
+
+    # Iterating over up to count lines starting from a line (numbered from 0)
+    # Lines longer than max_line_bytes are cut, so a page never holds more than count * max_line_bytes bytes
+    def read_lines(self, first_line, count, max_line_bytes=None):
+        offset = self.line_offset(first_line)
+        if offset is None:
+            return None
+        for _ in range(count):
+            if offset >= self.size:
+                break
+            newline = self.data.find(b"\n", offset)
+            end = self.size if newline == -1 else newline
+            if max_line_bytes is not None and end - offset > max_line_bytes:
+                yield self.data[offset : offset + max_line_bytes].decode(errors="replace") + " ..."
+            else:
+                yield self.data[offset:end].decode(errors="replace").rstrip("\r")
+            offset = end + 1
+
+    # Saving the offsets and closing the note
+    def close(self):
+        self.save()
+        if self.size != 0:
+            self.data.close()
+        self.note_file.close()
+
+
+# Class to keep every saved version of every note in notes/.history
+# Versions are stored once per content in objects/<2 hex>/<sha256 of the content> files: either the whole content
+# (a snapshot) or the byte ranges copied from the previous version plus the inserted bytes (a delta), zlib compressed
+# Deltas are computed line by line (or given by the caller for appends and replaced lines), so storage grows with the
+# size of changes; a snapshot is stored instead once the deltas since the last snapshot are bigger than the note or the
+# chain of deltas gets max_delta_chain long, which keeps restoring fast after thousands of versions
+# logs/<title>.log has one JSON line per revision: rev, time, action, hash (null for deletions), size and mtime_ns
+class NoteHistory:
+    # Longest chain of deltas before the next version is stored as a snapshot
+    max_delta_chain = 1000
+    # Notes bigger than this many bytes are not compared line by line, their versions are stored as snapshots unless
+    # the caller gives the changed byte ranges
+    max_diff_bytes = 256 * 1024
+    # Deltas since the last snapshot may add up to this many bytes before a snapshot is stored even for small notes
+    min_chain_bytes = 4096
+    chunk_bytes = 1024 * 1024
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = folder + ".history"
+
+    def note_path(self, title):
+        return f"{self.folder}" + f"{title}.txt"
+
+    def log_path(self, title):
+        return os.path.join(self.path, "logs", f"{title}.log")
+
+    def object_path(self, content_hash):
+        return os.path.join(self.path, "objects", content_hash[:2], content_hash)
+
+    # Returning all revisions of a note, oldest first
+    def read_log(self, title):
+        try:
+            with open(self.log_path(title), "r") as log_file:
+                return [json.loads(line) for line in log_file if line.strip() != ""]
+        except FileNotFoundError:
+            return []
+
+    # Returning the last revision of a note (or None) by reading only the end of its log
+    def last_entry(self, title):
+        try:
+            with open(self.log_path(title), "rb") as log_file:
+                size = log_file.seek(0, os.SEEK_END)
+                log_file.seek(max(size - 4096, 0))
+                lines = log_file.read().splitlines()
+        except FileNotFoundError:
+            return None
+        for line in reversed(lines):
+            if line.strip() != b"":
+                return json.loads(line)
+        return None
+
+    # Adding a revision to the log of a note
+    def append_entry(self, title, action, content_hash, stat=None):
+        last_entry = self.last_entry(title)
+        entry = {
+            "rev": last_entry["rev"] + 1 if last_entry is not None else 1,
+            "time": round(time.time(), 3),
+            "action": action,
+            "hash": content_hash,
+            "size": stat.st_size if stat is not None else 0,
+            "mtime_ns": stat.st_mtime_ns if stat is not None else 0,
+        }
+        os.makedirs(os.path.dirname(self.log_path(title)), exist_ok=True)
+        with open(self.log_path(title), "a") as log_file:
+            log_file.write(json.dumps(entry) + "\n")
+        return entry
+
+    # Calculating the sha256 of a file, reading it in chunks
+    def hash_file(self, path):
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(self.chunk_bytes), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    # Returning the header of an object ({"type", "size", and "base", "depth", "chain_bytes" for deltas})
+    def read_header(self, content_hash):
+        with open(self.object_path(content_hash), "rb") as object_file:
+            return json.loads(object_file.readline())
+
+    # Writing an object atomically: a JSON header line and the compressed chunks
+    def write_object(self, content_hash, header, chunks):
+        path = self.object_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressor = zlib.compressobj()
+        with open(path + ".tmp", "wb") as object_file:
+            object_file.write(json.dumps(header).encode() + b"\n")
+            for chunk in chunks:
+                object_file.write(compressor.compress(chunk))
+            object_file.write(compressor.flush())
+        os.replace(path + ".tmp", path)
+
+    # Encoding delta operations: ("c", start, length) copies bytes of the base version, ("i", data) inserts bytes
+    def encode_delta(self, operations):
+        for operation in operations:
+            if operation[0] == "c":
+                yield b"c" + struct.pack(">QQ", operation[1], operation[2])
+            else:
+                yield b"i" + struct.pack(">Q", len(operation[1]))
+                yield operation[1]
+
+    # Decoding the delta operations of an object
+    def decode_delta(self, data):
+        operations = []
+        position = 0
+        while position < len(data):
+            if data[position : position + 1] == b"c":
+                start, length = struct.unpack_from(">QQ", data, position + 1)
+                operations.append(("c", start, length))
+                position += 17
+            else:
+                (length,) = struct.unpack_from(">Q", data, position + 1)
+                operations.append(("i", data[position + 9 : position + 9 + length]))
+                position += 9 + length
+        return operations
+
+    # Comparing two versions line by line, returning the delta operations that turn the old one into the new one
+    def diff(self, old_content, new_content):
+        old_lines = old_content.splitlines(keepends=True)
+        new_lines = new_content.splitlines(keepends=True)
+        old_offsets = [0]
+        for line in old_lines:
+            old_offsets.append(old_offsets[-1] + len(line))
+        operations = []
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == "equal":
+                operations.append(("c", old_offsets[old_start], old_offsets[old_end] - old_offsets[old_start]))
+            elif tag in ["replace", "insert"]:
+                operations.append(("i", b"".join(new_lines[new_start:new_end])))
+        return operations
+
+    # Storing the current content of a note as an object, as a delta against base_hash when that is cheaper
+    # operations are the changed byte ranges if the caller knows them, otherwise the two versions are compared
+    def store(self, content_hash, note_path, size, base_hash, operations):
+        if base_hash is not None and operations is None and size <= self.max_diff_bytes:
+            base_header = self.read_header(base_hash)
+            if base_header["size"] <= self.max_diff_bytes:
+                with open(note_path, "rb") as note_file:
+                    operations = self.diff(self.read_version(base_hash), note_file.read())
+        if base_hash is not None and operations is not None:
+            base_header = self.read_header(base_hash)
+            depth = base_header.get("depth", 0) + 1
+            delta_bytes = sum(17 if operation[0] == "c" else 9 + len(operation[1]) for operation in operations)
+            chain_bytes = base_header.get("chain_bytes", 0) + delta_bytes
+            if depth <= self.max_delta_chain and chain_bytes <= max(size, self.min_chain_bytes):
+                header = {
+                    "type": "delta",
+                    "size": size,
+                    "base": base_hash,
+                    "depth": depth,
+                    "chain_bytes": chain_bytes,
+                }
+                self.write_object(content_hash, header, self.encode_delta(operations))
+                return None
+        with open(note_path, "rb") as note_file:
+            self.write_object(
+                content_hash,
+                {"type": "snapshot", "size": size},
+                iter(lambda: note_file.read(self.chunk_bytes), b""),
+            )
+
+    # Returning the content of a version as pieces: (None, start, length) for bytes of the snapshot at the start of its
+    # chain of deltas or (data, start, length) for inserted bytes, and the hash of that snapshot
+    # Only the small delta operations are composed, so the cost doesn't depend on the size of the note
+    def read_pieces(self, content_hash):
+        deltas = []
+        while True:
+            with open(self.object_path(content_hash), "rb") as object_file:
+                header = json.loads(object_file.readline())
+                if header["type"] == "snapshot":
+                    break
+                deltas.append(self.decode_delta(zlib.decompress(object_file.read())))
+            content_hash = header["base"]
+        pieces = [(None, 0, header["size"])] if header["size"] != 0 else []
+        for operations in reversed(deltas):
+            starts = []
+            position = 0
+            for piece in pieces:
+                starts.append(position)
+                position += piece[2]
+            new_pieces = []
+            for operation in operations:
+                if operation[0] == "i":
+                    if len(operation[1]) != 0:
+                        new_pieces.append((operation[1], 0, len(operation[1])))
+                    continue
+                start = operation[1]
+                end = operation[1] + operation[2]
+                if start == end:
+                    continue
+                first = bisect.bisect_right(starts, start) - 1
+                last = bisect.bisect_right(starts, end - 1) - 1
+                source, piece_start, piece_length = pieces[first]
+                skip = start - starts[first]
+                if first == last:
+                    new_pieces.append((source, piece_start + skip, end - start))
+                    continue
+                new_pieces.append((source, piece_start + skip, piece_length - skip))
+                # The pieces in between are copied whole
+                new_pieces.extend(pieces[first + 1 : last])
+                source, piece_start, piece_length = pieces[last]
+                new_pieces.append((source, piece_start, end - starts[last]))
+            pieces = new_pieces
+        return content_hash, pieces
+
+    # Writing a version to a binary file, checking its hash
+    # The snapshot is decompressed to a temporary file, so memory use doesn't depend on the size of the note
+    def write_version(self, content_hash, output_file):
+        snapshot_hash, pieces = self.read_pieces(content_hash)
+        file_hash = hashlib.sha256()
+        with tempfile.TemporaryFile() as snapshot_file:
+            decompressor = zlib.decompressobj()
+            with open(self.object_path(snapshot_hash), "rb") as object_file:
+                object_file.readline()
+                for chunk in iter(lambda: object_file.read(self.chunk_bytes), b""):
+                    snapshot_file.write(decompressor.decompress(chunk))
+                snapshot_file.write(decompressor.flush())
+            for source, start, length in pieces:
+                if source is not None:
+                    chunk = source[start : start + length]
+                    output_file.write(chunk)
+                    file_hash.update(chunk)
+                    continue
+                snapshot_file.seek(start)
+                while length > 0:
+                    chunk = snapshot_file.read(min(length, self.chunk_bytes))
+                    output_file.write(chunk)
+                    file_hash.update(chunk)
+                    length -= len(chunk)
+        if file_hash.hexdigest() != content_hash:
+            raise ValueError(f"Version {content_hash} in the note history is damaged")
+
+    # Returning the content of a small version
+    def read_version(self, content_hash):
+        with tempfile.TemporaryFile() as version_file:
+            self.write_version(content_hash, version_file)
+            version_file.seek(0)
+            return version_file.read()
+
+    # Recording the state of a note before the app changes it, if it was changed or deleted outside the app
+    # (or saved before there was a history), so every change has the right base version and can be undone
+    def sync(self, title):
+        last_entry = self.last_entry(title)
+        try:
+            stat = os.stat(self.note_path(title))
+        except FileNotFoundError:
+            if last_entry is not None and last_entry["hash"] is not None:
+                self.append_entry(title, "delete", None)
+            return None
+        if (
+            last_entry is None
+            or last_entry["hash"] is None
+            or [last_entry["size"], last_entry["mtime_ns"]] != [stat.st_size, stat.st_mtime_ns]
+        ):
+            self.record(title, "external")
+
+    # Recording the current content of a note after it has been saved
+    # operations are the changed byte ranges against the version recorded last, if the caller knows them
+    def record(self, title, action, operations=None):
+        note_path = self.note_path(title)
+        content_hash = self.hash_file(note_path)
+        stat = os.stat(note_path)
+        last_entry = self.last_entry(title)
+        base_hash = last_entry["hash"] if last_entry is not None else None
+        if not os.path.exists(self.object_path(content_hash)):
+            self.store(content_hash, note_path, stat.st_size, base_hash, operations)
+        return self.append_entry(title, action, content_hash, stat)
+
+    # Recording that the app deleted a note
+    def record_delete(self, title):
+        last_entry = self.last_entry(title)
+        if last_entry is not None and last_entry["hash"] is not None:
+            self.append_entry(title, "delete", None)
+
+    # Returning the revision restore() uses by default: the version before the current one of an existing note, or the
+    # last version of a deleted note
+    def default_revision(self, title):
+        entries = self.read_log(title)
+        if len(entries) == 0:
+            return None
+        current_hash = entries[-1]["hash"] if os.path.exists(self.note_path(title)) else None
+        for entry in reversed(entries):
+            if entry["hash"] is not None and entry["hash"] != current_hash:
+                return entry["rev"]
+        return None
+
+    # Writing a revision of a note back (also if the note has been deleted), recorded as a new revision
+    # Raises ValueError if there is no such revision or it is a deletion
+    def restore(self, title, revision):
+        entries = [entry for entry in self.read_log(title) if entry["rev"] == revision]
+        if len(entries) == 0 or entries[0]["hash"] is None:
+            raise ValueError(f"'{title}.txt' has no saved version with revision {revision}")
+        self.sync(title)
+        os.makedirs(self.folder, exist_ok=True)
+        temp_path = f"{self.folder}" + f".{title}.txt.tmp"
+        try:
+            with open(temp_path, "wb") as temp_file:
+                self.write_version(entries[0]["hash"], temp_file)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        os.replace(temp_path, self.note_path(title))
+        return self.append_entry(title, "restore", entries[0]["hash"], os.stat(self.note_path(title)))
+
+
+# Class to search note titles and bodies with an inverted index from words to notes, kept in notes/.notes.idx
+# The mtime and size of every indexed note are saved, so only new and changed notes are read again on the next update
+# Results are ranked with BM25
+class NoteIndex:
+    # Version of the tables, older .notes.idx files are dropped and rebuilt
+    # (version 2 removes words no note has anymore)
+    version = 2
+    token_pattern = re.compile(r"\w+")
+    # A word of the title counts as much as this many words of the body
+    title_weight = 3
+    # BM25 parameters: how fast repeating a word stops raising the score, and how much long notes are penalized
+    k1 = 1.2
+    b = 0.75
+    # Number of words a query word with a trailing * matches at most (the shortest ones)
+    prefix_terms_limit = 50
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # word -> id of the word in the terms table, filled as words are looked up
+        self.term_ids = {}
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != self.version:
+            self.connection.executescript(
+                """
+                DROP TABLE IF EXISTS notes;
+                DROP TABLE IF EXISTS terms;
+                DROP TABLE IF EXISTS postings;
+                """
+            )
+            self.connection.execute(f"PRAGMA user_version = {self.version}")
+        self.connection.executescript(
+            """
+            PRAGMA synchronous = OFF;
+            PRAGMA cache_size = -65536;
+            PRAGMA journal_mode = TRUNCATE;
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL UNIQUE,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                note_id INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (term_id, note_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_note_id ON postings (note_id);
+            """
+        )
+
+    # Splitting a text into casefolded words
+    def tokenize(self, text):
+        return self.token_pattern.findall(text.casefold())
+
+    # Counting the words of a note, reading it line by line so big notes aren't loaded at once
+    def count_terms(self, title, note_path):
+        term_counts = collections.Counter()
+        with open(note_path, "r", errors="replace") as note_file:
+            for line in note_file:
+                term_counts.update(self.tokenize(line))
+        for term in self.tokenize(title):
+            term_counts[term] += self.title_weight
+        return term_counts
+
+    # Returning the id of a word in the terms table, adding the word if it's new (without committing)
+    def get_term_id(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            row = self.connection.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+            if row is not None:
+                term_id = row[0]
+            else:
+                term_id = self.connection.execute("INSERT INTO terms (term) VALUES (?)", (term,)).lastrowid
+            self.term_ids[term] = term_id
+        return term_id
+
+    # Removing a note from the index without committing
+    def remove_note(self, note_id):
+        term_ids = [
+            row[0]
+            for row in self.connection.execute("SELECT term_id FROM postings WHERE note_id = ?", (note_id,))
+        ]
+        self.connection.execute("DELETE FROM postings WHERE note_id = ?", (note_id,))
+        self.connection.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+        # Words no other note has are removed too, otherwise they would fill the results of prefix queries
+        for term_id in term_ids:
+            if self.connection.execute(
+                "SELECT 1 FROM postings WHERE term_id = ? LIMIT 1", (term_id,)
+            ).fetchone() is not None:
+                continue
+            row = self.connection.execute("SELECT term FROM terms WHERE id = ?", (term_id,)).fetchone()
+            if row is not None:
+                self.term_ids.pop(row[0], None)
+            self.connection.execute("DELETE FROM terms WHERE id = ?", (term_id,))
+
+    # Indexing the new and changed notes of a folder and removing the deleted ones
+    # Every note is stat-ed (not taken from the note catalog), so notes changed in place by other programs are found too
+    # Returning the number of notes indexed again and the number of notes removed from the index
+    def update(self, folder):
+        indexed_notes = {
+            title: (note_id, mtime_ns, size)
+            for note_id, title, mtime_ns, size in self.connection.execute(
+                "SELECT id, title, mtime_ns, size FROM notes"
+            )
+        }
+        indexed_num = 0
+        with self.connection:
+            for entry in scan_notes(folder):
+                title = entry.name[: -len(".txt")]
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+                indexed_note = indexed_notes.pop(title, None)
+                if indexed_note is not None:
+                    if indexed_note[1:] == (mtime_ns, size):
+                        continue
+                    self.remove_note(indexed_note[0])
+                try:
+                    term_counts = self.count_terms(title, entry.path)
+                except FileNotFoundError:
+                    # Deleted while the folder was being indexed
+                    continue
+                cursor = self.connection.execute(
+                    "INSERT INTO notes (title, mtime_ns, size, length) VALUES (?, ?, ?, ?)",
+                    (title, mtime_ns, size, sum(term_counts.values())),
+                )
+                self.connection.executemany(
+                    "INSERT INTO postings (term_id, note_id, count) VALUES (?, ?, ?)",
+                    [(self.get_term_id(term), cursor.lastrowid, count) for term, count in term_counts.items()],
+                )
+                indexed_num += 1
+            # Notes that weren't seen in the folder have been deleted
+            for note_id, _, _ in indexed_notes.values():
+                self.remove_note(note_id)
+        return indexed_num, len(indexed_notes)
+
+    # Finding the ids of the words a query word matches, a trailing * matches the shortest words with that prefix
+    def match_term(self, term):
+        if not term.endswith("*"):
+            tokens = self.tokenize(term)
+            if len(tokens) != 1:
+                return []
+            row = self.connection.execute("SELECT id FROM terms WHERE term = ?", (tokens[0],)).fetchone()
+            return [row[0]] if row is not None else []
+        prefix = term[:-1].casefold()
+        cursor = self.connection.execute(
+            """
+            SELECT id FROM terms WHERE term >= ? AND term < ?
+            ORDER BY LENGTH(term), term LIMIT ?
+            """,
+            (prefix, prefix + "\U0010ffff", self.prefix_terms_limit),
+        )
+        return [row[0] for row in cursor]
+
+    # Returning the (title, score) pairs of the best matching notes for a query, best first
+    def search(self, query, limit=10):
+        notes_num, total_length = self.connection.execute(
+            "SELECT COUNT(*), TOTAL(length) FROM notes"
+        ).fetchone()
+        if notes_num == 0:
+            return []
+        average_length = max(total_length / notes_num, 1)
+        scores = {}
+        for term in dict.fromkeys(query.split()):
+            for term_id in self.match_term(term):
+                postings = self.connection.execute(
+                    """
+                    SELECT postings.note_id, postings.count, notes.length
+                    FROM postings JOIN notes ON notes.id = postings.note_id
+                    WHERE postings.term_id = ?
+                    """,
+                    (term_id,),
+                ).fetchall()
+                # Words found in fewer notes weigh more
+                idf = math.log(1 + (notes_num - len(postings) + 0.5) / (len(postings) + 0.5))
+                for note_id, count, length in postings:
+                    scores[note_id] = scores.get(note_id, 0) + idf * count * (self.k1 + 1) / (
+                        count + self.k1 * (1 - self.b + self.b * length / average_length)
+                    )
+        best_notes = heapq.nlargest(limit, scores.items(), key=lambda result: result[1])
+        results = []
+        for note_id, score in best_notes:
+            title = self.connection.execute("SELECT title FROM notes WHERE id = ?", (note_id,)).fetchone()[0]
+            results.append((title, score))
+        return results
+
+    def close(self):
+        self.connection.close()
+
 
 # Function to display the menu
 def display_menu():
@@ -26,6 +856,9 @@ def display_menu():
     print("4. View all saved notes")
     print("5. Delete a specific note")
     print("6. Delete all saved notes")
+    # Quit keeps its number, so input piped into the menu still works after options are added
+    print("8. Search notes")
+    print("9. Note history and restore")
     print("7. Quit")
 
 
@@ -57,6 +890,319 @@ def os_detect():
         exit()
 
 
+# Note catalog, search index and note history, opened on first use
+note_catalog = None
+note_index = None
+note_history = None
+
+# Number of lines read at most to find a line of a search result that shows the query words
+snippet_lines_limit = 10000
+
+# Notes bigger than this many bytes are shown page by page
+pager_threshold = 64 * 1024
+
+# Longest part of a line shown in the pager, longer lines are cut
+pager_max_line_bytes = 1024
+
+# Size of the chunks the unchanged parts of a note are copied in when lines are replaced
+copy_chunk_bytes = 1024 * 1024
+
+
+# Opening notes/.notes.catalog on first use and bringing it up to date with the notes folder
+def get_note_catalog(rescan=False):
+    global note_catalog
+    if note_catalog is None:
+        note_catalog = NoteCatalog(file_location, file_location + ".notes.catalog")
+    note_catalog.refresh(rescan)
+    return note_catalog
+
+
+# Opening the note history (notes/.history) on first use
+def get_note_history():
+    global note_history
+    if note_history is None:
+        note_history = NoteHistory(file_location)
+    return note_history
+
+
+# Opening notes/.notes.idx on first use and indexing the notes that are new or changed since the last update
+def get_note_index():
+    global note_index
+    if note_index is None:
+        if not os.path.exists(file_location):
+            os.makedirs(file_location)
+        note_index = NoteIndex(file_location + ".notes.idx")
+    note_index.update(file_location)
+    return note_index
+
+
+# Finding the first line of a note that contains one of the query words, or None
+def find_snippet(title, query):
+    terms = [term.casefold().rstrip("*") for term in query.split()]
+    try:
+        with open(f"{file_location}" + f"{title}.txt", "r", errors="replace") as file:
+            for line_number, line in enumerate(file, start=1):
+                if line_number > snippet_lines_limit:
+                    break
+                folded_line = line.casefold()
+                if any(term != "" and term in folded_line for term in terms):
+                    return line_number, line.strip()
+    except FileNotFoundError:
+        return None
+    return None
+
+
+# Returning the path of the saved line offsets of a note (notes/.lines/<title>.lines)
+def line_index_path(title):
+    return os.path.join(file_location, ".lines", f"{title}.lines")
+
+
+# Removing the saved line offsets of a deleted note
+def remove_line_index(title):
+    try:
+        os.remove(line_index_path(title))
+    except FileNotFoundError:
+        return None
+
+
+# Showing a note page by page, with jumping to a line
+# Raises FileNotFoundError if the note doesn't exist
+def page_note(title):
+    line_index = NoteLineIndex(f"{file_location}" + f"{title}.txt", line_index_path(title))
+    page_size = max(shutil.get_terminal_size().lines - 4, 5)
+    first_line = 0
+    try:
+        while True:
+            lines = list(line_index.read_lines(first_line, page_size, pager_max_line_bytes))
+            lines_num = "?" if line_index.lines_num is None else line_index.lines_num
+            print(
+                termcolor.colored(
+                    f"'{title}.txt' lines {first_line + 1}-{first_line + len(lines)} of {lines_num}:",
+                    "green",
+                    "on_black",
+                )
+            )
+            print(termcolor.colored("`" * 3, "cyan", "on_black"))
+            for line_number, line in enumerate(lines, start=first_line + 1):
+                print(termcolor.colored(f"{line_number:>7} ", "cyan") + line)
+            print(termcolor.colored("`" * 3, "cyan", "on_black"))
+            at_end = line_index.line_offset(first_line + page_size) is None
+            user_input = input(
+                "Enter N or nothing for the next page, P previous page, G and a line number to go to a line, Q quit: "
+            ).strip().casefold()
+            if user_input in ["", "n"]:
+                if at_end:
+                    break
+                first_line += page_size
+            elif user_input == "p":
+                first_line = max(first_line - page_size, 0)
+            elif user_input.startswith("g") and user_input[1:].strip().isdigit():
+                line = max(int(user_input[1:].strip()), 1) - 1
+                if line_index.line_offset(line) is None:
+                    print(
+                        termcolor.colored(
+                            f"'{title}.txt' has only {line_index.lines_num} lines.", "yellow", "on_black"
+                        )
+                    )
+                else:
+                    first_line = line
+            elif user_input == "q":
+                break
+            else:
+                print(
+                    termcolor.colored(
+                        "Invalid choice. Please enter a valid option.", "red", "on_black"
+                    )
+                )
+    finally:
+        line_index.close()
+
+
+# Reading lines until Ctrl+D (EOF)
+def read_multiline_input():
+    lines = []
+    while True:
+        try:
+            lines.append(input())
+        except EOFError:
+            return lines
+
+
+# Appending lines to the end of a note, only the new lines are written
+# Lines are read like NoteLineIndex reads them: a newline ends a line, so a note that ends with a newline doesn't have
+# an empty line after it and an empty last line is written with a newline after it
+# Raises FileNotFoundError if the note doesn't exist
+def append_note_lines(title, lines):
+    with open(f"{file_location}" + f"{title}.txt", "rb") as note_file:
+        size = note_file.seek(0, os.SEEK_END)
+        if size != 0:
+            note_file.seek(-1, os.SEEK_END)
+            ends_with_newline = note_file.read(1) == b"\n"
+    if len(lines) == 0:
+        return None
+    get_note_history().sync(title)
+    with open(f"{file_location}" + f"{title}.txt", "a") as text_file:
+        # Notes saved by the app don't end with a newline
+        if size != 0 and not ends_with_newline:
+            text_file.write("\n")
+        text_file.write("\n".join(lines))
+        if lines[-1] == "":
+            text_file.write("\n")
+    get_note_catalog().note_saved(title)
+    # Only the appended bytes are read back for the history
+    with open(f"{file_location}" + f"{title}.txt", "rb") as note_file:
+        note_file.seek(size)
+        appended = note_file.read()
+    get_note_history().record(title, "append", [("c", 0, size), ("i", appended)])
+
+
+# Replacing lines first_line to last_line (numbered from 1) of a note with other lines (none to delete them)
+# The note is written again to a temporary file that replaces it atomically, the lines before and after the replaced
+# ones are copied through in chunks without being decoded
+# Lines are counted like NoteLineIndex and append_note_lines count them, an empty last line keeps a newline after it
+# Raises FileNotFoundError if the note doesn't exist and ValueError if the note doesn't have these lines
+def replace_note_lines(title, first_line, last_line, lines):
+    note_path = f"{file_location}" + f"{title}.txt"
+    temp_path = f"{file_location}" + f".{title}.txt.tmp"
+    get_note_history().sync(title)
+    line_index = NoteLineIndex(note_path, line_index_path(title))
+    try:
+        if first_line < 1 or last_line < first_line or line_index.line_offset(last_line - 1) is None:
+            raise ValueError(f"'{title}.txt' doesn't have lines {first_line}-{last_line}")
+        data = line_index.data
+        start = line_index.line_offset(first_line - 1)
+        end = line_index.line_offset(last_line)
+        # Writing new lines with the newlines the note already has, or the ones text files get on this system
+        first_newline = data.find(b"\n")
+        if first_newline == -1:
+            newline = os.linesep.encode()
+        elif data[first_newline - 1 : first_newline] == b"\r":
+            newline = b"\r\n"
+        else:
+            newline = b"\n"
+        text = newline.join(line.encode(locale.getpreferredencoding(False)) for line in lines)
+        ends_with_newline = data[line_index.size - 1 :] == b"\n"
+        if end is not None:
+            if len(lines) != 0:
+                text += newline
+        elif len(lines) != 0:
+            # Keeping the end of the note as it was, an empty last line only exists with a newline after it
+            if ends_with_newline or lines[-1] == "":
+                text += newline
+        elif start != 0 and not ends_with_newline:
+            # The last lines are deleted, the line before them becomes the last line
+            # and loses its newline, unless it is empty
+            previous_end = start - (len(newline) if data[start - len(newline) : start] == newline else 1)
+            if previous_end != 0 and data[previous_end - 1 : previous_end] != b"\n":
+                start = previous_end
+        with open(temp_path, "wb") as temp_file:
+            for offset in range(0, start, copy_chunk_bytes):
+                temp_file.write(data[offset : min(offset + copy_chunk_bytes, start)])
+            temp_file.write(text)
+            if end is not None:
+                for offset in range(end, line_index.size, copy_chunk_bytes):
+                    temp_file.write(data[offset : offset + copy_chunk_bytes])
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        operations = [("c", 0, start), ("i", text)]
+        if end is not None:
+            operations.append(("c", end, line_index.size - end))
+    except BaseException:
+        line_index.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    # The note must be closed before it can be replaced on Windows
+    line_index.close()
+    os.replace(temp_path, note_path)
+    get_note_catalog().note_saved(title)
+    get_note_history().record(title, "replace", operations)
+
+
+# Asking for a line number until a valid one is entered
+def input_line_number(prompt):
+    while True:
+        user_input = input(prompt).strip()
+        if user_input.isdigit() and int(user_input) >= 1:
+            return int(user_input)
+        print(
+            termcolor.colored(
+                "Invalid line number. Please enter a number from 1.", "red", "on_black"
+            )
+        )
+
+
+# Appending lines to a note from the edit menu
+def append_to_note(filename):
+    print(
+        termcolor.colored(
+            "This is a multi-line entry. To finish writing and save the lines, press Ctrl+D",
+            "yellow",
+            "on_black",
+        )
+    )
+    print(f"Enter lines to append to '{filename}.txt': ")
+    lines = read_multiline_input()
+    append_note_lines(filename, lines)
+    print(
+        termcolor.colored(
+            f"{len(lines)} lines appended to '{filename}.txt'.", "green", "on_black"
+        )
+    )
+
+
+# Replacing a range of lines of a note from the edit menu
+def replace_in_note(filename):
+    first_line = input_line_number("Enter the first line to replace: ")
+    last_line = input_line_number("Enter the last line to replace: ")
+    if last_line < first_line:
+        print(
+            termcolor.colored(
+                "The last line cannot be before the first line!", "yellow", "on_black"
+            )
+        )
+        return None
+    line_index = NoteLineIndex(f"{file_location}" + f"{filename}.txt", line_index_path(filename))
+    try:
+        if line_index.line_offset(last_line - 1) is None:
+            print(
+                termcolor.colored(
+                    f"'{filename}.txt' doesn't have line {last_line}.", "yellow", "on_black"
+                )
+            )
+            return None
+        # Showing the replaced lines (at most one page of them)
+        shown_lines_num = min(last_line - first_line + 1, 20)
+        print(f"Lines {first_line}-{last_line} of '{filename}.txt':")
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        for line_number, line in enumerate(
+            line_index.read_lines(first_line - 1, shown_lines_num, pager_max_line_bytes), start=first_line
+        ):
+            print(termcolor.colored(f"{line_number:>7} ", "cyan") + line)
+        if shown_lines_num < last_line - first_line + 1:
+            print("    ...")
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    finally:
+        line_index.close()
+    print(
+        termcolor.colored(
+            "This is a multi-line entry. To finish writing and save the lines, press Ctrl+D (enter nothing to delete the lines)",
+            "yellow",
+            "on_black",
+        )
+    )
+    print("Enter the new lines: ")
+    lines = read_multiline_input()
+    replace_note_lines(filename, first_line, last_line, lines)
+    print(
+        termcolor.colored(
+            f"Lines {first_line}-{last_line} of '{filename}.txt' replaced with {len(lines)} lines.",
+            "green",
+            "on_black",
+        )
+    )
+
+
 # Function to create a new note
 def create_note():
     if not os.path.exists(file_location):
@@ -95,9 +1241,12 @@ def create_note():
                 contents.append(content)
             except EOFError:
                 break
+        get_note_history().sync(title)
         with open(f"{file_location}" + f"{title}.txt", "w") as text_file:
             text_file.write("\n".join(contents))
             text_file.close()
+        get_note_catalog().note_saved(title)
+        get_note_history().record(title, "create")
         print(
             termcolor.colored(
                 f"Note '{title}.txt' created successfully!", "green", "on_black"
@@ -109,12 +1258,35 @@ def create_note():
 def edit_note():
     filename = input("Enter note title to view: ")
     try:
-        with open(f"{file_location}" + f"{filename}.txt", "r") as file:
-            content = file.read()
-            print(f"Content of '{filename}.txt':")
-            print(termcolor.colored("`" * 3, "cyan", "on_black"))
-            print(content)
-            print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        size = os.path.getsize(f"{file_location}" + f"{filename}.txt")
+        # Appending and replacing lines write only what changed, which keeps editing big notes cheap
+        while True:
+            user_input = input(
+                "How do you want to edit the note? (W write the whole note again, A append lines, R replace lines, default W): "
+            ).casefold()
+            if user_input in ["", "w", "a", "r"]:
+                break
+            print(
+                termcolor.colored(
+                    "Invalid choice. Please enter a valid option.", "red", "on_black"
+                )
+            )
+        if user_input == "a":
+            append_to_note(filename)
+            return None
+        if user_input == "r":
+            replace_in_note(filename)
+            return None
+
+        if size > pager_threshold:
+            page_note(filename)
+        else:
+            with open(f"{file_location}" + f"{filename}.txt", "r") as file:
+                content = file.read()
+                print(f"Content of '{filename}.txt':")
+                print(termcolor.colored("`" * 3, "cyan", "on_black"))
+                print(content)
+                print(termcolor.colored("`" * 3, "cyan", "on_black"))
 
         print(
             f"Editing '{filename}.txt'. Enter your text. Press Ctrl+D to save and exit."
@@ -135,9 +1307,12 @@ def edit_note():
             except EOFError:
                 break
 
+        get_note_history().sync(filename)
         with open(f"{file_location}" + f"{filename}.txt", "w") as text_file:
             text_file.write("\n".join(contents))
             text_file.close()
+        get_note_catalog().note_saved(filename)
+        get_note_history().record(filename, "edit")
 
         print(
             termcolor.colored(
@@ -152,6 +1327,10 @@ def edit_note():
 def view_specific_note():
     filename = input("Enter note title to view: ")
     try:
+        # Big notes are shown page by page instead of being read at once
+        if os.path.getsize(f"{file_location}" + f"{filename}.txt") > pager_threshold:
+            page_note(filename)
+            return None
         with open(f"{file_location}" + f"{filename}.txt", "r") as file:
             content = file.read()
             print(
@@ -164,37 +1343,63 @@ def view_specific_note():
         print(termcolor.colored(f"File '{filename}.txt' not found.", "yellow"))
 
 
-# Function to view all saved notes
+# Formatting one line of the note list: file name, size and modified time
+def format_note_line(title, metadata):
+    modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(metadata[1] / 10**9))
+    return f"{title}.txt  " + termcolor.colored(f"{metadata[0]} bytes, modified {modified}", "cyan")
+
+
+# Function to view all saved notes, sorted by title, size or modified time
 def view_all_notes():
-    try:
-        files = os.listdir(file_location)
-        txt_pattern = re.compile(r"\.txt$")
-        txt_files = [file for file in files if txt_pattern.search(file)]
-        txt_files.sort()
+    if not os.path.exists(file_location):
         print(
             termcolor.colored(
-                "List of all saved notes one per line: ", "green", "on_black"
+                f"'notes' directory not found! Perhaps you don't have a saved note.",
+                "yellow",
             )
         )
-        print(termcolor.colored("`" * 3, "cyan", "on_black"))
-        print("\n".join(txt_files))
-        print(termcolor.colored("`" * 3, "cyan", "on_black"))
-    except FileNotFoundError:
+        return None
+    while True:
+        user_input = input(
+            "How do you want to sort notes? (T title, S size, M modified, default T): "
+        ).casefold()
+        if user_input in ["", "t", "s", "m"]:
+            sort_by = {"": "title", "t": "title", "s": "size", "m": "modified"}[user_input]
+            break
         print(
             termcolor.colored(
-                f"'notes' directory not found! Perhaps you don't have a saved note.",
-                "yellow",
+                "Invalid choice. Please enter a valid option.", "red", "on_black"
             )
         )
+    catalog = get_note_catalog()
+    if len(catalog.notes) == 0:
+        print(termcolor.colored("You have no saved notes", "yellow"))
+        return None
+    print(
+        termcolor.colored(
+            "List of all saved notes one per line: ", "green", "on_black"
+        )
+    )
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    for title in catalog.sorted_titles(sort_by):
+        print(format_note_line(title, catalog.notes[title]))
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
 
 
 # Function to delete a specific note
 def delete_specific_note():
     filename = input("Enter note title to delete: ")
     try:
+        # The deleted note stays in the history and can be restored
+        get_note_history().sync(filename)
         os.remove(file_location + filename + ".txt")
+        get_note_catalog().note_removed(filename)
+        get_note_history().record_delete(filename)
+        remove_line_index(filename)
         print(
-            termcolor.colored(f"{filename}.txt has been deleted.", "green", "on_black")
+            termcolor.colored(
+                f"{filename}.txt has been deleted. It can be restored from the note history.", "green", "on_black"
+            )
         )
     except FileNotFoundError:
         print(termcolor.colored(f"File '{filename}.txt' not found.", "yellow"))
@@ -204,24 +1409,32 @@ def delete_specific_note():
 def delete_all_notes():
     user_input = input("Do you want to delete all your saved notes? (Y yes, N no): ")
     if user_input.casefold() == "y" or user_input.casefold() == "yes":
-        try:
-            files = os.listdir(file_location)
-            txt_pattern = re.compile(r"\.txt$")
-            txt_files = [file for file in files if txt_pattern.search(file)]
-            if len(txt_files) != 0:
-                txt_files.sort()
-                for txt_file in txt_files:
-                    os.remove(file_location + txt_file)
+        if os.path.exists(file_location):
+            catalog = get_note_catalog()
+            titles = list(catalog.sorted_titles())
+            if len(titles) != 0:
+                deleted_num = 0
+                history = get_note_history()
+                for title in titles:
+                    try:
+                        history.sync(title)
+                        os.remove(file_location + title + ".txt")
+                        history.record_delete(title)
+                        deleted_num += 1
+                    except FileNotFoundError:
+                        pass
+                    remove_line_index(title)
+                catalog.notes_removed(titles)
                 print(
                     termcolor.colored(
-                        f"{len(txt_files)} saved notes have been deleted",
+                        f"{deleted_num} saved notes have been deleted, they can be restored from the note history",
                         "green",
                         "on_black",
                     )
                 )
             else:
                 print(termcolor.colored("You have no saved notes", "yellow"))
-        except FileNotFoundError:
+        else:
             print(
                 termcolor.colored(
                     f"'notes' directory not found! Perhaps you don't have a saved note.",
@@ -238,8 +1451,236 @@ def delete_all_notes():
         )
 
 
+# Function to search note titles and contents, best matching notes first
+def search_notes():
+    while True:
+        query = input("Enter words to search for (a trailing * matches the beginning of a word): ")
+        if query.strip() == "":
+            print(termcolor.colored("Search query cannot be empty!", "yellow", "on_black"))
+            continue
+        break
+    results = get_note_index().search(query)
+    if len(results) == 0:
+        print(termcolor.colored("No notes matched your search!", "yellow", "on_black"))
+        return None
+    print(
+        termcolor.colored(
+            f"{len(results)} best matching notes:", "green", "on_black"
+        )
+    )
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    for title, score in results:
+        print(f"{title}.txt " + termcolor.colored(f"(score {score:.2f})", "cyan"))
+        snippet = find_snippet(title, query)
+        if snippet is not None:
+            print(f"    {snippet[0]}: {snippet[1][:100]}")
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+
+
+# Formatting one revision of the note history
+def format_revision(entry):
+    saved_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["time"]))
+    if entry["hash"] is None:
+        return f"{entry['rev']:>5}  {saved_time}  {entry['action']}"
+    return f"{entry['rev']:>5}  {saved_time}  {entry['action']:<8}  {entry['size']} bytes  {entry['hash'][:12]}"
+
+
+# Function to show the history of a note (also of a deleted note) and restore one of its versions
+def note_history_menu():
+    filename = input("Enter note title to see its history: ")
+    history = get_note_history()
+    # Changes made outside the app are recorded first, so they show up and can be restored too
+    history.sync(filename)
+    entries = history.read_log(filename)
+    if len(entries) == 0:
+        print(termcolor.colored(f"'{filename}.txt' has no history.", "yellow"))
+        return None
+    print(
+        termcolor.colored(
+            f"History of '{filename}.txt', {len(entries)} revisions (oldest first):", "green", "on_black"
+        )
+    )
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    for entry in entries:
+        print(format_revision(entry))
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    default_revision = history.default_revision(filename)
+    while True:
+        user_input = input(
+            "Enter a revision to restore"
+            + (f" (R for {default_revision})" if default_revision is not None else "")
+            + ", or nothing to go back: "
+        ).strip()
+        if user_input == "":
+            return None
+        if user_input.casefold() == "r" and default_revision is not None:
+            revision = default_revision
+            break
+        if user_input.isdigit():
+            revision = int(user_input)
+            break
+        print(
+            termcolor.colored(
+                "Invalid choice. Please enter a valid option.", "red", "on_black"
+            )
+        )
+    try:
+        entry = history.restore(filename, revision)
+    except ValueError as error:
+        print(termcolor.colored(str(error), "yellow", "on_black"))
+        return None
+    get_note_catalog().note_saved(filename)
+    print(
+        termcolor.colored(
+            f"Revision {revision} of '{filename}.txt' restored as revision {entry['rev']}.", "green", "on_black"
+        )
+    )
+
+
+# Building the parser of the non-interactive command line
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Manage notes without the interactive menu. Without a command the menu is shown."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    search_parser = subparsers.add_parser(
+        "search", help="print the titles of the best matching notes with their scores, best first"
+    )
+    search_parser.add_argument("query", nargs="+", help="words to search for, a trailing * matches a prefix")
+    search_parser.add_argument("-n", "--limit", type=int, default=10, help="number of notes (default 10)")
+
+    view_parser = subparsers.add_parser(
+        "view", help="print a note or some of its lines, without loading the whole note"
+    )
+    view_parser.add_argument("title", help="note title (file name without .txt)")
+    view_parser.add_argument("--line", type=int, default=1, help="first line to print (default 1)")
+    view_parser.add_argument("--lines", type=int, help="number of lines to print (default all)")
+
+    append_parser = subparsers.add_parser(
+        "append", help="append the lines read from stdin to a note"
+    )
+    append_parser.add_argument("title", help="note title (file name without .txt)")
+
+    replace_parser = subparsers.add_parser(
+        "replace", help="replace lines FIRST to LAST of a note with the lines read from stdin (none to delete them)"
+    )
+    replace_parser.add_argument("title", help="note title (file name without .txt)")
+    replace_parser.add_argument("first", type=int, help="first line to replace, from 1")
+    replace_parser.add_argument("last", type=int, help="last line to replace")
+
+    history_parser = subparsers.add_parser(
+        "history", help="print the revisions of a note (also of a deleted note), tab separated, oldest first"
+    )
+    history_parser.add_argument("title", help="note title (file name without .txt)")
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="restore a revision of a note, recorded as a new revision"
+    )
+    restore_parser.add_argument("title", help="note title (file name without .txt)")
+    restore_parser.add_argument(
+        "--revision",
+        type=int,
+        help="revision to restore (default: the version before the current one, or the last one of a deleted note)",
+    )
+
+    list_parser = subparsers.add_parser(
+        "list", help="print the titles, sizes and mtimes of all notes, tab separated"
+    )
+    list_parser.add_argument(
+        "--sort",
+        choices=["title", "size", "modified"],
+        default="title",
+        help="sort order (default title), size and modified list the biggest and newest notes first",
+    )
+    list_parser.add_argument(
+        "--rescan", action="store_true", help="stat every note again to catch notes changed by other programs"
+    )
+    return parser
+
+
+# Running one command of the non-interactive command line, returning the exit status
+def run_command(arguments):
+    if arguments.command == "search":
+        results = get_note_index().search(" ".join(arguments.query), arguments.limit)
+        for title, score in results:
+            print(f"{score:.4f}\t{title}")
+        return 0 if len(results) != 0 else 1
+    if arguments.command == "view":
+        try:
+            line_index = NoteLineIndex(
+                f"{file_location}" + f"{arguments.title}.txt", line_index_path(arguments.title)
+            )
+        except FileNotFoundError:
+            print(f"File '{arguments.title}.txt' not found.", file=sys.stderr)
+            return 1
+        try:
+            lines_num = arguments.lines if arguments.lines is not None else sys.maxsize
+            for line in line_index.read_lines(max(arguments.line, 1) - 1, lines_num):
+                print(line)
+        finally:
+            line_index.close()
+        return 0
+    if arguments.command in ["append", "replace"]:
+        lines = sys.stdin.read().split("\n")
+        # A trailing newline doesn't start another line
+        if lines[-1] == "":
+            lines.pop()
+        try:
+            if arguments.command == "append":
+                append_note_lines(arguments.title, lines)
+            else:
+                replace_note_lines(arguments.title, arguments.first, arguments.last, lines)
+        except FileNotFoundError:
+            print(f"File '{arguments.title}.txt' not found.", file=sys.stderr)
+            return 1
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        return 0
+    if arguments.command == "history":
+        history = get_note_history()
+        history.sync(arguments.title)
+        entries = history.read_log(arguments.title)
+        for entry in entries:
+            print(
+                f"{entry['rev']}\t{entry['time']}\t{entry['action']}\t{entry['size']}\t{entry['hash'] or ''}"
+            )
+        return 0 if len(entries) != 0 else 1
+    if arguments.command == "restore":
+        history = get_note_history()
+        history.sync(arguments.title)
+        revision = arguments.revision
+        if revision is None:
+            revision = history.default_revision(arguments.title)
+        if revision is None:
+            print(f"'{arguments.title}.txt' has no earlier version to restore.", file=sys.stderr)
+            return 1
+        try:
+            entry = history.restore(arguments.title, revision)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        get_note_catalog().note_saved(arguments.title)
+        print(f"Revision {revision} restored as revision {entry['rev']}", file=sys.stderr)
+        return 0
+    if arguments.command == "list":
+        catalog = get_note_catalog(arguments.rescan)
+        for title in catalog.sorted_titles(arguments.sort):
+            size, mtime_ns = catalog.notes[title]
+            print(f"{title}\t{size}\t{mtime_ns}")
+        return 0
+    return 2
+
+
 if __name__ == "__main__":
     file_location = os_detect()
+    arguments = build_argument_parser().parse_args()
+
+    # Running a single command without the interactive menu
+    if arguments.command is not None:
+        sys.exit(run_command(arguments))
+
     print(
         termcolor.colored(
             "Your notes are saved with the title for the text file name and with the note content for the contents of the text file",
@@ -262,6 +1703,10 @@ if __name__ == "__main__":
             delete_specific_note()
         elif choice == "6":
             delete_all_notes()
+        elif choice == "8":
+            search_notes()
+        elif choice == "9":
+            note_history_menu()
         elif choice == "7":
             print("Goodbye!")
             break
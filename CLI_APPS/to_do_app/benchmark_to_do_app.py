@@ -0,0 +1,159 @@
+# Description: Benchmark for to_do_app.py. Synthetic tasks.csv files are generated at several sizes, the task operations are run headlessly
+# (input() answers are scripted) and the wall time and peak memory of every operation are reported as JSON.
+# Usage: python benchmark_to_do_app.py --sizes 1000 100000 1000000 --storage csv journal sqlite --output report.json
+# Importing required modules
+# argparse module for reading the benchmark options
+import argparse
+
+# csv module for generating synthetic tasks.csv files
+import csv
+
+# json module for writing the report
+import json
+
+# os module for building file paths
+import os
+
+# platform module for recording where the benchmark ran
+import platform
+
+# random module for generating synthetic task descriptions
+import random
+
+# shutil module for removing the temporary benchmark folders
+import shutil
+
+# sys module for importing to_do_app from this folder
+import sys
+
+# tempfile module for creating temporary benchmark folders
+import tempfile
+
+# time module for measuring wall time
+import time
+
+# tracemalloc module for measuring peak memory
+import tracemalloc
+
+# contextlib and io modules for hiding the output of the measured operations
+import contextlib
+import io
+
+# mock module for answering input() prompts
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import to_do_app
+
+words = [
+    "buy", "milk", "call", "mom", "fix", "bug", "write", "report", "clean", "room",
+    "pay", "bills", "read", "book", "walk", "dog", "send", "email", "plan", "trip",
+]
+
+
+# Generating a synthetic tasks.csv with the given number of tasks, about a third of them completed
+# and most of them with a priority and a due date
+def generate_tasks_csv(path, size, seed=0):
+    random_generator = random.Random(seed)
+    with open(path, "w", newline="") as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(to_do_app.task_titles)
+        for task_id in range(1, size + 1):
+            description = " ".join(random_generator.choice(words) for _ in range(6))
+            status = "completed" if task_id % 3 == 0 else "uncompleted"
+            priority = random_generator.choice(to_do_app.priorities + [""])
+            if random_generator.random() < 0.75:
+                due = f"2026-{random_generator.randint(1, 12):02d}-{random_generator.randint(1, 28):02d}"
+            else:
+                due = ""
+            csv_writer.writerow([task_id, f"Task {task_id}", description, status, priority, due])
+
+
+# Scripted operations: (name, function, input() answers), run in this order against a store with size tasks
+def benchmark_operations(size):
+    middle_id = size // 2 - (size // 2) % 3 + 1
+    return [
+        ("load", lambda: to_do_app.task_store.count(), []),
+        ("add_task", to_do_app.add_task, ["Benchmark task", "added by the benchmark", "h", "2026-01-01"]),
+        ("view_specific_task", to_do_app.view_specific_task, [f"Task {middle_id}"]),
+        ("mark_task_completed", to_do_app.mark_task_completed, ["", str(middle_id)]),
+        ("delete_specific_task", to_do_app.delete_specific_task, [f"Task {middle_id + 1}"]),
+        ("display_tasks", to_do_app.display_tasks, ["", "20", "q"]),
+        ("search_tasks", to_do_app.search_tasks, ["milk AND bug*"]),
+        ("search_tasks_again", to_do_app.search_tasks, ["report OR trip"]),
+        ("next_up_tasks", to_do_app.next_up_tasks, ["20"]),
+        ("next_up_tasks_again", to_do_app.next_up_tasks, ["20"]),
+    ]
+
+
+# Running every operation once in a fresh folder, measuring either wall time or peak memory
+def run_operations(storage_mode, size, measure_memory):
+    folder = tempfile.mkdtemp(prefix="to_do_app_benchmark_")
+    results = {}
+    try:
+        to_do_app.file_location = folder + os.sep
+        to_do_app.storage_mode = storage_mode
+        generate_tasks_csv(folder + os.sep + "tasks.csv", size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            to_do_app.task_store = to_do_app.open_task_store()
+        for name, function, answers in benchmark_operations(size):
+            with mock.patch("builtins.input", side_effect=answers), contextlib.redirect_stdout(io.StringIO()):
+                if measure_memory:
+                    tracemalloc.start()
+                    function()
+                    results[name] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    start_time = time.perf_counter()
+                    function()
+                    results[name] = time.perf_counter() - start_time
+        to_do_app.task_store.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+# Benchmarking one storage mode at one size (timing and memory are measured in separate runs)
+def benchmark(storage_mode, size):
+    seconds = run_operations(storage_mode, size, measure_memory=False)
+    peak_memory = run_operations(storage_mode, size, measure_memory=True)
+    return {
+        "storage": storage_mode,
+        "size": size,
+        "operations": {
+            name: {"seconds": round(seconds[name], 6), "peak_memory_bytes": peak_memory[name]}
+            for name in seconds
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark to_do_app.py task operations at several sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000], help="numbers of tasks")
+    parser.add_argument(
+        "--storage",
+        nargs="+",
+        choices=["csv", "journal", "sqlite"],
+        default=["csv"],
+        help="storage modes to benchmark",
+    )
+    parser.add_argument("--output", default="-", help="file for the JSON report, - for stdout (default)")
+    arguments = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for storage_mode in arguments.storage:
+        for size in arguments.sizes:
+            print(f"Benchmarking {storage_mode} storage with {size} tasks...", file=sys.stderr)
+            report["results"].append(benchmark(storage_mode, size))
+
+    if arguments.output == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        with open(arguments.output, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Report saved to {arguments.output}", file=sys.stderr)
@@ -2,7 +2,7 @@
 # Github Link: https://github.com/mavericane/
 # Website Link: https://mavericane.ir
 # Description: This is a simple to_do application. In this app, you can simply create, edit, view, delete, and mark a task as completed.
-# Version 5: Create tasks, edit tasks, view tasks, mark tasks as completed, delete tasks or a specific task
+# Version 5.7: Create tasks, edit tasks, view tasks (page by page), mark tasks as completed, delete tasks or a specific task, search tasks, give tasks a priority and a due date and view the next up tasks, keep tasks in tasks.csv, in tasks.csv with a journal, or in an SQLite database, and run commands from the command line without the menu. Quit keeps menu number 8, options added after it get the next numbers.
 # Importing required modules
 # platform module for detecting os
 import platform
@@ -16,6 +16,58 @@ import csv
 # termcolor module for colorizing outputs
 import termcolor
 
+# threading module for compacting the tasks journal in the background
+import threading
+
+# sqlite3 module for the SQLite storage mode
+import sqlite3
+
+# contextlib module for grouping many changes into one save
+import contextlib
+
+# argparse module for the non-interactive command line
+import argparse
+
+# sys module for reading bulk records from stdin
+import sys
+
+# json module for reading newline-delimited JSON records
+import json
+
+# fcntl module for locking the tasks files between processes (not available on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# itertools module for streaming pages of tasks
+import itertools
+
+# re(regex) module for splitting task names and descriptions into search tokens
+import re
+
+# bisect module for prefix search over the sorted search tokens
+import bisect
+
+# heapq module for the "next up" queue of tasks ordered by due date and priority
+import heapq
+
+# datetime module for checking due dates
+import datetime
+
+# Storage mode for tasks: "csv" rewrites tasks.csv on every change, "journal" appends every change to tasks.journal,
+# "sqlite" keeps tasks in tasks.db (an existing tasks.csv is migrated on first use)
+storage_mode = "csv"
+
+# Size of tasks.journal (in bytes) that triggers compacting it into a fresh tasks.csv
+journal_compaction_size = 1024 * 1024
+
+# Columns of tasks.csv, older files without priority and due are still loaded
+task_titles = ["id", "name", "description", "status", "priority", "due"]
+
+# Task priorities from the most to the least important
+priorities = ["high", "medium", "low"]
+
 
 # Detecting os and running file location
 def os_detect():
@@ -53,11 +105,1167 @@ def tasks_csv_exists():
 
 # Creating a new tasks.csv file for tasks management
 def tasks_csv_create():
-    titles = ["id", "name", "description", "status"]
-    with open(file_location + "tasks.csv", "w", newline="") as csv_file:
+    write_csv_atomically(file_location + "tasks.csv", [])
+
+
+# Writing the titles and the given tasks to a temporary file next to path and returning its name
+def write_temp_csv(path, tasks):
+    titles = task_titles
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", newline="") as csv_file:
         csv_writer = csv.writer(csv_file)
         csv_writer.writerow(titles)
-        csv_file.close()
+        csv_writer.writerows(tasks)
+        csv_file.flush()
+        os.fsync(csv_file.fileno())
+    return temp_path
+
+
+# Replacing a tasks file in one step, so a crash never leaves it half-written
+def write_csv_atomically(path, tasks):
+    os.replace(write_temp_csv(path, tasks), path)
+
+
+# Padding a task row from an older 4-column tasks.csv with an empty priority and due date
+def pad_task(row):
+    return (list(row) + [""] * len(task_titles))[: len(task_titles)]
+
+
+# Converting a priority (high, medium, low or their first letter) to its saved form, "" for none and None if invalid
+def parse_priority(value):
+    value = value.strip().casefold()
+    if value == "":
+        return ""
+    for priority in priorities:
+        if value == priority or value == priority[0]:
+            return priority
+    return None
+
+
+# Converting a due date (YYYY-MM-DD) to its saved form, "" for none and None if invalid
+def parse_due(value):
+    value = value.strip()
+    if value == "":
+        return ""
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+# Locking a lock file so only one process changes the tasks files at a time
+@contextlib.contextmanager
+def locked_file(path):
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield lock_file
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Exception raised when the saved tasks have been changed by someone else since the user has seen them
+class TaskConflictError(Exception):
+    pass
+
+
+# Class to keep the next task ID and the casefolded task names next to tasks.csv (in tasks.idx)
+# so adding a task doesn't need to load tasks.csv, the index can always be rebuilt from tasks.csv
+class TaskIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # The compaction thread of the journal store also writes the signature
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            PRAGMA synchronous = OFF;
+            CREATE TABLE IF NOT EXISTS task_names (
+                name_key TEXT PRIMARY KEY,
+                id TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+
+    # Reading a value from the settings table
+    def get_setting(self, key, default=None):
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT value FROM settings WHERE key = ?", (key,)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return default
+        return row[0]
+
+    # Saving a value to the settings table
+    def set_setting(self, key, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    # Checking whether the index was last updated for the data files with the given signature
+    def matches(self, signature):
+        return signature is not None and self.get_setting("signature") == repr(signature)
+
+    # Remembering the signature of the data files the index belongs to (None marks the index as stale)
+    def set_signature(self, signature):
+        self.set_setting("signature", repr(signature))
+
+    # Returning the ID for the next new task
+    def next_id(self):
+        return int(self.get_setting("next_id", "1"))
+
+    # Checking whether a task name (case-insensitive) is already used
+    def has_name(self, task_name):
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT 1 FROM task_names WHERE name_key = ?", (task_name.casefold(),)
+            )
+            return cursor.fetchone() is not None
+
+    # Adding the name of a new task and moving the ID counter past its ID
+    def add_task(self, task):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO task_names (name_key, id) VALUES (?, ?)",
+                (task[1].casefold(), task[0]),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('next_id', ?)",
+                (str(max(int(task[0]) + 1, self.next_id_unlocked())),),
+            )
+
+    # Reading the ID counter while the lock is already held
+    def next_id_unlocked(self):
+        cursor = self.connection.execute("SELECT value FROM settings WHERE key = 'next_id'")
+        row = cursor.fetchone()
+        if row is None:
+            return 1
+        return int(row[0])
+
+    # Replacing the name of an edited task
+    def rename_task(self, old_task, new_task):
+        if old_task[1].casefold() == new_task[1].casefold():
+            return None
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM task_names WHERE name_key = ? AND id = ?",
+                (old_task[1].casefold(), old_task[0]),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO task_names (name_key, id) VALUES (?, ?)",
+                (new_task[1].casefold(), new_task[0]),
+            )
+
+    # Removing the name of a deleted task (its ID is never given out again)
+    def remove_task(self, task):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM task_names WHERE name_key = ? AND id = ?",
+                (task[1].casefold(), task[0]),
+            )
+
+    # Rebuilding the names and the ID counter from all saved tasks
+    def rebuild(self, tasks, next_id, signature):
+        with self.lock, self.connection:
+            next_id = max(next_id, self.next_id_unlocked())
+            self.connection.execute("DELETE FROM task_names")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO task_names (name_key, id) VALUES (?, ?)",
+                ((task[1].casefold(), task[0]) for task in tasks),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('next_id', ?)",
+                (str(next_id),),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES ('signature', ?)",
+                (repr(signature),),
+            )
+
+    # Removing all names and starting the ID counter from 1 again
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM task_names")
+            self.connection.execute("DELETE FROM settings")
+
+    # Closing the index database
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# Class to search task names and descriptions with an inverted index from tokens to task IDs
+# Queries are words (a trailing * matches a prefix) combined with AND (the default) and OR
+class TaskSearchIndex:
+    token_pattern = re.compile(r"\w+")
+
+    def __init__(self, tasks=[]):
+        # token -> {task ID: number of times the token appears in the task}
+        self.postings = {}
+        # task ID -> tokens of the task, to remove it again on edit or delete
+        self.task_tokens = {}
+        # All tokens in sorted order for prefix queries
+        self.sorted_tokens = []
+        for task in tasks:
+            self.add_task(task)
+
+    # Splitting a text into casefolded tokens
+    def tokenize(self, text):
+        return self.token_pattern.findall(text.casefold())
+
+    # Adding (or replacing) a task in the index
+    def add_task(self, task):
+        if task[0] in self.task_tokens:
+            self.remove_task(task[0])
+        token_counts = {}
+        for token in self.tokenize(task[1] + " " + task[2]):
+            token_counts[token] = token_counts.get(token, 0) + 1
+        for token, token_count in token_counts.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.sorted_tokens, token)
+            self.postings[token][task[0]] = token_count
+        self.task_tokens[task[0]] = list(token_counts)
+
+    # Removing a task from the index
+    def remove_task(self, task_id):
+        for token in self.task_tokens.pop(task_id, []):
+            posting = self.postings[token]
+            posting.pop(task_id, None)
+            if len(posting) == 0:
+                del self.postings[token]
+                del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+
+    # Finding the task IDs (with match counts) for one query word, a trailing * matches a prefix
+    def match_term(self, term):
+        if not term.endswith("*"):
+            tokens = self.tokenize(term)
+            if len(tokens) != 1:
+                return {}
+            return dict(self.postings.get(tokens[0], {}))
+        prefix = term[:-1].casefold()
+        matches = {}
+        position = bisect.bisect_left(self.sorted_tokens, prefix)
+        while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(prefix):
+            for task_id, token_count in self.postings[self.sorted_tokens[position]].items():
+                matches[task_id] = matches.get(task_id, 0) + token_count
+            position += 1
+        return matches
+
+    # Returning (task ID, match count) pairs for a query, ranked by match count
+    def search(self, query):
+        results = {}
+        # OR separates groups of words that must all match
+        for group in re.split(r"\s+OR\s+", query.strip()):
+            group_matches = None
+            for term in group.split():
+                if term == "AND":
+                    continue
+                term_matches = self.match_term(term)
+                if group_matches is None:
+                    group_matches = term_matches
+                else:
+                    group_matches = {
+                        task_id: token_count + term_matches[task_id]
+                        for task_id, token_count in group_matches.items()
+                        if task_id in term_matches
+                    }
+            for task_id, token_count in (group_matches or {}).items():
+                results[task_id] = max(results.get(task_id, 0), token_count)
+        return sorted(
+            results.items(),
+            key=lambda result: (-result[1], int(result[0]) if result[0].isdigit() else 0),
+        )
+
+
+# Class to keep uncompleted tasks in a heap ordered by due date (tasks without one last), then priority, then ID
+# Changed and removed tasks are only forgotten in entries, their old heap entries are skipped when they reach the top
+class NextUpQueue:
+    def __init__(self, tasks=[]):
+        # task ID -> the current heap entry of the task
+        self.entries = {}
+        for task in tasks:
+            if task[3].casefold() == "uncompleted":
+                self.entries[task[0]] = self.entry(task)
+        self.heap = list(self.entries.values())
+        heapq.heapify(self.heap)
+
+    # Building the heap entry (sort key and task ID) of a task
+    def entry(self, task):
+        if task[4] in priorities:
+            priority_rank = priorities.index(task[4])
+        else:
+            priority_rank = len(priorities)
+        task_number = int(task[0]) if task[0].isdigit() else 0
+        return (task[5] == "", task[5], priority_rank, task_number, task[0])
+
+    # Adding (or replacing) a task, completed tasks are removed from the queue
+    def add_task(self, task):
+        if task[3].casefold() != "uncompleted":
+            self.remove_task(task[0])
+            return None
+        entry = self.entry(task)
+        if self.entries.get(task[0]) == entry:
+            return None
+        self.entries[task[0]] = entry
+        heapq.heappush(self.heap, entry)
+        self.drop_stale_entries()
+
+    # Removing a task from the queue
+    def remove_task(self, task_id):
+        if self.entries.pop(task_id, None) is not None:
+            self.drop_stale_entries()
+
+    # Building the heap again once most of its entries belong to changed or removed tasks
+    def drop_stale_entries(self):
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = list(self.entries.values())
+            heapq.heapify(self.heap)
+
+    # Returning the IDs of the first tasks_num tasks in the queue, without sorting the whole heap
+    def next_up(self, tasks_num):
+        entries = []
+        while len(self.heap) != 0 and len(entries) < tasks_num:
+            entry = heapq.heappop(self.heap)
+            # Skipping stale entries, they are not pushed back
+            if self.entries.get(entry[-1]) is entry:
+                entries.append(entry)
+        for entry in entries:
+            heapq.heappush(self.heap, entry)
+        return [entry[-1] for entry in entries]
+
+
+# Class to load tasks.csv once and keep all tasks in memory, indexed by ID and by casefolded name
+# Every storage mode provides the same methods: all, iter_tasks, count, get_by_id, get_by_name, name_exists, next_id,
+# add, complete, update, delete, reset, batch, rebuild_index, search, next_up and close
+# Tasks are passed around as [id, name, description, status, priority, due] lists of strings
+class TaskStore:
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path[: -len(".csv")] + ".journal"
+        self.compacting_path = self.journal_path + ".compacting"
+        self.tasks_by_id = {}
+        self.tasks_by_name = {}
+        self.status_counts = {}
+        self.last_id = 0
+        self.search_index = None
+        self.next_up_queue = None
+        self.loaded = False
+        # Whether tasks.csv starts with the titles of this version (None until it has been read)
+        self.current_titles = None
+        self.batch_depth = 0
+        self.unsaved_changes = False
+        self.lock_path = path[: -len(".csv")] + ".lock"
+        self.lock_depth = 0
+        self.index = TaskIndex(path[: -len(".csv")] + ".idx")
+        # tasks.csv is only loaded when tasks are read, adding tasks only needs tasks.idx
+        if self.index.matches(self.signature()):
+            self.file_signature = self.signature()
+        else:
+            self.file_signature = None
+
+    # Reading size and modification time of tasks.csv to detect changes made outside the app
+    def signature(self):
+        try:
+            file_stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    # Loading all tasks into memory and rebuilding tasks.idx if it doesn't match the data files
+    def load(self):
+        self.fold_journal()
+        # The signature is taken first, so changes made while reading are picked up by the next refresh
+        self.file_signature = self.signature()
+        self.read_tasks()
+        self.loaded = True
+        if not self.index.matches(self.file_signature):
+            self.index.rebuild(
+                self.tasks_by_id.values(), self.last_id + 1, self.file_signature
+            )
+
+    # Reading all tasks from tasks.csv into the ID and name dictionaries
+    def read_tasks(self):
+        if not os.path.exists(self.path):
+            tasks_csv_create()
+        self.tasks_by_id = {}
+        self.tasks_by_name = {}
+        self.status_counts = {}
+        self.last_id = 0
+        # The search index and the next up queue are built again when they are needed
+        self.search_index = None
+        self.next_up_queue = None
+        with open(self.path, "r", newline="") as csv_file:
+            csv_reader = csv.reader(csv_file)
+            self.current_titles = next(csv_reader, None) == task_titles
+            for row in csv_reader:
+                if len(row) == 0:
+                    continue
+                self.index_task(pad_task(row))
+
+    # Writing the records of a tasks.journal left behind by the journal storage mode into tasks.csv and removing it,
+    # so both storage modes see the same tasks (tasks.idx is shared by them)
+    def fold_journal(self):
+        if not os.path.exists(self.compacting_path) and not os.path.exists(self.journal_path):
+            return None
+        lock = locked_file(self.lock_path) if self.lock_depth == 0 else contextlib.nullcontext()
+        with lock:
+            self.read_tasks()
+            journal_paths = [path for path in [self.compacting_path, self.journal_path] if os.path.exists(path)]
+            for path in journal_paths:
+                with open(path, "r", newline="") as journal_file:
+                    for record in csv.reader(journal_file):
+                        if len(record) != 0:
+                            self.replay(record)
+            write_csv_atomically(self.path, self.tasks_by_id.values())
+            for path in journal_paths:
+                os.remove(path)
+
+    # Applying one journal record (add, edit, complete or delete) to the tasks in memory
+    def replay(self, record):
+        operation = record[0]
+        if operation == "add" or operation == "edit":
+            self.index_task(pad_task(record[1:]))
+        elif operation == "complete":
+            old_task = self.tasks_by_id.get(record[1])
+            if old_task is not None:
+                self.index_task(old_task[:3] + ["completed"] + old_task[4:])
+        elif operation == "delete":
+            old_task = self.tasks_by_id.get(record[1])
+            if old_task is not None:
+                self.unindex_task(old_task)
+
+    # Loading tasks for the first time, or again if tasks.csv has been changed outside the app
+    def refresh(self):
+        if not self.loaded or self.signature() != self.file_signature:
+            self.load()
+
+    # Reloading (and reindexing) tasks only if tasks.csv has been changed outside the app
+    def check_index(self):
+        signature = self.signature()
+        if signature == self.file_signature:
+            return None
+        if not self.loaded and self.index.matches(signature):
+            # Another process running this app changed the files and updated tasks.idx as well
+            self.file_signature = signature
+            return None
+        self.load()
+
+    # Remembering the current state of the data files as our own change
+    def remember_signature(self):
+        self.file_signature = self.signature()
+        if self.unsaved_changes:
+            # tasks.csv is behind the index until the batch is saved
+            self.index.set_signature(None)
+        else:
+            self.index.set_signature(self.file_signature)
+
+    # Adding (or replacing, keeping its place in ID order) a task in the ID and name dictionaries
+    def index_task(self, task):
+        old_task = self.tasks_by_id.get(task[0])
+        if old_task is not None:
+            self.unindex_name(old_task)
+        self.tasks_by_id[task[0]] = task
+        self.tasks_by_name[task[1].casefold()] = task
+        self.count_status(task[3], 1)
+        if task[0].isdigit() and int(task[0]) > self.last_id:
+            self.last_id = int(task[0])
+        if self.search_index is not None:
+            self.search_index.add_task(task)
+        if self.next_up_queue is not None:
+            self.next_up_queue.add_task(task)
+
+    # Removing a task from the ID and name dictionaries
+    def unindex_task(self, task):
+        self.tasks_by_id.pop(task[0], None)
+        self.unindex_name(task)
+        if self.search_index is not None:
+            self.search_index.remove_task(task[0])
+        if self.next_up_queue is not None:
+            self.next_up_queue.remove_task(task[0])
+
+    # Removing a task from the name dictionary and the status counters
+    def unindex_name(self, task):
+        if self.tasks_by_name.get(task[1].casefold()) is task:
+            del self.tasks_by_name[task[1].casefold()]
+        self.count_status(task[3], -1)
+
+    # Keeping the number of tasks for each status up to date
+    def count_status(self, status, change):
+        status = status.casefold()
+        self.status_counts[status] = self.status_counts.get(status, 0) + change
+
+    # Returning a copy of all tasks (optionally only the ones with the given status) in ID order
+    def all(self, status=None):
+        self.refresh()
+        return [
+            list(task)
+            for task in self.tasks_by_id.values()
+            if status is None or task[3].casefold() == status
+        ]
+
+    # Streaming tasks (optionally only the ones with the given status) in ID order, skipping the first offset tasks
+    def iter_tasks(self, status=None, offset=0):
+        self.refresh()
+        tasks = (
+            task
+            for task in self.tasks_by_id.values()
+            if status is None or task[3].casefold() == status
+        )
+        for task in itertools.islice(tasks, offset, None):
+            yield list(task)
+
+    # Returning the number of tasks (optionally only the ones with the given status) from the cached counters
+    def count(self, status=None):
+        self.refresh()
+        if status is None:
+            return len(self.tasks_by_id)
+        return self.status_counts.get(status, 0)
+
+    # Returning a copy of the task with the given ID or None
+    def get_by_id(self, task_id):
+        self.refresh()
+        task = self.tasks_by_id.get(str(task_id))
+        if task is None:
+            return None
+        return list(task)
+
+    # Returning a copy of the task with the given name (case-insensitive) or None
+    def get_by_name(self, task_name):
+        self.refresh()
+        task = self.tasks_by_name.get(task_name.casefold())
+        if task is None:
+            return None
+        return list(task)
+
+    # Checking whether a task name (case-insensitive) is already used, without loading tasks.csv
+    def name_exists(self, task_name):
+        self.check_index()
+        if self.loaded:
+            return task_name.casefold() in self.tasks_by_name
+        return self.index.has_name(task_name)
+
+    # Generating the ID for the next new task from the persisted ID counter
+    def next_id(self):
+        self.check_index()
+        return self.index.next_id()
+
+    # Holding the lock on tasks.lock while changing tasks, so changes made by other processes aren't lost
+    # User input never happens inside a transaction, so the lock is only held for a moment
+    @contextlib.contextmanager
+    def transaction(self):
+        if self.lock_depth > 0:
+            self.lock_depth += 1
+            try:
+                yield self
+            finally:
+                self.lock_depth -= 1
+            return None
+        with locked_file(self.lock_path):
+            self.lock_depth = 1
+            try:
+                # Picking up changes other processes made before the lock was taken
+                self.check_index()
+                yield self
+            finally:
+                self.lock_depth = 0
+
+    # Returning the saved task with the given ID, raising TaskConflictError if it isn't the task the user has seen
+    def current_task(self, task_id, expected_task=None):
+        self.refresh()
+        task = self.tasks_by_id.get(str(task_id))
+        if task is None:
+            if expected_task is not None:
+                raise TaskConflictError("Selected task has been deleted by someone else!")
+            return None
+        if expected_task is not None and list(task) != list(expected_task):
+            raise TaskConflictError(
+                "Selected task has been changed by someone else! Please view it again and retry"
+            )
+        return task
+
+    # Adding a new task
+    def add(self, task_name, task_description, task_priority="", task_due=""):
+        with self.transaction():
+            if self.index.has_name(task_name):
+                raise TaskConflictError(f"You saved a task with {task_name} name before!")
+            task = [
+                str(self.index.next_id()),
+                task_name,
+                task_description,
+                "uncompleted",
+                task_priority,
+                task_due,
+            ]
+            self.index.add_task(task)
+            self.write_new_task(task)
+        return list(task)
+
+    # Marking a saved task as completed
+    def complete(self, task_id, expected_task=None):
+        with self.transaction():
+            old_task = self.current_task(task_id, expected_task)
+            if old_task is None:
+                return None
+            task = old_task[:3] + ["completed"] + old_task[4:]
+            self.write_changed_task(old_task, task)
+        return list(task)
+
+    # Replacing a saved task (matched by ID)
+    def update(self, task, expected_task=None):
+        with self.transaction():
+            old_task = self.current_task(task[0], expected_task)
+            if old_task is None:
+                return None
+            same_name_task = self.tasks_by_name.get(task[1].casefold())
+            if same_name_task is not None and same_name_task[0] != task[0]:
+                raise TaskConflictError(f"You saved another task with {task[1]} name before!")
+            task = list(task)
+            self.write_changed_task(old_task, task)
+        return list(task)
+
+    # Deleting a saved task by ID
+    def delete(self, task_id, expected_task=None):
+        with self.transaction():
+            task = self.current_task(task_id, expected_task)
+            if task is None:
+                return None
+            self.write_deleted_task(task)
+        return list(task)
+
+    # Appending a new task to tasks.csv
+    # A tasks.csv with the titles of an older version is written again with the current titles first,
+    # so it never has rows of different widths
+    def write_new_task(self, task):
+        if self.current_titles is None:
+            with open(self.path, "r", newline="") as csv_file:
+                self.current_titles = next(csv.reader(csv_file), None) == task_titles
+        if not self.current_titles:
+            self.refresh()
+            write_csv_atomically(self.path, self.tasks_by_id.values())
+            self.current_titles = True
+        with open(self.path, "a", newline="") as csv_file:
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(task)
+        if self.loaded:
+            self.index_task(task)
+        self.remember_signature()
+
+    # Saving a changed task by writing tasks.csv again
+    def write_changed_task(self, old_task, task):
+        self.index_task(task)
+        self.index.rename_task(old_task, task)
+        self.save()
+
+    # Saving a deleted task by writing tasks.csv again
+    def write_deleted_task(self, task):
+        self.unindex_task(task)
+        self.index.remove_task(task)
+        self.save()
+
+    # Deleting all tasks(reset data)
+    def reset(self):
+        with self.transaction():
+            write_csv_atomically(self.path, [])
+            self.index.clear()
+            self.load()
+
+    # Searching task names and descriptions, returning (task, match count) pairs ranked by match count
+    def search(self, query):
+        self.refresh()
+        if self.search_index is None:
+            self.search_index = TaskSearchIndex(self.tasks_by_id.values())
+        return [
+            (list(self.tasks_by_id[task_id]), matches_num)
+            for task_id, matches_num in self.search_index.search(query)
+        ]
+
+    # Returning the first tasks_num uncompleted tasks ordered by due date, then priority
+    def next_up(self, tasks_num):
+        self.refresh()
+        if self.next_up_queue is None:
+            self.next_up_queue = NextUpQueue(self.tasks_by_id.values())
+        return [list(self.tasks_by_id[task_id]) for task_id in self.next_up_queue.next_up(tasks_num)]
+
+    # Rebuilding tasks.idx from tasks.csv
+    def rebuild_index(self):
+        with self.transaction():
+            self.index.set_signature(None)
+            self.load()
+
+    # Closing tasks.idx
+    def close(self):
+        self.index.close()
+
+    # Grouping many changes in one transaction so tasks.csv is written only once at the end
+    @contextlib.contextmanager
+    def batch(self):
+        with self.transaction():
+            self.batch_depth += 1
+            try:
+                yield self
+            finally:
+                self.batch_depth -= 1
+                if self.batch_depth == 0 and self.unsaved_changes:
+                    self.unsaved_changes = False
+                    self.save()
+
+    # Writing all tasks from memory back to tasks.csv (once at the end of a batch)
+    def save(self):
+        if self.batch_depth > 0:
+            self.unsaved_changes = True
+            return None
+        write_csv_atomically(self.path, self.tasks_by_id.values())
+        self.remember_signature()
+
+
+# Class to keep tasks in tasks.csv plus an append-only tasks.journal, one record per change
+class JournalTaskStore(TaskStore):
+    def __init__(self, path):
+        # Reentrant, because loading can happen while a change is being written
+        self.lock = threading.RLock()
+        self.compaction_thread = None
+        super().__init__(path)
+
+    # Reading size and modification time of tasks.csv and tasks.journal together
+    def signature(self):
+        signatures = []
+        for path in [self.path, self.compacting_path, self.journal_path]:
+            try:
+                file_stat = os.stat(path)
+            except FileNotFoundError:
+                signatures.append(None)
+                continue
+            signatures.append((file_stat.st_mtime_ns, file_stat.st_size))
+        return tuple(signatures)
+
+    # Loading while holding the lock, so the compaction thread doesn't race with it
+    def load(self):
+        with self.lock:
+            super().load()
+
+    # The journal is replayed by read_tasks and compacted in the background, not folded into tasks.csv on load
+    def fold_journal(self):
+        return None
+
+    # Reading tasks.csv and replaying the journal records on top of it
+    def read_tasks(self):
+        super().read_tasks()
+        # A journal left over from an interrupted compaction is replayed first
+        for path in [self.compacting_path, self.journal_path]:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", newline="") as journal_file:
+                for record in csv.reader(journal_file):
+                    if len(record) != 0:
+                        self.replay(record)
+
+    # Refreshing while holding the lock, so the compaction thread doesn't race with it
+    def refresh(self):
+        with self.lock:
+            super().refresh()
+
+    # Reindexing while holding the lock, so the compaction thread doesn't race with it
+    def check_index(self):
+        with self.lock:
+            super().check_index()
+
+    # Appending one record to tasks.journal and starting a compaction if the journal is too big
+    def append_record(self, record):
+        with self.lock:
+            with open(self.journal_path, "a", newline="") as journal_file:
+                csv_writer = csv.writer(journal_file)
+                csv_writer.writerow(record)
+                journal_size = journal_file.tell()
+            if self.loaded:
+                self.replay(record)
+            self.remember_signature()
+        if journal_size >= journal_compaction_size:
+            self.start_compaction()
+
+    # Saving a new task with an "add" journal record
+    def write_new_task(self, task):
+        self.append_record(["add"] + task)
+
+    # Saving a changed task with a "complete" or an "edit" journal record
+    def write_changed_task(self, old_task, task):
+        self.index.rename_task(old_task, task)
+        if old_task[:3] + old_task[4:] == task[:3] + task[4:] and task[3] == "completed":
+            self.append_record(["complete", task[0]])
+        else:
+            self.append_record(["edit"] + task)
+
+    # Saving a deleted task with a "delete" journal record
+    def write_deleted_task(self, task):
+        self.index.remove_task(task)
+        self.append_record(["delete", task[0]])
+
+    # Deleting all tasks(reset data) and the journal files
+    def reset(self):
+        self.wait_for_compaction()
+        with self.transaction():
+            for path in [self.compacting_path, self.journal_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+            super().reset()
+
+    # Moving the journal aside and writing a fresh tasks.csv from a snapshot in a background thread
+    def start_compaction(self):
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return None
+        with self.transaction(), self.lock:
+            if os.path.exists(self.compacting_path):
+                return None
+            # The snapshot must contain every task, not only the ones added in this session
+            self.refresh()
+            os.replace(self.journal_path, self.compacting_path)
+            # Tasks are never changed in place, so a shallow copy is a consistent snapshot
+            snapshot = list(self.tasks_by_id.values())
+            self.remember_signature()
+        self.compaction_thread = threading.Thread(target=self.compact, args=(snapshot,))
+        self.compaction_thread.start()
+
+    # Writing the snapshot to a temporary file, then replacing tasks.csv and dropping the compacted journal
+    def compact(self, snapshot):
+        # Only the replace happens while holding tasks.lock
+        temp_path = write_temp_csv(self.path, snapshot)
+        with locked_file(self.lock_path), self.lock:
+            os.replace(temp_path, self.path)
+            os.remove(self.compacting_path)
+            self.remember_signature()
+
+    # Waiting for a running compaction to finish
+    def wait_for_compaction(self):
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+
+    # Waiting for a running compaction and closing tasks.idx
+    def close(self):
+        self.wait_for_compaction()
+        super().close()
+
+
+# Class to keep tasks in an SQLite database with indexes on ID, casefolded name and status
+class SqliteTaskStore:
+    def __init__(self, path):
+        self.path = path
+        self.batch_depth = 0
+        self.search_index = None
+        self.data_version = None
+        self.next_up_queue = None
+        self.next_up_data_version = None
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                name_key TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'uncompleted',
+                priority TEXT NOT NULL DEFAULT '',
+                due TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS tasks_name_key ON tasks (name_key);
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+            """
+        )
+        # Adding the priority and due columns to a tasks.db created before they existed
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(tasks)")]
+        with self.connection:
+            for column in ["priority", "due"]:
+                if column not in columns:
+                    self.connection.execute(
+                        f"ALTER TABLE tasks ADD COLUMN {column} TEXT NOT NULL DEFAULT ''"
+                    )
+
+    # Committing every change right away, or once at the end of a batch
+    @contextlib.contextmanager
+    def transaction(self):
+        if self.batch_depth > 0:
+            yield self.connection
+            return None
+        with self.connection:
+            yield self.connection
+
+    # Grouping many changes into one transaction
+    @contextlib.contextmanager
+    def batch(self):
+        self.batch_depth += 1
+        try:
+            yield self
+        except Exception:
+            if self.batch_depth == 1:
+                self.connection.rollback()
+            raise
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.connection.commit()
+
+    # Converting a database row to the [id, name, description, status, priority, due] list used by the menu functions
+    def task_from_row(self, row):
+        if row is None:
+            return None
+        return [str(row[0])] + list(row[1:])
+
+    # Returning all tasks (optionally only the ones with the given status) in ID order
+    def all(self, status=None):
+        if status is None:
+            cursor = self.connection.execute(
+                "SELECT id, name, description, status, priority, due FROM tasks ORDER BY id"
+            )
+        else:
+            cursor = self.connection.execute(
+                "SELECT id, name, description, status, priority, due FROM tasks WHERE status = ? ORDER BY id",
+                (status,),
+            )
+        return [self.task_from_row(row) for row in cursor]
+
+    # Streaming tasks (optionally only the ones with the given status) in ID order, skipping the first offset tasks
+    def iter_tasks(self, status=None, offset=0):
+        if status is None:
+            cursor = self.connection.execute(
+                "SELECT id, name, description, status, priority, due FROM tasks ORDER BY id LIMIT -1 OFFSET ?",
+                (offset,),
+            )
+        else:
+            cursor = self.connection.execute(
+                "SELECT id, name, description, status, priority, due FROM tasks WHERE status = ? ORDER BY id LIMIT -1 OFFSET ?",
+                (status, offset),
+            )
+        for row in cursor:
+            yield self.task_from_row(row)
+
+    # Returning the number of tasks (optionally only the ones with the given status)
+    def count(self, status=None):
+        if status is None:
+            cursor = self.connection.execute("SELECT COUNT(*) FROM tasks")
+        else:
+            cursor = self.connection.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status = ?", (status,)
+            )
+        return cursor.fetchone()[0]
+
+    # Returning the task with the given ID or None
+    def get_by_id(self, task_id):
+        if not str(task_id).isdigit():
+            return None
+        cursor = self.connection.execute(
+            "SELECT id, name, description, status, priority, due FROM tasks WHERE id = ?",
+            (int(task_id),),
+        )
+        return self.task_from_row(cursor.fetchone())
+
+    # Returning the task with the given name (case-insensitive) or None
+    def get_by_name(self, task_name):
+        cursor = self.connection.execute(
+            "SELECT id, name, description, status, priority, due FROM tasks WHERE name_key = ?",
+            (task_name.casefold(),),
+        )
+        return self.task_from_row(cursor.fetchone())
+
+    # Checking whether a task name (case-insensitive) is already used
+    def name_exists(self, task_name):
+        cursor = self.connection.execute(
+            "SELECT 1 FROM tasks WHERE name_key = ? LIMIT 1", (task_name.casefold(),)
+        )
+        return cursor.fetchone() is not None
+
+    # Generating the ID for the next new task
+    def next_id(self):
+        cursor = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM tasks")
+        return cursor.fetchone()[0]
+
+    # Adding a new task
+    def add(self, task_name, task_description, task_priority="", task_due=""):
+        with self.transaction():
+            if self.name_exists(task_name):
+                raise TaskConflictError(f"You saved a task with {task_name} name before!")
+            cursor = self.connection.execute(
+                "INSERT INTO tasks (name, name_key, description, status, priority, due) "
+                "VALUES (?, ?, ?, 'uncompleted', ?, ?)",
+                (task_name, task_name.casefold(), task_description, task_priority, task_due),
+            )
+        task = [str(cursor.lastrowid), task_name, task_description, "uncompleted", task_priority, task_due]
+        self.index_task(task)
+        return task
+
+    # Adding many [id, name, description, status, priority, due] tasks in one transaction
+    def add_many(self, tasks):
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tasks (id, name, name_key, description, status, priority, due) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (int(task[0]), task[1], task[1].casefold(), task[2], task[3], task[4], task[5])
+                    for task in map(pad_task, tasks)
+                ),
+            )
+
+    # Keeping the search index and the next up queue up to date with a task changed by this connection
+    def index_task(self, task):
+        if self.search_index is not None:
+            self.search_index.add_task(task)
+        if self.next_up_queue is not None:
+            self.next_up_queue.add_task(task)
+
+    # Returning the saved task with the given ID, raising TaskConflictError if it has been deleted since the user has seen it
+    def current_task(self, task_id, expected_task=None):
+        task = self.get_by_id(task_id)
+        if task is None and expected_task is not None:
+            raise TaskConflictError("Selected task has been deleted by someone else!")
+        return task
+
+    # Marking a saved task as completed
+    def complete(self, task_id, expected_task=None):
+        old_task = self.current_task(task_id, expected_task)
+        if old_task is None:
+            return None
+        task = old_task[:3] + ["completed"] + old_task[4:]
+        return self.update(task, expected_task or old_task)
+
+    # Replacing a saved task (matched by ID), only if it still matches expected_task when that is given
+    def update(self, task, expected_task=None):
+        with self.transaction():
+            same_name_task = self.get_by_name(task[1])
+            if same_name_task is not None and same_name_task[0] != task[0]:
+                raise TaskConflictError(f"You saved another task with {task[1]} name before!")
+            if expected_task is None:
+                cursor = self.connection.execute(
+                    "UPDATE tasks SET name = ?, name_key = ?, description = ?, status = ?, priority = ?, due = ? "
+                    "WHERE id = ?",
+                    (task[1], task[1].casefold(), task[2], task[3], task[4], task[5], int(task[0])),
+                )
+            else:
+                cursor = self.connection.execute(
+                    "UPDATE tasks SET name = ?, name_key = ?, description = ?, status = ?, priority = ?, due = ? "
+                    "WHERE id = ? AND name = ? AND description = ? AND status = ? AND priority = ? AND due = ?",
+                    (task[1], task[1].casefold(), task[2], task[3], task[4], task[5], int(task[0]))
+                    + tuple(pad_task(expected_task)[1:]),
+                )
+        if cursor.rowcount == 0:
+            if expected_task is None:
+                return None
+            self.current_task(task[0], expected_task)
+            raise TaskConflictError(
+                "Selected task has been changed by someone else! Please view it again and retry"
+            )
+        task = list(task)
+        self.index_task(task)
+        return task
+
+    # Deleting a saved task by ID, only if it still matches expected_task when that is given
+    def delete(self, task_id, expected_task=None):
+        task = self.current_task(task_id, expected_task)
+        if task is None:
+            return None
+        if expected_task is None:
+            expected_task = task
+        with self.transaction():
+            cursor = self.connection.execute(
+                "DELETE FROM tasks WHERE id = ? AND name = ? AND description = ? AND status = ? "
+                "AND priority = ? AND due = ?",
+                (int(task[0]),) + tuple(pad_task(expected_task)[1:]),
+            )
+        if cursor.rowcount == 0:
+            raise TaskConflictError(
+                "Selected task has been changed by someone else! Please view it again and retry"
+            )
+        if self.search_index is not None:
+            self.search_index.remove_task(task[0])
+        if self.next_up_queue is not None:
+            self.next_up_queue.remove_task(task[0])
+        return task
+
+    # Deleting all tasks(reset data)
+    def reset(self):
+        with self.transaction():
+            self.connection.execute("DELETE FROM tasks")
+        self.search_index = None
+        self.next_up_queue = None
+
+    # Searching task names and descriptions, returning (task, match count) pairs ranked by match count
+    def search(self, query):
+        # data_version changes when another connection has changed tasks.db
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self.search_index is None or data_version != self.data_version:
+            self.search_index = TaskSearchIndex(self.iter_tasks())
+            self.data_version = data_version
+        results = []
+        for task_id, matches_num in self.search_index.search(query):
+            task = self.get_by_id(task_id)
+            if task is not None:
+                results.append((task, matches_num))
+        return results
+
+    # Returning the first tasks_num uncompleted tasks ordered by due date, then priority
+    def next_up(self, tasks_num):
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self.next_up_queue is None or data_version != self.next_up_data_version:
+            self.next_up_queue = NextUpQueue(self.iter_tasks("uncompleted"))
+            self.next_up_data_version = data_version
+        tasks = []
+        for task_id in self.next_up_queue.next_up(tasks_num):
+            task = self.get_by_id(task_id)
+            if task is not None:
+                tasks.append(task)
+        return tasks
+
+    # Rebuilding the name and status indexes
+    def rebuild_index(self):
+        with self.transaction():
+            self.connection.execute("REINDEX tasks")
+
+    # Closing tasks.db
+    def close(self):
+        self.connection.close()
+
+
+# Migrating all tasks from tasks.csv (and a pending tasks.journal) to an SQLite database, returning their number
+# Nothing is migrated if there are no tasks
+def migrate_csv_to_sqlite(csv_path, db_path):
+    csv_store = JournalTaskStore(csv_path)
+    tasks = csv_store.all()
+    csv_store.close()
+    if len(tasks) == 0:
+        return 0
+    sqlite_store = SqliteTaskStore(db_path)
+    sqlite_store.add_many(tasks)
+    sqlite_store.close()
+    return len(tasks)
+
+
+# Creating the task store for the selected storage mode
+def open_task_store():
+    if storage_mode == "journal":
+        return JournalTaskStore(file_location + "tasks.csv")
+    if storage_mode == "sqlite":
+        db_path = file_location + "tasks.db"
+        if not os.path.exists(db_path) and os.path.exists(file_location + "tasks.csv"):
+            migrated_tasks_num = migrate_csv_to_sqlite(file_location + "tasks.csv", db_path)
+            # On stderr, so the output of the command line commands stays clean
+            if migrated_tasks_num != 0:
+                print(
+                    termcolor.colored(
+                        f"{migrated_tasks_num} tasks have been migrated from tasks.csv to tasks.db",
+                        "green",
+                        "on_black",
+                    ),
+                    file=sys.stderr,
+                )
+        return SqliteTaskStore(db_path)
+    return TaskStore(file_location + "tasks.csv")
 
 
 # Displaying main menu
@@ -70,38 +1278,41 @@ def display_menu():
     print("5. Mark task as completed")
     print("6. Delete specific task")
     print("7. Delete all tasks(reset data)")
+    # Quit keeps its number, so input piped into the menu still works after options are added
+    print("9. Search tasks")
+    print("10. View next up tasks")
     print("8. Quit")
 
 
-# Function to display the current tasks
-def display_tasks():
-    # Loading all tasks from task.csv to a list structure
-    tasks = []
-
-    with open(file_location + "tasks.csv", "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        for row in csv_reader:
-            tasks.append(row)
-
-    # Removing the title's
-    tasks.pop(0)
+# Streaming completed tasks first and then uncompleted tasks, one page at a time
+def iter_display_tasks(status=None, offset=0, page_size=None):
+    if status is None:
+        statuses = ["completed", "uncompleted"]
+    else:
+        statuses = [status]
+    for status in statuses:
+        status_tasks_num = task_store.count(status)
+        if offset >= status_tasks_num:
+            offset -= status_tasks_num
+            continue
+        for task in task_store.iter_tasks(status, offset):
+            if page_size == 0:
+                return None
+            yield task
+            if page_size is not None:
+                page_size -= 1
+        offset = 0
 
-    # Sorting tasks
-    total_tasks_num = len(tasks)
 
-    completed_tasks = []
-    uncompleted_tasks = []
-    for task in tasks:
-        if task[3].casefold() == "completed":
-            completed_tasks.append(task)
-        elif task[3].casefold() == "uncompleted":
-            uncompleted_tasks.append(task)
-    tasks = completed_tasks + uncompleted_tasks
-    completed_tasks_num = len(completed_tasks)
-    uncompleted_tasks_num = len(uncompleted_tasks)
+# Function to display the current tasks page by page
+def display_tasks():
+    # Counting tasks from the task store's counters
+    completed_tasks_num = task_store.count("completed")
+    uncompleted_tasks_num = task_store.count("uncompleted")
+    total_tasks_num = completed_tasks_num + uncompleted_tasks_num
 
     # Output to show all saved tasks
-    if len(tasks) == 0:
+    if total_tasks_num == 0:
         print(termcolor.colored("No tasks have been saved!", "yellow", "on_black"))
         return None
 
@@ -114,41 +1325,86 @@ def display_tasks():
     )
     print(termcolor.colored(f"Completed tasks: {completed_tasks_num}", "green"))
     print(termcolor.colored(f"Uncompleted tasks: {uncompleted_tasks_num}", "yellow"))
-    print(termcolor.colored("`" * 3, "cyan", "on_black"))
-    for task in tasks:
-        if task[3].casefold() == "completed":
-            output_color = "green"
-        elif task[3].casefold() == "uncompleted":
-            output_color = "yellow"
-        print(
-            f"Task ID: {termcolor.colored(task[0], output_color)} - Task name: {termcolor.colored(task[1], output_color)} - Status: {termcolor.colored(task[3], output_color)}"
+
+    # Getting the status filter and the page size
+    while True:
+        user_input = input(
+            "Which tasks do you want to see? (A all, C completed, U uncompleted, default A): "
         )
-    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        if user_input == "" or user_input.casefold() == "a":
+            status = None
+            shown_tasks_num = total_tasks_num
+        elif user_input.casefold() == "c":
+            status = "completed"
+            shown_tasks_num = completed_tasks_num
+        elif user_input.casefold() == "u":
+            status = "uncompleted"
+            shown_tasks_num = uncompleted_tasks_num
+        else:
+            print(
+                termcolor.colored(
+                    "Invalid choice. Please enter a valid option.", "red", "on_black"
+                )
+            )
+            continue
+        break
+    while True:
+        user_input = input("How many tasks do you want to see per page? (default 20): ")
+        if user_input == "":
+            page_size = 20
+        elif user_input.isdigit() and int(user_input) > 0:
+            page_size = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Page size must be a positive number!", "red", "on_black"
+                )
+            )
+            continue
+        break
 
+    if shown_tasks_num == 0:
+        print(termcolor.colored("No tasks have been saved!", "yellow", "on_black"))
+        return None
 
-# Function to add a new task
-def add_task(edit=False, data=[]):
-    # Get old saved tasks from tasks.csv
-    with open(file_location + "tasks.csv", "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        old_tasks = []
-        for row in csv_reader:
-            old_tasks.append(row)
-
-    # Removing the titles from the data
-    old_tasks.pop(0)
-
-    # Get the last ID number stored in tasks.csv and generate a new ID for the new task
-    if len(old_tasks) != 0:
-        id = int(old_tasks[-1][0]) + 1
-    else:
-        id = 1
+    # Showing one page at a time
+    pages_num = (shown_tasks_num + page_size - 1) // page_size
+    page = 1
+    while True:
+        print(termcolor.colored(f"Page {page} of {pages_num}", "cyan"))
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        for task in iter_display_tasks(status, (page - 1) * page_size, page_size):
+            if task[3].casefold() == "completed":
+                output_color = "green"
+            elif task[3].casefold() == "uncompleted":
+                output_color = "yellow"
+            print(
+                f"Task ID: {termcolor.colored(task[0], output_color)} - Task name: {termcolor.colored(task[1], output_color)} - Status: {termcolor.colored(task[3], output_color)}"
+            )
+        print(termcolor.colored("`" * 3, "cyan", "on_black"))
+        if pages_num == 1:
+            return None
+        user_input = input(
+            "Press Enter for the next page, enter a page number to jump to it, or Q to quit: "
+        )
+        if user_input.casefold() == "q":
+            return None
+        elif user_input == "":
+            if page == pages_num:
+                return None
+            page += 1
+        elif user_input.isdigit() and 1 <= int(user_input) <= pages_num:
+            page = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Invalid choice. Please enter a valid option.", "red", "on_black"
+                )
+            )
 
-    # Gathering old task names into a list to search if new task names already exist in tasks or not
-    old_task_names = []
-    for item in old_tasks:
-        old_task_names.append(item[1])
 
+# Function to add a new task
+def add_task(edit=False, data=[]):
     while True:
         task_name = input("Please enter the task name: ")
         if task_name == "" and not edit:
@@ -156,7 +1412,9 @@ def add_task(edit=False, data=[]):
             continue
         break
 
-    if task_name.casefold() in old_task_names and not edit:
+    # Searching the new task name in saved tasks (case-insensitive)
+    if not edit and task_store.name_exists(task_name):
+        old_task = task_store.get_by_name(task_name)
         print(
             termcolor.colored(
                 f"You saved a task with {task_name} name before!", "yellow", "on_black"
@@ -165,10 +1423,7 @@ def add_task(edit=False, data=[]):
         while True:
             user_input = input("Do you want to edit your old task? (Y yes, N no): ")
             if user_input.casefold() == "y" or user_input.casefold() == "yes":
-                for item in old_tasks:
-                    if item[1] == task_name:
-                        data = item
-                edit_task(data)
+                edit_task(old_task)
             elif user_input.casefold() == "n" or user_input.casefold() == "no":
                 print(
                     termcolor.colored(
@@ -196,28 +1451,117 @@ def add_task(edit=False, data=[]):
     task_description = input("Please enter your task description(optional): ")
     if task_description.isspace():
         task_description = ""
-
-    # Data processing
-    task = [id, task_name, task_description, "uncompleted"]
+    if edit:
+        print(
+            termcolor.colored(
+                "Press Enter to keep the old priority and due date, or enter - to remove them",
+                "yellow",
+                "on_black",
+            )
+        )
+        task_priority = input_task_priority(data[4])
+        task_due = input_task_due(data[5])
+    else:
+        print(
+            termcolor.colored(
+                "Task priority and due date are optional you can press Enter to skip them",
+                "yellow",
+                "on_black",
+            )
+        )
+        task_priority = input_task_priority()
+        task_due = input_task_due()
 
     # Data processing and returning data to be edited at its function
     if edit:
-        task = [data[0], task_name, task_description, data[3]]
+        task = [data[0], task_name, task_description, data[3], task_priority, task_due]
         return task
 
-    # Adding task to tasks.csv
-    with open(file_location + "tasks.csv", "a", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        csv_writer.writerow(task)
-        csv_file.close()
+    # Adding task to the task store
+    save_new_task(task_name, task_description, task_priority, task_due)
+
+
+# Function to ask for an optional priority, in edit mode Enter keeps old_priority and - removes it
+def input_task_priority(old_priority=None):
+    while True:
+        user_input = input("Please enter the task priority (H high, M medium, L low, optional): ")
+        if old_priority is not None and user_input == "":
+            return old_priority
+        if old_priority is not None and user_input == "-":
+            return ""
+        task_priority = parse_priority(user_input)
+        if task_priority is not None:
+            return task_priority
+        print(
+            termcolor.colored(
+                "Invalid priority. Please enter H, M or L.", "red", "on_black"
+            )
+        )
+
+
+# Function to ask for an optional due date, in edit mode Enter keeps old_due and - removes it
+def input_task_due(old_due=None):
+    while True:
+        user_input = input("Please enter the task due date (YYYY-MM-DD, optional): ")
+        if old_due is not None and user_input == "":
+            return old_due
+        if old_due is not None and user_input == "-":
+            return ""
+        task_due = parse_due(user_input)
+        if task_due is not None:
+            return task_due
+        print(
+            termcolor.colored(
+                "Invalid due date. Please enter it like 2024-12-31.", "red", "on_black"
+            )
+        )
+
+
+# Function to save a new task after checking its name (used by add_task and the command line)
+def save_new_task(task_name, task_description="", task_priority="", task_due=""):
+    if task_name == "":
+        print(termcolor.colored("Task name cannot be empty!", "yellow", "on_black"))
+        return None
+    if parse_priority(task_priority) is None:
+        print(
+            termcolor.colored(
+                f"Invalid priority {task_priority} for {task_name} task!", "red", "on_black"
+            )
+        )
+        return None
+    if parse_due(task_due) is None:
+        print(
+            termcolor.colored(
+                f"Invalid due date {task_due} for {task_name} task!", "red", "on_black"
+            )
+        )
+        return None
+    if task_store.name_exists(task_name):
+        print(
+            termcolor.colored(
+                f"You saved a task with {task_name} name before!", "yellow", "on_black"
+            )
+        )
+        return None
+    if task_description.isspace():
+        task_description = ""
+
+    try:
+        task = task_store.add(
+            task_name, task_description, parse_priority(task_priority), parse_due(task_due)
+        )
+    except TaskConflictError as error:
+        print(termcolor.colored(str(error), "red", "on_black"))
+        return None
 
     print(
         termcolor.colored(
-            f"Task ID: {id} - Task Name: {task_name} added successfully",
+            f"Task ID: {task[0]} - Task Name: {task_name} added successfully",
             "green",
             "on_black",
         )
     )
+    return task
 
 
 # Function to edit an uncompleted task
@@ -227,28 +1571,15 @@ def edit_task(data=[]):
     if data == None:
         return None
 
-    with open(file_location + "tasks.csv", "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        csv_data = []
-        for row in csv_reader:
-            if (
-                row[0].casefold() != data[0].casefold()
-                and row[1].casefold() != data[1].casefold()
-            ):
-                csv_data.append(row)
-            else:
-                if row[3].casefold() == "uncompleted":
-                    csv_data.append([])
-                else:
-                    print(
-                        termcolor.colored(
-                            "Selected task is completed and cannot be edited!",
-                            "red",
-                            "on_black",
-                        )
-                    )
-                    return None
-        csv_file.close()
+    if data[3].casefold() != "uncompleted":
+        print(
+            termcolor.colored(
+                "Selected task is completed and cannot be edited!",
+                "red",
+                "on_black",
+            )
+        )
+        return None
 
     print(
         termcolor.colored(
@@ -271,15 +1602,12 @@ def edit_task(data=[]):
         )
         return None
 
-    for i in range(len(csv_data)):
-        if csv_data[i] == []:
-            csv_data[i] = new_data
-
-    with open(file_location + "tasks.csv", "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        for item in csv_data:
-            csv_writer.writerow(item)
-        csv_file.close()
+    # Saving the edited task only if nobody else has changed it in the meantime
+    try:
+        task_store.update(new_data, data)
+    except TaskConflictError as error:
+        print(termcolor.colored(str(error), "red", "on_black"))
+        return None
 
     print(
         termcolor.colored(
@@ -349,33 +1677,16 @@ def view_specific_task(data=[]):
             break
 
         # Searching task_name or task_ID in saved tasks
-        with open(file_location + "tasks.csv", "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            for row in csv_reader:
-                if skip_task_id:
-                    if task_name.casefold() == row[1].casefold():
-                        data = row
-                        break
-                else:
-                    if task_id == row[0]:
-                        data = row
-                        break
-            csv_file.close()
+        if skip_task_id:
+            data = task_store.get_by_name(task_name)
+        else:
+            data = task_store.get_by_id(task_id)
     else:
-        # Searching task_name or task_ID in saved tasks
-        with open(file_location + "tasks.csv", "r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            data_saved = False
-            for row in csv_reader:
-                if row[0] == data[0]:
-                    data_saved = True
-                    data = row
-            if not data_saved:
-                data = []
-            csv_file.close()
+        # Searching task_ID in saved tasks
+        data = task_store.get_by_id(data[0])
 
     # Checking if task_name or task_ID exists in saved tasks
-    if len(data) == 0:
+    if data is None:
         print(
             termcolor.colored(
                 "There is no saved task with such a name or ID!",
@@ -401,6 +1712,12 @@ def view_specific_task(data=[]):
         print(f"Task Description: {task_description}")
     status = termcolor.colored(data[3].capitalize(), output_color)
     print(f"Task status: {status}")
+    if data[4] != "":
+        task_priority = termcolor.colored(data[4].capitalize(), output_color)
+        print(f"Task priority: {task_priority}")
+    if data[5] != "":
+        task_due = termcolor.colored(data[5], output_color)
+        print(f"Task due date: {task_due}")
     print(termcolor.colored("`" * 3, "cyan", "on_black"))
 
     # Returning collected data to be used in other functions
@@ -414,37 +1731,27 @@ def mark_task_completed():
     if data == None:
         return None
 
+    complete_task(data)
+
+
+# Function to mark a found task as completed (used by mark_task_completed and the command line)
+def complete_task(data):
     if data[3] == "completed":
         print(
             termcolor.colored("Selected task is already completed!", "red", "on_black")
         )
         return None
 
-    # Changing task status to completed
-    data[3] = "completed"
-    # Loading all tasks to csv_data
-    with open(file_location + "tasks.csv", "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        csv_data = []
-        for row in csv_reader:
-            if (
-                row[0].casefold() != data[0].casefold()
-                and row[1].casefold() != data[1].casefold()
-            ):
-                csv_data.append(row)
-            else:
-                csv_data.append(data)
-        csv_file.close()
-
-    # Saving all tasks with marked task to tasks.csv
-    with open(file_location + "tasks.csv", "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        for item in csv_data:
-            csv_writer.writerow(item)
-        csv_file.close()
+    # Changing task status to completed and saving it
+    try:
+        task = task_store.complete(data[0], data)
+    except TaskConflictError as error:
+        print(termcolor.colored(str(error), "red", "on_black"))
+        return None
 
     # Output to complete the process
     print(termcolor.colored("Selected task marked as completed!", "green", "on_black"))
+    return task
 
 
 # Function to delete a specific task
@@ -454,24 +1761,17 @@ def delete_specific_task():
     if data == None:
         return None
 
-    # Loading all tasks to csv_data
-    with open(file_location + "tasks.csv", "r") as csv_file:
-        csv_reader = csv.reader(csv_file)
-        csv_data = []
-        for row in csv_reader:
-            if (
-                row[0].casefold() != data[0].casefold()
-                and row[1].casefold() != data[1].casefold()
-            ):
-                csv_data.append(row)
-        csv_file.close()
-
-    # Saving all tasks with marked task to tasks.csv
-    with open(file_location + "tasks.csv", "w", newline="") as csv_file:
-        csv_writer = csv.writer(csv_file)
-        for item in csv_data:
-            csv_writer.writerow(item)
-        csv_file.close()
+    remove_task(data)
+
+
+# Function to delete a found task (used by delete_specific_task and the command line)
+def remove_task(data):
+    # Deleting the selected task from the task store
+    try:
+        task = task_store.delete(data[0], data)
+    except TaskConflictError as error:
+        print(termcolor.colored(str(error), "red", "on_black"))
+        return None
 
     # Output to complete the process
     print(
@@ -479,6 +1779,72 @@ def delete_specific_task():
             "Selected task has been deleted successfully!", "green", "on_black"
         )
     )
+    return task
+
+
+# Function to search task names and descriptions
+def search_tasks():
+    print(
+        termcolor.colored(
+            "Words are combined with AND by default, use OR between words to match any of them and end a word with * to match its beginning",
+            "yellow",
+            "on_black",
+        )
+    )
+    while True:
+        query = input("Please enter your search query: ")
+        if query.strip() == "":
+            print(termcolor.colored("Search query cannot be empty!", "yellow", "on_black"))
+            continue
+        break
+
+    results = task_store.search(query)
+    if len(results) == 0:
+        print(termcolor.colored("No tasks matched your search!", "yellow", "on_black"))
+        return None
+
+    print(termcolor.colored(f"{len(results)} tasks matched your search:", "green", "on_black"))
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    for task, matches_num in results:
+        if task[3].casefold() == "completed":
+            output_color = "green"
+        else:
+            output_color = "yellow"
+        print(
+            f"Task ID: {termcolor.colored(task[0], output_color)} - Task name: {termcolor.colored(task[1], output_color)} - Status: {termcolor.colored(task[3], output_color)} - Matches: {matches_num}"
+        )
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+
+
+# Function to view the next uncompleted tasks ordered by due date, then priority
+def next_up_tasks():
+    while True:
+        user_input = input("How many tasks do you want to see? (default 10): ")
+        if user_input == "":
+            tasks_num = 10
+        elif user_input.isdigit() and int(user_input) > 0:
+            tasks_num = int(user_input)
+        else:
+            print(
+                termcolor.colored(
+                    "Number of tasks must be a positive number!", "red", "on_black"
+                )
+            )
+            continue
+        break
+
+    tasks = task_store.next_up(tasks_num)
+    if len(tasks) == 0:
+        print(termcolor.colored("There are no uncompleted tasks!", "yellow", "on_black"))
+        return None
+
+    print(termcolor.colored(f"Next {len(tasks)} tasks:", "green", "on_black"))
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
+    for task in tasks:
+        print(
+            f"Task ID: {termcolor.colored(task[0], 'yellow')} - Task name: {termcolor.colored(task[1], 'yellow')} - Priority: {termcolor.colored(task[4] or '-', 'yellow')} - Due: {termcolor.colored(task[5] or '-', 'yellow')}"
+        )
+    print(termcolor.colored("`" * 3, "cyan", "on_black"))
 
 
 # Function to delete all tasks(reset data)
@@ -493,7 +1859,7 @@ def delete_all_tasks():
             "Do you want to delete all your saved tasks and reset data? (Y yes, N no): "
         )
         if user_input.casefold() == "y" or user_input.casefold() == "yes":
-            tasks_csv_create()
+            task_store.reset()
             print(
                 termcolor.colored(
                     "All saved tasks have been deleted successfully!",
@@ -515,12 +1881,201 @@ def delete_all_tasks():
         return None
 
 
+# Building the parser for the non-interactive command line (add, complete, delete, list, next and import)
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="Manage tasks without the interactive menu. Without a command the menu is shown."
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["csv", "journal", "sqlite"],
+        help="storage mode to use instead of the one set in the script",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    add_parser = subparsers.add_parser(
+        "add", help="add tasks by name, or records with name/description/priority/due read from stdin"
+    )
+    add_parser.add_argument("names", nargs="*", help="names of the new tasks")
+    add_parser.add_argument("-d", "--description", default="", help="description for the new tasks")
+    add_parser.add_argument("-p", "--priority", default="", help="priority for the new tasks (high, medium or low)")
+    add_parser.add_argument("--due", default="", help="due date for the new tasks (YYYY-MM-DD)")
+
+    for command in ["complete", "delete"]:
+        command_parser = subparsers.add_parser(
+            command, help=f"{command} tasks by ID, or records with id or name read from stdin"
+        )
+        command_parser.add_argument("tasks", nargs="*", help="IDs (or names with --name) of the tasks")
+        command_parser.add_argument("--name", action="store_true", help="select tasks by name instead of ID")
+
+    search_parser = subparsers.add_parser(
+        "search", help="search task names and descriptions (AND by default, OR, and * for prefixes)"
+    )
+    search_parser.add_argument("query", nargs="+", help="search words")
+
+    subparsers.add_parser("reindex", help="rebuild the task index (next ID and task names) from the saved tasks")
+
+    next_parser = subparsers.add_parser(
+        "next", help="print the next uncompleted tasks ordered by due date, then priority, as CSV"
+    )
+    next_parser.add_argument("-n", "--number", type=int, default=10, help="number of tasks (default 10)")
+
+    list_parser = subparsers.add_parser("list", help="print tasks as CSV")
+    list_parser.add_argument("--status", choices=["completed", "uncompleted"], help="only list tasks with this status")
+
+    import_parser = subparsers.add_parser(
+        "import", help="import tasks with name, description, status, priority and due from a CSV or JSON lines file"
+    )
+    import_parser.add_argument("file", nargs="?", default="-", help="file to import, - for stdin (default)")
+
+    for command_parser in [add_parser, subparsers.choices["complete"], subparsers.choices["delete"], import_parser]:
+        command_parser.add_argument(
+            "--format",
+            choices=["auto", "json", "csv"],
+            default="auto",
+            help="format of the records read from stdin or the imported file (default: auto)",
+        )
+    return parser
+
+
+# Reading bulk records (dictionaries) from newline-delimited JSON or CSV with a header row
+def read_records(stream, input_format="auto"):
+    first_line = stream.readline()
+    while first_line != "" and first_line.strip() == "":
+        first_line = stream.readline()
+    if first_line == "":
+        return None
+    if input_format == "auto":
+        input_format = "json" if first_line.lstrip().startswith("{") else "csv"
+    if input_format == "json":
+        yield json.loads(first_line)
+        for line in stream:
+            if line.strip() != "":
+                yield json.loads(line)
+    else:
+        field_names = next(csv.reader([first_line]))
+        for record in csv.DictReader(stream, fieldnames=field_names):
+            yield record
+
+
+# Finding a saved task by ID or by name for the command line
+def find_task(value, by_name=False):
+    value = str(value)
+    if by_name:
+        data = task_store.get_by_name(value)
+    else:
+        data = task_store.get_by_id(value)
+    if data is None:
+        print(
+            termcolor.colored(
+                f"There is no saved task with {value} {'name' if by_name else 'ID'}!",
+                "red",
+                "on_black",
+            )
+        )
+    return data
+
+
+# Saving a new task from a bulk record with name, description, priority and due
+def save_new_record(record):
+    return save_new_task(
+        record.get("name") or "",
+        record.get("description") or "",
+        record.get("priority") or "",
+        record.get("due") or "",
+    )
+
+
+# Running one command line command, all changes are saved in one batch
+def run_command(arguments):
+    failures = 0
+    with task_store.batch():
+        if arguments.command == "add":
+            if len(arguments.names) != 0:
+                records = [
+                    {
+                        "name": name,
+                        "description": arguments.description,
+                        "priority": arguments.priority,
+                        "due": arguments.due,
+                    }
+                    for name in arguments.names
+                ]
+            else:
+                records = read_records(sys.stdin, arguments.format)
+            for record in records:
+                task = save_new_record(record)
+                if task is None:
+                    failures += 1
+        elif arguments.command == "complete" or arguments.command == "delete":
+            if len(arguments.tasks) != 0:
+                selections = [(value, arguments.name) for value in arguments.tasks]
+            else:
+                selections = (
+                    (record["id"], False) if record.get("id") else (record.get("name") or "", True)
+                    for record in read_records(sys.stdin, arguments.format)
+                )
+            for value, by_name in selections:
+                data = find_task(value, by_name)
+                if data is None:
+                    failures += 1
+                elif arguments.command == "complete":
+                    if complete_task(data) is None:
+                        failures += 1
+                elif remove_task(data) is None:
+                    failures += 1
+        elif arguments.command == "search":
+            results = task_store.search(" ".join(arguments.query))
+            csv_writer = csv.writer(sys.stdout)
+            csv_writer.writerow(task_titles + ["matches"])
+            for task, matches_num in results:
+                csv_writer.writerow(task + [matches_num])
+            if len(results) == 0:
+                failures += 1
+        elif arguments.command == "reindex":
+            task_store.rebuild_index()
+            print(termcolor.colored("Task index has been rebuilt!", "green", "on_black"))
+        elif arguments.command == "list":
+            csv_writer = csv.writer(sys.stdout)
+            csv_writer.writerow(task_titles)
+            csv_writer.writerows(task_store.iter_tasks(arguments.status))
+        elif arguments.command == "next":
+            csv_writer = csv.writer(sys.stdout)
+            csv_writer.writerow(task_titles)
+            csv_writer.writerows(task_store.next_up(arguments.number))
+        elif arguments.command == "import":
+            if arguments.file == "-":
+                import_file = contextlib.nullcontext(sys.stdin)
+            else:
+                import_file = open(arguments.file, "r", newline="")
+            with import_file as import_file:
+                for record in read_records(import_file, arguments.format):
+                    task = save_new_record(record)
+                    if task is None:
+                        failures += 1
+                    elif (record.get("status") or "").casefold() == "completed":
+                        complete_task(task)
+    return failures
+
+
 if __name__ == "__main__":
     file_location = os_detect()
+    arguments = build_argument_parser().parse_args()
+    if arguments.storage is not None:
+        storage_mode = arguments.storage
 
     if not tasks_csv_exists():
         tasks_csv_create()
 
+    # Loading tasks.csv once for the whole session
+    task_store = open_task_store()
+
+    # Running a single command without the interactive menu
+    if arguments.command is not None:
+        failures = run_command(arguments)
+        task_store.close()
+        sys.exit(1 if failures != 0 else 0)
+
     while True:
         display_menu()
         choice = input("Enter your choice: ")
@@ -540,7 +2095,12 @@ if __name__ == "__main__":
             delete_specific_task()
         elif choice == "7":
             delete_all_tasks()
+        elif choice == "9":
+            search_tasks()
+        elif choice == "10":
+            next_up_tasks()
         elif choice == "8":
+            task_store.close()
             print("Goodbye!")
             break
         else: